@@ -0,0 +1,17 @@
+"""Benchmark suite for the onebot v11 protocol hot paths
+
+Run ``python -m benchmarks --help`` from the repository root.
+"""
+
+import fnmatch
+import sys
+from pathlib import Path
+
+_SRC = Path(__file__).parent.parent.joinpath("src").resolve()
+if str(_SRC) not in sys.path:
+    sys.path.insert(0, str(_SRC))
+
+
+def matches(name: str, pattern: str | None) -> bool:
+    """Whether a benchmark is selected by the ``--filter`` glob (all are when it is empty)"""
+    return pattern is None or fnmatch.fnmatch(name, pattern)
@@ -0,0 +1,132 @@
+"""Run the benchmark suite
+
+    python -m benchmarks                      # run everything, compare with baseline.json
+    python -m benchmarks --quick --only micro
+    python -m benchmarks --output result.json --save-baseline
+    python -m benchmarks --loop uvloop --only e2e
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+from melobot_protocol_onebot.v11.loop import current_loop_backend, install_loop
+
+from . import e2e, micro
+
+_DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+# the metric used to compare against the baseline, higher is better
+_SCORE_KEYS = ("ops_per_sec", "events_per_sec", "actions_per_sec")
+
+
+def _meta() -> dict[str, Any]:
+    from melobot_protocol_onebot import __version__
+
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "loop": current_loop_backend(),
+        "time": int(time.time()),
+    }
+
+
+def _compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float,
+) -> list[dict[str, Any]]:
+    rows = []
+    for name, metrics in results.items():
+        for key in _SCORE_KEYS:
+            if key not in metrics:
+                continue
+            base = baseline.get(name, {}).get(key)
+            ratio = metrics[key] / base if base else None
+            rows.append(
+                {
+                    "name": name,
+                    "metric": key,
+                    "value": metrics[key],
+                    "baseline": base,
+                    "ratio": ratio,
+                    "regressed": ratio is not None and ratio < 1 - tolerance,
+                }
+            )
+    return rows
+
+
+def _print_rows(rows: list[dict[str, Any]]) -> None:
+    print(f"{'benchmark':<34}{'metric':<17}{'value':>14}{'baseline':>14}{'ratio':>9}")
+    for row in rows:
+        base = "-" if row["baseline"] is None else f"{row['baseline']:.1f}"
+        ratio = "-" if row["ratio"] is None else f"{row['ratio']:.2f}"
+        flag = "  << regression" if row["regressed"] else ""
+        print(
+            f"{row['name']:<34}{row['metric']:<17}{row['value']:>14.1f}"
+            f"{base:>14}{ratio:>9}{flag}"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument("--only", choices=("micro", "e2e"), help="run one group only")
+    parser.add_argument("--filter", help="glob on benchmark names, e.g. 'event_*'")
+    parser.add_argument("--quick", action="store_true", help="small corpora, short runs")
+    parser.add_argument("--output", type=Path, help="write results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, default=_DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store the results as the baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="allowed slowdown against the baseline before failing (default 0.15)",
+    )
+    parser.add_argument(
+        "--loop",
+        choices=("asyncio", "uvloop", "auto"),
+        default="asyncio",
+        help="event loop implementation (default asyncio)",
+    )
+    args = parser.parse_args(argv)
+    install_loop(args.loop)
+
+    # benchmarks not matching --filter are skipped before they are set up or run
+    results: dict[str, dict[str, float]] = {}
+    if args.only in (None, "micro"):
+        if args.quick:
+            results.update(micro.run(size=50, min_time=0.05, pattern=args.filter))
+        else:
+            results.update(micro.run(pattern=args.filter))
+    if args.only in (None, "e2e"):
+        if args.quick:
+            results.update(e2e.run(events=300, actions=200, pattern=args.filter))
+        else:
+            results.update(e2e.run(pattern=args.filter))
+
+    baseline: dict[str, dict[str, float]] = {}
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+    rows = _compare(results, baseline, args.tolerance)
+    _print_rows(rows)
+
+    doc = {"meta": _meta(), "results": results, "comparison": rows}
+    if args.output:
+        args.output.write_text(json.dumps(doc, indent=2) + "\n", encoding="utf-8")
+    if args.save_baseline:
+        doc.pop("comparison")
+        args.baseline.write_text(json.dumps(doc, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline saved to {args.baseline}")
+
+    return 1 if any(row["regressed"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""Deterministic, recorded-style event corpora
+
+Every corpus is generated from a fixed seed, so the same sizes always give the same
+payloads and results stay comparable between runs and machines.
+"""
+
+import random
+from typing import Any, Callable
+
+SELF_ID = 123456
+_WORDS = (
+    "你好",
+    "今天",
+    "吃什么",
+    "hello",
+    "world",
+    "melobot",
+    "哈哈哈",
+    "确实",
+    "？",
+    "~",
+    "[doge]",
+    "https://example.com/a?b=c&d=e",
+)
+
+
+def _text(rng: random.Random, min_words: int = 1, max_words: int = 12) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(min_words, max_words)))
+
+
+def _sender(uid: int) -> dict[str, Any]:
+    return {
+        "user_id": uid,
+        "nickname": f"user-{uid}",
+        "card": "",
+        "sex": "unknown",
+        "age": 0,
+        "area": "",
+        "level": "1",
+        "role": "member",
+        "title": "",
+    }
+
+
+def _group_msg(
+    rng: random.Random, idx: int, message: list[dict] | str, raw: str
+) -> dict[str, Any]:
+    uid = rng.randint(10000, 99999)
+    return {
+        "time": 1725292489 + idx,
+        "self_id": SELF_ID,
+        "post_type": "message",
+        "message_type": "group",
+        "sub_type": "normal",
+        "message_id": idx,
+        "group_id": rng.randint(100000, 100100),
+        "user_id": uid,
+        "anonymous": None,
+        "message": message,
+        "raw_message": raw,
+        "font": 0,
+        "sender": _sender(uid),
+    }
+
+
+def _seg(type: str, **data: Any) -> dict[str, Any]:
+    return {"type": type, "data": data}
+
+
+def text_only(n: int, seed: int = 0) -> list[dict[str, Any]]:
+    """Plain text group messages"""
+    rng = random.Random(seed)
+    res = []
+    for i in range(n):
+        text = _text(rng)
+        res.append(_group_msg(rng, i, [_seg("text", text=text)], text))
+    return res
+
+
+def mixed_media(n: int, seed: int = 0) -> list[dict[str, Any]]:
+    """Replies, faces, images and voice mixed with text"""
+    rng = random.Random(seed)
+    res = []
+    for i in range(n):
+        segs = []
+        if rng.random() < 0.3:
+            segs.append(_seg("reply", id=str(rng.randint(1, 10**9))))
+        for _ in range(rng.randint(1, 4)):
+            kind = rng.random()
+            if kind < 0.4:
+                segs.append(_seg("text", text=_text(rng)))
+            elif kind < 0.6:
+                segs.append(_seg("face", id=str(rng.randint(0, 300))))
+            elif kind < 0.9:
+                fid = f"{rng.getrandbits(128):032x}"
+                segs.append(
+                    _seg("image", file=f"{fid}.image", url=f"https://example.com/{fid}")
+                )
+            else:
+                segs.append(_seg("record", file=f"{rng.getrandbits(64):016x}.amr"))
+        res.append(_group_msg(rng, i, segs, ""))
+    return res
+
+
+def at_heavy(n: int, seed: int = 0) -> list[dict[str, Any]]:
+    """Messages that mention many members"""
+    rng = random.Random(seed)
+    res = []
+    for i in range(n):
+        segs = []
+        for _ in range(rng.randint(5, 20)):
+            segs.append(_seg("at", qq=str(rng.randint(10000, 99999))))
+            segs.append(_seg("text", text=" "))
+        segs.append(_seg("text", text=_text(rng)))
+        res.append(_group_msg(rng, i, segs, ""))
+    return res
+
+
+def cq_string(n: int, seed: int = 0) -> list[dict[str, Any]]:
+    """The same kind of content as :func:`mixed_media`, in the CQ string format"""
+    rng = random.Random(seed)
+    res = []
+    for i in range(n):
+        parts = []
+        if rng.random() < 0.3:
+            parts.append(f"[CQ:reply,id={rng.randint(1, 10**9)}]")
+        for _ in range(rng.randint(1, 5)):
+            kind = rng.random()
+            if kind < 0.5:
+                parts.append(
+                    _text(rng)
+                    .replace("&", "&amp;")
+                    .replace("[", "&#91;")
+                    .replace("]", "&#93;")
+                )
+            elif kind < 0.7:
+                parts.append(f"[CQ:at,qq={rng.randint(10000, 99999)}]")
+            elif kind < 0.85:
+                parts.append(f"[CQ:face,id={rng.randint(0, 300)}]")
+            else:
+                parts.append(f"[CQ:image,file={rng.getrandbits(128):032x}.image]")
+        msg = "".join(parts)
+        res.append(_group_msg(rng, i, msg, msg))
+    return res
+
+
+def forward_nodes(n: int, depth: int = 4, width: int = 3, seed: int = 0) -> list[dict]:
+    """``get_forward_msg`` echo payloads with nested forward nodes"""
+    rng = random.Random(seed)
+
+    def node(level: int) -> dict[str, Any]:
+        content: list[dict] = [_seg("text", text=_text(rng))]
+        if level < depth:
+            content.extend(node(level + 1) for _ in range(rng.randint(1, width)))
+        uid = rng.randint(10000, 99999)
+        return _seg("node", user_id=str(uid), nickname=f"user-{uid}", content=content)
+
+    return [
+        {
+            "status": "ok",
+            "retcode": 0,
+            "data": {"message": [node(1) for _ in range(rng.randint(2, width + 1))]},
+        }
+        for _ in range(n)
+    ]
+
+
+def member_list(n: int, group_id: int = 123456, seed: int = 0) -> dict[str, Any]:
+    """A ``get_group_member_list`` echo payload with ``n`` members"""
+    rng = random.Random(seed)
+    members = []
+    for i in range(n):
+        sent = 1725292489 - rng.randint(0, 86400 * 30)
+        members.append(
+            {
+                "group_id": group_id,
+                "user_id": 10000 + i,
+                "nickname": f"member-{i}",
+                "card": f"card-{i}",
+                "sex": rng.choice(("male", "female", "unknown")),
+                "age": rng.randint(0, 60),
+                "area": "",
+                "join_time": sent - rng.randint(0, 86400 * 365),
+                "last_sent_time": sent,
+                "level": str(rng.randint(1, 100)),
+                "role": rng.choices(("owner", "admin", "member"), (1, 10, n))[0],
+                "unfriendly": False,
+                "title": "",
+                "title_expire_time": 0,
+                "card_changeable": True,
+            }
+        )
+    return {"status": "ok", "retcode": 0, "data": members}
+
+
+#: corpora of reported events, by name
+EVENT_CORPORA: dict[str, Callable[[int], list[dict[str, Any]]]] = {
+    "text": text_only,
+    "mixed_media": mixed_media,
+    "at_heavy": at_heavy,
+    "cq_string": cq_string,
+}
@@ -0,0 +1,239 @@
+"""End-to-end throughput through each IO source against a local OneBot stand-in
+
+Each run measures two things:
+- events/s: frames the stand-in reports until ``io.input()`` has returned all of them
+- actions/s: for the WebSocket sources, echo round trips with a fixed number of
+  actions in flight. For the HTTP source, no-echo actions until the stand-in has
+  received all of them, since HTTP API responses carry no echo id.
+"""
+
+import asyncio
+import json
+import socket
+import time
+from contextlib import closing
+from typing import Any, Awaitable, Callable
+
+import aiohttp
+import aiohttp.web
+import websockets
+from melobot.ctx import LoggerCtx
+from melobot.log import LogLevel
+from melobot.log.base import Logger
+
+from melobot_protocol_onebot.v11.io.base import BaseIO
+from melobot_protocol_onebot.v11.io.duplex_http import HttpIO
+from melobot_protocol_onebot.v11.io.forward import ForwardWebSocketIO
+from melobot_protocol_onebot.v11.io.packet import OutPacket
+from melobot_protocol_onebot.v11.io.reverse import ReverseWebSocketIO
+
+from . import matches
+from .corpus import EVENT_CORPORA
+
+Result = dict[str, float]
+_HOST = "127.0.0.1"
+
+
+def _free_port() -> int:
+    with closing(socket.socket()) as sock:
+        sock.bind((_HOST, 0))
+        return int(sock.getsockname()[1])
+
+
+def _echo_frame(raw: str | bytes) -> str | None:
+    data = json.loads(raw)
+    if "echo" not in data:
+        return None
+    return json.dumps({"status": "ok", "retcode": 0, "data": None, "echo": data["echo"]})
+
+
+def _action(idx: int, echo: bool) -> OutPacket:
+    params = {"message_type": "group", "group_id": 1, "message": [], "auto_escape": False}
+    echo_id = str(idx) if echo else None
+    data = {"action": "send_msg", "params": params} | ({"echo": echo_id} if echo else {})
+    return OutPacket(
+        data=json.dumps(data),
+        action_type="send_msg",
+        action_params=params,
+        echo_id=echo_id,
+    )
+
+
+async def _events_rate(
+    io: BaseIO, frames: list[str], send: Callable[[str], Awaitable[Any]]
+) -> float:
+    async def feed() -> None:
+        for frame in frames:
+            await send(frame)
+
+    start = time.perf_counter()
+    feeder = asyncio.create_task(feed())
+    for _ in frames:
+        await io.input()
+    elapsed = time.perf_counter() - start
+    await feeder
+    return len(frames) / elapsed
+
+
+async def _echo_rate(io: BaseIO, num: int, concurrency: int) -> float:
+    counter = iter(range(num))
+
+    async def worker() -> None:
+        for idx in counter:
+            await io.output(_action(idx, True))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return num / (time.perf_counter() - start)
+
+
+async def _forward(frames: list[str], actions: int, concurrency: int) -> Result:
+    conn_fut: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    async def handler(ws: Any) -> None:
+        conn_fut.set_result(ws)
+        async for raw in ws:
+            if (echo := _echo_frame(raw)) is not None:
+                await ws.send(echo)
+
+    port = _free_port()
+    server = await websockets.serve(handler, _HOST, port)
+    io = ForwardWebSocketIO(f"ws://{_HOST}:{port}", cd_time=0)
+    try:
+        async with io:
+            conn = await conn_fut
+            events = await _events_rate(io, frames, conn.send)
+            echoes = await _echo_rate(io, actions, concurrency)
+    finally:
+        server.close()
+        await server.wait_closed()
+    return {"events_per_sec": events, "actions_per_sec": echoes}
+
+
+async def _reverse(frames: list[str], actions: int, concurrency: int) -> Result:
+    port = _free_port()
+    io = ReverseWebSocketIO(_HOST, port, cd_time=0)
+    opening = asyncio.create_task(io.open())
+    await asyncio.sleep(0)
+
+    for _ in range(50):
+        try:
+            client = await websockets.connect(f"ws://{_HOST}:{port}")
+            break
+        except OSError:
+            await asyncio.sleep(0.05)
+    await opening
+
+    async def respond() -> None:
+        async for raw in client:
+            if (echo := _echo_frame(raw)) is not None:
+                await client.send(echo)
+
+    responder = asyncio.create_task(respond())
+    try:
+        events = await _events_rate(io, frames, client.send)
+        echoes = await _echo_rate(io, actions, concurrency)
+    finally:
+        responder.cancel()
+        await client.close()
+        await io.close()
+    return {"events_per_sec": events, "actions_per_sec": echoes}
+
+
+async def _http(frames: list[str], actions: int, concurrency: int) -> Result:
+    received = 0
+    all_received = asyncio.Event()
+
+    async def api(_: aiohttp.web.Request) -> aiohttp.web.Response:
+        nonlocal received
+        received += 1
+        if received == actions:
+            all_received.set()
+        return aiohttp.web.json_response({"status": "ok", "retcode": 0, "data": None})
+
+    api_port, serve_port = _free_port(), _free_port()
+    app = aiohttp.web.Application()
+    app.add_routes([aiohttp.web.post("/{action}", api)])
+    runner = aiohttp.web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await aiohttp.web.TCPSite(runner, _HOST, api_port).start()
+
+    io = HttpIO(_HOST, api_port, _HOST, serve_port, cd_time=0)
+    session = aiohttp.ClientSession()
+    sem = asyncio.Semaphore(concurrency)
+
+    async def post(frame: str) -> None:
+        async with sem:
+            async with session.post(f"http://{_HOST}:{serve_port}", data=frame) as resp:
+                await resp.read()
+
+    async def send(frame: str) -> None:
+        # keep `concurrency` reports in flight, like an implementation with a pool
+        await sem.acquire()
+        sem.release()
+        asyncio.create_task(post(frame))
+
+    opening = asyncio.create_task(io.open())
+    try:
+        for _ in range(50):
+            try:
+                await post(frames[0])
+                break
+            except aiohttp.ClientConnectionError:
+                await asyncio.sleep(0.05)
+        await opening
+        await io.input()
+
+        events = await _events_rate(io, frames, send)
+        start = time.perf_counter()
+        for idx in range(actions):
+            await io.output(_action(idx, False))
+        await all_received.wait()
+        echoes = actions / (time.perf_counter() - start)
+    finally:
+        await session.close()
+        await io.close()
+        await runner.cleanup()
+    return {"events_per_sec": events, "actions_per_sec": echoes}
+
+
+_SOURCES: dict[str, Callable[[list[str], int, int], Awaitable[Result]]] = {
+    "forward_ws": _forward,
+    "reverse_ws": _reverse,
+    "http": _http,
+}
+
+
+def run(
+    events: int = 2000,
+    actions: int = 1000,
+    concurrency: int = 32,
+    pattern: str | None = None,
+) -> dict[str, Result]:
+    """对每个 IO 源运行端到端吞吐测试
+
+    :param events: 上报事件数，取自混合媒体语料
+    :param actions: 行为数
+    :param concurrency: 同时在途的行为（或 HTTP 上报）数
+    :param pattern: 基准名的 glob 模式，不匹配的 IO 源不运行，为空则全部运行
+    :return: 基准名 -> 结果
+    """
+    sources = {
+        f"e2e[{name}]": bench
+        for name, bench in _SOURCES.items()
+        if matches(f"e2e[{name}]", pattern)
+    }
+    if not sources:
+        return {}
+    frames = [
+        json.dumps(e, ensure_ascii=False) for e in EVENT_CORPORA["mixed_media"](events)
+    ]
+
+    async def main() -> dict[str, Result]:
+        res: dict[str, Result] = {}
+        with LoggerCtx().in_ctx(Logger(level=LogLevel.ERROR)):
+            for name, bench in sources.items():
+                res[name] = await bench(frames, actions, concurrency)
+        return res
+
+    return asyncio.run(main())
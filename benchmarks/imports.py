@@ -0,0 +1,90 @@
+"""Measure cold import and startup time of the package
+
+    python -m benchmarks.imports
+    python -m benchmarks.imports --runs 10 --output imports.json
+
+Every scenario runs in a fresh interpreter, so nothing is shared through
+``sys.modules``; the best of ``--runs`` runs is reported. ``melobot`` alone is the
+floor that this package cannot go below. ``build_models`` is the one-off cost of
+building every pydantic validator, which the package otherwise pays lazily on the
+first event of each type.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from . import _SRC
+
+_HEAVY = ("aiohttp", "websockets", "numpy", "multiprocessing")
+
+_SCENARIOS = {
+    "melobot": "import melobot",
+    "v11": "import melobot_protocol_onebot.v11",
+    "v11+forward_ws": "from melobot_protocol_onebot.v11 import ForwardWebSocketIO",
+    "v11+reverse_ws": "from melobot_protocol_onebot.v11 import ReverseWebSocketIO",
+    "v11+http": "from melobot_protocol_onebot.v11 import HttpIO",
+    "v11+build_models": "import melobot_protocol_onebot.v11 as v11\nv11.build_models()",
+}
+
+_PROBE = """
+import sys, time
+t = time.perf_counter()
+exec({code!r})
+cost = time.perf_counter() - t
+print(cost, ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def _probe(code: str) -> tuple[float, list[str]]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (str(_SRC), env.get("PYTHONPATH"))))
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(code=code, heavy=_HEAVY)],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+    return float(out[0]), out[1].split(",") if len(out) > 1 else []
+
+
+def run(runs: int = 5) -> dict[str, dict[str, object]]:
+    """运行导入耗时基准
+
+    :param runs: 每个场景运行的次数，取最好的一次
+    :return: 场景名 -> 结果
+    """
+    res: dict[str, dict[str, object]] = {}
+    for name, code in _SCENARIOS.items():
+        costs, loaded = [], []
+        for _ in range(runs):
+            cost, loaded = _probe(code)
+            costs.append(cost)
+        res[name] = {"ms": min(costs) * 1000, "heavy_modules": loaded}
+    return res
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.imports", description=__doc__
+    )
+    parser.add_argument("--runs", type=int, default=5, help="runs per scenario")
+    parser.add_argument("--output", type=Path, help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = run(args.runs)
+    print(f"{'scenario':<20}{'ms':>10}  heavy modules loaded")
+    for name, row in results.items():
+        mods = ", ".join(row["heavy_modules"]) or "-"  # type: ignore[arg-type]
+        print(f"{name:<20}{row['ms']:>10.1f}  {mods}")
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
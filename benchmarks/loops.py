@@ -0,0 +1,53 @@
+"""Compare end-to-end IO throughput under the asyncio and uvloop event loops
+
+    python -m benchmarks.loops
+    python -m benchmarks.loops --quick
+
+Each IO source runs the ``e2e`` benchmarks once per loop implementation, in the same
+process, and the ratio uvloop / asyncio is printed per metric.
+"""
+
+import argparse
+import sys
+from typing import Any
+
+from melobot_protocol_onebot.v11.loop import install_loop
+
+from . import e2e
+
+_METRICS = ("events_per_sec", "actions_per_sec")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.loops", description=__doc__
+    )
+    parser.add_argument("--quick", action="store_true", help="small corpora, short runs")
+    args = parser.parse_args(argv)
+
+    try:
+        install_loop("uvloop")
+    except ImportError as e:
+        print(e)
+        return 1
+
+    kwargs: dict[str, Any] = {"events": 300, "actions": 200} if args.quick else {}
+    results = {}
+    for backend in ("asyncio", "uvloop"):
+        install_loop(backend)  # type: ignore[arg-type]
+        results[backend] = e2e.run(**kwargs)
+    install_loop("asyncio")
+
+    print(f"{'benchmark':<22}{'metric':<17}{'asyncio':>12}{'uvloop':>12}{'ratio':>8}")
+    for name, base in results["asyncio"].items():
+        for key in _METRICS:
+            fast = results["uvloop"][name][key]
+            print(
+                f"{name:<22}{key:<17}{base[key]:>12.1f}{fast:>12.1f}"
+                f"{fast / base[key]:>8.2f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""Micro-benchmarks of the per-event and per-action hot functions"""
+
+import timeit
+from functools import cache
+from typing import Any, Callable, Coroutine, cast
+
+from melobot_protocol_onebot.v11.adapter.action import SendMsgAction
+from melobot_protocol_onebot.v11.adapter.echo import Echo, GetGroupMemberListEcho
+from melobot_protocol_onebot.v11.adapter.event import Event
+from melobot_protocol_onebot.v11.adapter.roster import _HAS_NUMPY, GroupRoster
+from melobot_protocol_onebot.v11.adapter.segment import Segment, _cq_to_dicts
+from melobot_protocol_onebot.v11.utils.abc import Matcher
+from melobot_protocol_onebot.v11.utils.match import (
+    ContainMatcher,
+    EndMatcher,
+    FullMatcher,
+    RegexMatcher,
+    StartMatcher,
+)
+from melobot_protocol_onebot.v11.utils.parse import CmdParser
+
+from . import matches
+from .corpus import EVENT_CORPORA, forward_nodes, member_list, mixed_media, text_only
+
+Result = dict[str, float]
+# a benchmark to run and the number of operations per call
+Bench = tuple[Callable[[], Any], int]
+# prepares a benchmark, so corpora are only built for the selected ones
+Case = Callable[[], Bench]
+
+
+def _run_sync(coro: Coroutine[Any, Any, Any]) -> Any:
+    # matchers and parsers never actually suspend, so drive them without a loop
+    try:
+        coro.send(None)
+    except StopIteration as e:
+        return e.value
+    raise RuntimeError("coroutine suspended unexpectedly")
+
+
+def _measure(func: Callable[[], Any], ops: int, min_time: float) -> Result:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    best = min(timer.repeat(repeat=5, number=number)) / number
+    return {"ops_per_sec": ops / best, "ns_per_op": best / ops * 1e9}
+
+
+def _each(items: list, func: Callable[[Any], Any]) -> Callable[[], None]:
+    def run() -> None:
+        for item in items:
+            func(item)
+
+    return run
+
+
+def run(
+    size: int = 200, min_time: float = 0.2, pattern: str | None = None
+) -> dict[str, Result]:
+    """运行微基准
+
+    :param size: 每个语料的条目数
+    :param min_time: 每轮计时的最短时间（秒）
+    :param pattern: 基准名的 glob 模式，不匹配的基准不准备语料也不运行，为空则全部运行
+    :return: 基准名 -> 结果
+    """
+    # shared corpora are built once, on first use by a selected benchmark
+    cases: dict[str, Case] = {}
+
+    for name, gen in EVENT_CORPORA.items():
+
+        def event_resolve(gen: Callable[[int], list[dict]] = gen) -> Bench:
+            events = gen(size)
+            return _each(events, Event.resolve), len(events)
+
+        cases[f"event_resolve[{name}]"] = event_resolve
+
+    def cq_to_dicts() -> Bench:
+        cq_msgs = [e["message"] for e in EVENT_CORPORA["cq_string"](size)]
+        return _each(cq_msgs, _cq_to_dicts), len(cq_msgs)
+
+    cases["cq_to_dicts"] = cq_to_dicts
+
+    def forward() -> Bench:
+        nodes = forward_nodes(max(size // 20, 1))
+
+        def resolve_forward(data: dict) -> None:
+            echo = Echo.resolve(action_type="get_forward_msg", **data)
+            list(echo.data["message"])
+
+        return _each(nodes, resolve_forward), len(nodes)
+
+    cases["echo_resolve[forward_nodes]"] = forward
+    cases.update(_member_list(size * 15))
+
+    @cache
+    def segs() -> list[Segment]:
+        return [
+            Segment.resolve(seg["type"], seg["data"])
+            for e in mixed_media(size)
+            for seg in e["message"]
+        ]
+
+    def segment_to_dict() -> Bench:
+        return _each(segs(), lambda s: s.to_dict(force_str=True)), len(segs())
+
+    def action_flatten() -> Bench:
+        actions = [SendMsgAction(seg_list, group_id=1) for seg_list in _chunks(segs(), 3)]
+        for a in actions:
+            a.set_echo(True)
+        return _each(actions, lambda a: a.flatten()), len(actions)
+
+    cases["segment_to_dict"] = segment_to_dict
+    cases["action_flatten"] = action_flatten
+
+    @cache
+    def texts() -> list[str]:
+        return [e["message"][0]["data"]["text"] for e in text_only(size)]
+
+    targets = ["hello", "melobot", "吃什么", "~"]
+    for name, matcher in (
+        ("start", StartMatcher(targets)),
+        ("contain", ContainMatcher(targets)),
+        ("end", EndMatcher(targets)),
+        ("full", FullMatcher(targets)),
+        ("regex", RegexMatcher(r"mel\w+t|吃什么")),
+    ):
+
+        def match(m: Matcher = matcher) -> Bench:
+            return _each(texts(), lambda t: _run_sync(m.match(t))), len(texts())
+
+        cases[f"matcher[{name}]"] = match
+
+    def cmd_parser() -> Bench:
+        cmd_texts = [f".{t.split()[0]} {t}" for t in texts()]
+        parser = CmdParser(".", " ", ["你好", "hello", "melobot"])
+        return _each(cmd_texts, lambda t: _run_sync(parser.parse(t))), len(cmd_texts)
+
+    cases["cmd_parser"] = cmd_parser
+
+    return {
+        name: _measure(*setup(), min_time)
+        for name, setup in cases.items()
+        if matches(name, pattern)
+    }
+
+
+def _member_list(num: int) -> dict[str, Case]:
+    # lazily validated member list echoes and the columnar roster built from them
+    @cache
+    def corpus() -> tuple[dict, list[dict], int, int]:
+        payload = member_list(num)
+        members = payload["data"]
+        target = members[num // 2]["user_id"]
+        cutoff = sorted(m["last_sent_time"] for m in members)[num // 2]
+        return payload, members, target, cutoff
+
+    def resolve() -> GetGroupMemberListEcho:
+        echo = Echo.resolve(action_type="get_group_member_list", **corpus()[0])
+        return cast(GetGroupMemberListEcho, echo)
+
+    def iterate() -> None:
+        for _ in resolve().iter_members():
+            pass
+
+    def dict_scan() -> None:
+        _, members, _, cutoff = corpus()
+        [
+            m["user_id"]
+            for m in members
+            if m["role"] == "member" and m["last_sent_time"] < cutoff
+        ]
+
+    # per payload: resolving without touching members, and finding one member
+    cases: dict[str, Case] = {
+        "echo_resolve[member_list]": lambda: (lambda: len(resolve().data), 1),
+        "member_list_lookup": lambda: (
+            lambda: resolve().get_member(corpus()[2]),
+            1,
+        ),
+        # per member: validating all of them, building and sweeping the roster
+        "member_list_iterate": lambda: (iterate, num),
+        "roster_build": lambda: (lambda: GroupRoster(corpus()[1], False), num),
+        "roster_sweep[dict]": lambda: (dict_scan, num),
+    }
+    for backend in ("array", "numpy") if _HAS_NUMPY else ("array",):
+
+        def sweep(use_numpy: bool = backend == "numpy") -> Bench:
+            _, members, _, cutoff = corpus()
+            roster = GroupRoster(members, use_numpy)
+            return lambda: roster.filter(roles=["member"], sent_before=cutoff), num
+
+        cases[f"roster_sweep[{backend}]"] = sweep
+    return cases
+
+
+def _chunks(items: list, size: int) -> list[list]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
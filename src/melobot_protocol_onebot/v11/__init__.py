@@ -1,10 +1,51 @@
+from typing import TYPE_CHECKING, Any
+
 from .. import __version__
-from .adapter import Adapter, EchoRequireCtx
+from .adapter import Adapter, EchoRequireCtx, build_models
 from .adapter.action import Action
 from .adapter.echo import Echo
 from .adapter.event import Event
 from .adapter.segment import Segment
 from .const import PROTOCOL_IDENTIFIER
 from .handle import on_event, on_message, on_meta, on_notice, on_request
-from .io import ForwardWebSocketIO, HttpIO, ReverseWebSocketIO
+from .metrics import MetricsRegistry
+from .offload import Offloader
 from .utils import GroupRole, LevelRole, ParseArgs
+
+if TYPE_CHECKING:
+    from .io import (
+        FailoverIO,
+        ForwardWebSocketIO,
+        HttpIO,
+        Hub,
+        HubWorkerIO,
+        RecordIO,
+        ReplayIO,
+        ReverseWebSocketIO,
+    )
+
+# IO 源按需从 io 子包中延迟导入，参见 io 子包的 __getattr__
+_LAZY_IO_ATTRS = (
+    "FailoverIO",
+    "ForwardWebSocketIO",
+    "HttpIO",
+    "Hub",
+    "HubWorkerIO",
+    "RecordIO",
+    "ReplayIO",
+    "ReverseWebSocketIO",
+)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_IO_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from . import io
+
+    obj = getattr(io, name)
+    globals()[name] = obj
+    return obj
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_LAZY_IO_ATTRS})
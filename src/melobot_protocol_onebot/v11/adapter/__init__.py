@@ -1 +1,2 @@
 from .base import Adapter, EchoRequireCtx
+from .segment import build_models
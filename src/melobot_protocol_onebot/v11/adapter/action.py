@@ -8,6 +8,31 @@ from typing_extensions import TypedDict
 from ..const import PROTOCOL_IDENTIFIER
 from .segment import NodeSegment, Segment, TextSegment
 
+#: 幂等的（只读的）行为类型，执行期间相同的此类行为可以合并
+IDEMPOTENT_ACTION_TYPES = frozenset(
+    {
+        "get_msg",
+        "get_forward_msg",
+        "get_login_info",
+        "get_stranger_info",
+        "get_friend_list",
+        "get_group_info",
+        "get_group_list",
+        "get_group_member_info",
+        "get_group_member_list",
+        "get_group_honor_info",
+        "get_cookies",
+        "get_csrf_token",
+        "get_credentials",
+        "get_record",
+        "get_image",
+        "can_send_image",
+        "can_send_record",
+        "get_status",
+        "get_version_info",
+    }
+)
+
 
 class Action(RootAction):
     def __init__(self, type: str, params: dict[str, Any]) -> None:
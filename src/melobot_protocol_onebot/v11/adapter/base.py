@@ -1,5 +1,8 @@
+import asyncio
+import json
+from functools import partial
 from os import PathLike
-from typing import Iterable, Literal, Optional, cast
+from typing import Any, Callable, Iterable, Literal, Optional, cast
 
 from melobot.adapter import (
     AbstractEchoFactory,
@@ -7,10 +10,11 @@ from melobot.adapter import (
     AbstractOutputFactory,
 )
 from melobot.adapter import Adapter as RootAdapter
+from melobot.adapter import AdapterLifeSpan
 from melobot.adapter import content as mc
 from melobot.adapter.content import Content
 from melobot.adapter.model import ActionHandle, EchoT
-from melobot.ctx import Context
+from melobot.ctx import ActionManualSignalCtx, Context
 from melobot.exceptions import AdapterError
 from melobot.handle import try_get_event
 from melobot.typ import AsyncCallable
@@ -19,28 +23,95 @@ from melobot.utils import singleton
 from ..const import PROTOCOL_IDENTIFIER, P
 from ..io.base import BaseIO
 from ..io.packet import EchoPacket, InPacket, OutPacket
+from ..metrics import AdapterMetrics, MetricsRegistry
+from ..offload import Offloader
 from . import action as ac
 from . import echo as ec
 from . import event as ev
 from . import segment as se
 from .action import Action
+from .broadcast import Broadcast, BroadcastCheckpoint
+from .cache import CachedActionHandle, QueryCache
 from .echo import Echo
 from .event import Event
+from .media import MediaCache, MediaSource, encode_base64_async
 from .segment import Segment
 
 
 class EventFactory(AbstractEventFactory[InPacket, Event]):
+    def __init__(self, offload: Offloader | None = None) -> None:
+        self.offload = offload
+        #: 事件 id -> 输入包的确认回调，事件分发完毕后调用
+        self.acks: dict[str, Callable[[], None]] = {}
+
     async def create(self, packet: InPacket) -> Event:
-        return Event.resolve(packet.data)
+        try:
+            if self.offload is None:
+                event = Event.resolve(packet.data)
+            else:
+                event = await self.offload.resolve(Event.resolve, packet.data)
+        except Exception:
+            # 无法解析的事件永远不会被分发，直接确认，以免重启后反复重放
+            if packet.ack is not None:
+                packet.ack()
+            raise
+
+        if packet.ack is not None:
+            self.acks[event.id] = packet.ack
+        return event
+
+
+class _AckDispatcher:
+    # 代理 melobot 的分发器：事件的所有处理器执行结束后，调用输入包的确认回调
+    def __init__(self, dispatcher: Any, acks: dict[str, Callable[[], None]]) -> None:
+        self._dispatcher = dispatcher
+        self._acks = acks
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._dispatcher, name)
+
+    async def broadcast(self, event: Event) -> None:
+        try:
+            await self._dispatcher.broadcast(event)
+        finally:
+            if (ack := self._acks.pop(event.id, None)) is not None:
+                ack()
 
 
 class OutputFactory(AbstractOutputFactory[OutPacket, Action]):
+    def __init__(self) -> None:
+        # 行为 id -> 执行该行为的任务结束时的回调
+        self._watchers: dict[str, list[Callable[[], None]]] = {}
+
+    def watch(self, action: Action, callback: Callable[[], None]) -> None:
+        """在执行行为的每个任务结束（无论成功或出错）时调用回调
+
+        melobot 在独立的任务中执行行为操作句柄，出错时只记录日志，句柄永远不会完成。
+        行为转换为输出包的步骤运行在该任务中，因此在此为任务挂上完成回调
+
+        :param action: 行为对象
+        :param callback: 回调
+        """
+        self._watchers.setdefault(action.id, []).append(callback)
+
+    def unwatch(self, action: Action, callback: Callable[[], None]) -> None:
+        if (callbacks := self._watchers.get(action.id)) is None:
+            return
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if not callbacks:
+            del self._watchers[action.id]
+
     async def create(self, action: Action) -> OutPacket:
+        if (task := asyncio.current_task()) is not None:
+            for callback in tuple(self._watchers.get(action.id, ())):
+                task.add_done_callback(lambda _, cb=callback: cb())  # type: ignore[misc]
         return OutPacket(
             data=action.flatten(),
             action_type=action.type,
             action_params=action.params,
             echo_id=action.id if action.need_echo else None,
+            trigger=action.trigger.raw if isinstance(action.trigger, Event) else None,
         )
 
 
@@ -60,15 +131,159 @@ class EchoRequireCtx(Context[bool]):
 class Adapter(
     RootAdapter[EventFactory, OutputFactory, EchoFactory, Action, BaseIO, BaseIO]
 ):
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        media_cache: MediaCache | None = None,
+        query_cache: QueryCache | None = None,
+        coalesce_types: Iterable[str] | None = None,
+        metrics: MetricsRegistry | None = None,
+        offload: Offloader | None = None,
+    ) -> None:
+        """初始化一个 onebot v11 适配器
+
+        :param media_cache: 多媒体编码缓存，为空则每次发送都重新编码。
+            注意：适配器不会自动为缓存登记引用（onebot v11 的回应中不含文件 id），
+            缓存只复用编码结果；需要以引用发送时请自行调用 :meth:`.MediaCache.set_ref`
+        :param query_cache: 查询缓存，为空则不缓存查询的回应
+        :param coalesce_types: 执行期间合并相同调用的行为类型，为空则使用幂等的查询类行为
+        :param metrics: 指标注册表，为空则不收集指标
+        :param offload: 事件解码与解析的转移器，为空则全部在事件循环中进行
+        """
         super().__init__(
-            PROTOCOL_IDENTIFIER, EventFactory(), OutputFactory(), EchoFactory()
+            PROTOCOL_IDENTIFIER, EventFactory(offload), OutputFactory(), EchoFactory()
+        )
+        self.media_cache = media_cache
+        self.query_cache = query_cache
+        self.coalesce_types = frozenset(
+            ac.IDEMPOTENT_ACTION_TYPES if coalesce_types is None else coalesce_types
         )
+        self._inflight: dict[str, asyncio.Future[tuple[ActionHandle, ...]]] = {}
+        self._metrics = None if metrics is None else AdapterMetrics(metrics)
+
+        if query_cache is not None:
+
+            async def invalidate_query_cache(event: Event) -> None:
+                query_cache.invalidate_by_event(event)
+
+            self.on(AdapterLifeSpan.BEFORE_EVENT)(invalidate_query_cache)
+
+        if self._metrics is not None:
+            adapter_metrics = self._metrics
+
+            async def count_event(event: Event) -> None:
+                adapter_metrics.event(event.post_type).inc()
+
+            self.on(AdapterLifeSpan.BEFORE_EVENT)(count_event)
+
+    @property
+    def dispatcher(self) -> Any:
+        return self._ack_dispatcher
+
+    @dispatcher.setter
+    def dispatcher(self, dispatcher: Any) -> None:
+        # 由 bot 在启动时设置。包装后事件日志中的事件在分发完毕时才被标记完成
+        self._ack_dispatcher = _AckDispatcher(dispatcher, self._event_factory.acks)
+
+    def _account_scope(self) -> str | None:
+        # 查询的回应属于某个 bot 账号。事件上下文中行为由事件来源的账号执行，以其 self_id 区分；
+        # 没有事件时只有唯一的输出源才能确定账号（以空字符串表示），否则不缓存也不合并查询
+        event = try_get_event()
+        if isinstance(event, Event):
+            return str(event.self_id)
+        return "" if len(self.out_srcs) == 1 else None
+
+    def _watch(
+        self,
+        action: Action,
+        handles: tuple[ActionHandle, ...],
+        key: str | None,
+        scope: str | None,
+        generation: tuple[int, int] | None,
+    ) -> None:
+        # 所有句柄执行结束（成功或出错）后释放合并查询的键，并以第一个句柄的回应填充查询缓存。
+        # 查询期间缓存条目被通知事件失效时，回应可能已过时，由缓存按代数丢弃
+        remain = len(handles)
+
+        def executed() -> None:
+            nonlocal remain
+            remain -= 1
+            if remain > 0:
+                return
+            self._output_factory.unwatch(action, executed)
+            if key is not None:
+                self._inflight.pop(key, None)
+            if (
+                scope is not None
+                and generation is not None
+                and self.query_cache is not None
+                and handles
+                and handles[0].status == "FINISHED"
+                and (echo := handles[0]._echo) is not None
+            ):
+                self.query_cache.set(action, echo, scope, generation)
+
+        if not handles:
+            remain = 1
+            executed()
+            return
+        self._output_factory.watch(action, executed)
+
+    async def _encode_media(self, raw: MediaSource) -> str:
+        if self.media_cache is not None:
+            return await self.media_cache.encode_async(raw)
+        return await encode_base64_async(raw)
 
     async def call_output(self, action: Action) -> tuple[ActionHandle, ...]:
         if EchoRequireCtx().try_get():
             action.need_echo = True
-        return await super().call_output(action)
+        if self._metrics is not None:
+            self._metrics.action(action.type).inc()
+
+        account = self._account_scope()
+        # 手动执行（如行为链中）的句柄可能迟迟不执行甚至永不执行，不合并也不等待其回应填充缓存
+        manual = bool(ActionManualSignalCtx().try_get())
+        cache = self.query_cache
+        scope = None
+        generation = None
+        if cache is not None and action.need_echo and cache.cacheable(action):
+            scope = account
+        if scope is not None:
+            if (echo := await cast(QueryCache, cache).get(action, scope)) is not None:
+                if self._metrics is not None:
+                    self._metrics.query_cache_hits.inc()
+                return (CachedActionHandle(action, echo),)
+            if not manual:
+                generation = cast(QueryCache, cache).generation(action, scope)
+
+        # 同一账号相同的幂等查询在执行期间只输出一次，所有调用方共享同一组句柄与回应
+        key = None
+        fut: asyncio.Future[tuple[ActionHandle, ...]] | None = None
+        if action.type in self.coalesce_types and account is not None and not manual:
+            params = json.dumps(action.params, sort_keys=True)
+            key = f"{account}|{action.need_echo}:{action.type}:{params}"
+            if (inflight := self._inflight.get(key)) is not None:
+                if self._metrics is not None:
+                    self._metrics.coalesced.inc()
+                return await asyncio.shield(inflight)
+            fut = self._inflight[key] = asyncio.get_running_loop().create_future()
+
+        watched = False
+        try:
+            handles = await super().call_output(action)
+            if fut is not None:
+                fut.set_result(handles)
+            # 句柄已创建但执行任务尚未开始运行，此时挂上回调不会错过执行结束
+            if key is not None or generation is not None:
+                self._watch(action, handles, key, scope, generation)
+                watched = True
+            return handles
+        finally:
+            # 没有挂上回调时（如创建句柄出错），在此释放合并查询的键
+            if key is not None and fut is not None and not watched:
+                if self._inflight.get(key) is fut:
+                    del self._inflight[key]
+                if not fut.done():
+                    fut.cancel()
 
     def with_echo(
         self, func: AsyncCallable[P, tuple[ActionHandle[EchoT | None], ...]]
@@ -103,10 +318,13 @@ class Adapter(
     async def send_image(
         self,
         name: str,
-        raw: bytes | None = None,
+        raw: MediaSource | None = None,
         url: str | None = None,
         mimetype: str | None = None,
     ) -> tuple[ActionHandle[ec.SendMsgEcho | None], ...]:
+        if raw is not None:
+            file = await self._encode_media(raw)
+            return await self.send(se.ImageSendSegment(file=file, cache=0))
         return await self.send(
             se.contents_to_segs(
                 [mc.ImageContent(name=name, url=url, raw=raw, mimetype=mimetype)]
@@ -116,10 +334,13 @@ class Adapter(
     async def send_audio(
         self,
         name: str,
-        raw: bytes | None = None,
+        raw: MediaSource | None = None,
         url: str | None = None,
         mimetype: str | None = None,
     ) -> tuple[ActionHandle[ec.SendMsgEcho | None], ...]:
+        if raw is not None:
+            file = await self._encode_media(raw)
+            return await self.send(se.RecordSendSegment(file=file, cache=0))
         return await self.send(
             se.contents_to_segs(
                 [mc.AudioContent(name=name, url=url, raw=raw, mimetype=mimetype)]
@@ -129,10 +350,13 @@ class Adapter(
     async def send_voice(
         self,
         name: str,
-        raw: bytes | None = None,
+        raw: MediaSource | None = None,
         url: str | None = None,
         mimetype: str | None = None,
     ) -> tuple[ActionHandle[ec.SendMsgEcho | None], ...]:
+        if raw is not None:
+            file = await self._encode_media(raw)
+            return await self.send(se.RecordSendSegment(file=file, cache=0))
         return await self.send(
             se.contents_to_segs(
                 [mc.VoiceContent(name=name, url=url, raw=raw, mimetype=mimetype)]
@@ -142,10 +366,13 @@ class Adapter(
     async def send_video(
         self,
         name: str,
-        raw: bytes | None = None,
+        raw: MediaSource | None = None,
         url: str | None = None,
         mimetype: str | None = None,
     ) -> tuple[ActionHandle[ec.SendMsgEcho | None], ...]:
+        if raw is not None:
+            file = await self._encode_media(raw)
+            return await self.send(se.VideoSendSegment(file=file, cache=0))
         return await self.send(
             se.contents_to_segs(
                 [mc.VideoContent(name=name, url=url, raw=raw, mimetype=mimetype)]
@@ -167,7 +394,11 @@ class Adapter(
                 f"提供的事件不是 {ev.MessageEvent.__qualname__} 类型，无法用于发送 refer 消息"
             )
 
-        segs = se.contents_to_segs(list(contents)) if contents else []
+        segs = (
+            await se.contents_to_segs_async(list(contents), self.media_cache)
+            if contents
+            else []
+        )
         segs.insert(0, se.ReplySegment(str(event.message_id)))
         if isinstance(event, ev.GroupMessageEvent):
             return await self.send_custom(segs, group_id=event.group_id)
@@ -199,6 +430,58 @@ class Adapter(
     ) -> tuple[ActionHandle[ec.SendMsgEcho | None], ...]:
         return await self.call_output(ac.SendMsgAction(msgs, user_id, group_id))
 
+    def broadcast(
+        self,
+        msgs: str | Segment | Iterable[Segment] | dict | Iterable[dict],
+        group_ids: Iterable[int] = (),
+        user_ids: Iterable[int] = (),
+        window: int = 1,
+        interval: float = 0,
+        checkpoint: BroadcastCheckpoint | None = None,
+        on_progress: Callable[[int, int], None] | None = None,
+        out_src: BaseIO | None = None,
+    ) -> Broadcast:
+        if out_src is None:
+            if not len(self.out_srcs):
+                raise AdapterError("适配器没有可用的输出源，无法群发消息")
+            out_src = self.out_srcs[0]
+
+        return Broadcast(
+            out_src,
+            msgs,
+            group_ids,
+            user_ids,
+            window,
+            interval,
+            checkpoint,
+            on_progress,
+            partial(self._output_via, out_src),
+        ).start()
+
+    async def _output_via(self, out_src: BaseIO, action: Action) -> Echo:
+        # 经由 call_output 输出到指定输出源，行为钩子与指标因此也能看到该行为。
+        # 执行出错的句柄永远不会完成，因此以执行任务的结束作为完成信号
+        finished = asyncio.get_running_loop().create_future()
+
+        def on_finished() -> None:
+            if not finished.done():
+                finished.set_result(None)
+
+        self._output_factory.watch(action, on_finished)
+        try:
+            with self.filter_out(lambda src: src is out_src):
+                handles = await self.call_output(action)
+            if not handles:
+                raise AdapterError("指定的输出源不属于该适配器，无法输出行为")
+            await finished
+        finally:
+            self._output_factory.unwatch(action, on_finished)
+
+        handle = handles[0]
+        if handle.status != "FINISHED":
+            raise AdapterError(f"行为 {action.type} 执行失败，详细信息见日志")
+        return cast(Echo, await handle)
+
     async def send_forward(
         self, msgs: Iterable[se.NodeSegment]
     ) -> tuple[ActionHandle[ec.SendForwardMsgEcho | None], ...]:
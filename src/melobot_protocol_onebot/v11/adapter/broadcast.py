@@ -0,0 +1,205 @@
+import asyncio
+import json
+import time
+from os import PathLike
+from typing import Any, Awaitable, Callable, Generator, Iterable, Literal, TypeAlias, cast
+
+from ..io.base import BaseIO
+from ..io.packet import OutPacket
+from .action import Action, msgs_to_dicts
+from .echo import Echo
+from .segment import Segment
+
+BroadcastTarget: TypeAlias = tuple[Literal["group", "private"], int]
+
+# 序列化时消息体的占位符，序列化后替换为预先序列化的消息体
+_MSG_SLOT = "\x00message"
+_MSG_SLOT_JSON = json.dumps(_MSG_SLOT)
+
+
+class _BroadcastAction(Action):
+    # 消息体预先序列化的 send_msg 行为，各目标只序列化行为的其余部分
+    def __init__(self, target: BroadcastTarget, msgs: list[dict], msgs_json: str) -> None:
+        mtype, tid = target
+        id_key = "group_id" if mtype == "group" else "user_id"
+        params = {
+            "message_type": mtype,
+            id_key: tid,
+            "message": msgs,
+            "auto_escape": False,
+        }
+        super().__init__("send_msg", params)
+        self.need_echo = True
+        self._msgs_json = msgs_json
+
+    def flatten(self) -> str:
+        obj = self.extract()
+        obj["params"] = obj["params"] | {"message": _MSG_SLOT}
+        return json.dumps(obj, ensure_ascii=False).replace(
+            _MSG_SLOT_JSON, self._msgs_json, 1
+        )
+
+
+class BroadcastCheckpoint:
+    """群发的断点记录
+
+    每个发送成功的目标都会追加写入文件。使用同一断点文件重新群发时，已成功的目标会被跳过
+    """
+
+    def __init__(self, path: str | PathLike[str]) -> None:
+        """初始化一个群发断点记录
+
+        :param path: 断点文件路径，不存在时自动创建
+        """
+        self.path = path
+        self.done: set[BroadcastTarget] = set()
+        try:
+            with open(path, encoding="utf-8") as fp:
+                for line in fp:
+                    if line := line.strip():
+                        mtype, tid = line.split(":", maxsplit=1)
+                        self.done.add((mtype, int(tid)))  # type: ignore[arg-type]
+        except FileNotFoundError:
+            pass
+        self._fp = open(path, "a", encoding="utf-8", buffering=1)
+
+    def mark(self, target: BroadcastTarget) -> None:
+        self.done.add(target)
+        self._fp.write(f"{target[0]}:{target[1]}\n")
+
+    def close(self) -> None:
+        self._fp.close()
+
+
+class Broadcast:
+    """群发任务
+
+    消息体只序列化一次，每个目标仅替换目标 id。发送在后台以低优先级进行：
+    同一时刻最多有 `window` 个群发数据包在输出源的队列中，因此不会挤占交互回复。
+    由适配器创建的群发经由适配器输出，行为钩子与指标同样适用于群发的每个目标。
+
+    本对象可等待，等待结果为各目标的回应
+    """
+
+    def __init__(
+        self,
+        out_src: BaseIO,
+        msgs: str | Segment | Iterable[Segment] | dict | Iterable[dict],
+        group_ids: Iterable[int] = (),
+        user_ids: Iterable[int] = (),
+        window: int = 1,
+        interval: float = 0,
+        checkpoint: BroadcastCheckpoint | None = None,
+        on_progress: Callable[[int, int], None] | None = None,
+        send: Callable[[Action], Awaitable[Echo]] | None = None,
+    ) -> None:
+        """初始化一个群发任务
+
+        :param out_src: 用于发送的输出源
+        :param msgs: 消息内容
+        :param group_ids: 目标群号
+        :param user_ids: 目标用户 qq 号（私聊）
+        :param window: 同时在途的群发数据包数
+        :param interval: 相邻两次发送的最小间隔（秒）
+        :param checkpoint: 断点记录，为空则不记录
+        :param on_progress: 进度回调，参数为已完成数与总数
+        :param send: 输出行为并返回回应的函数，为空则直接由 `out_src` 输出
+        """
+        if window < 1:
+            raise ValueError("群发窗口大小必须为正整数")
+
+        self.out_src = out_src
+        self.window = window
+        self.interval = interval
+        self.checkpoint = checkpoint
+        self.on_progress = on_progress
+        self._send_action = self._output if send is None else send
+
+        targets: list[BroadcastTarget] = [("group", gid) for gid in group_ids]
+        targets.extend(("private", uid) for uid in user_ids)
+        done = checkpoint.done if checkpoint is not None else set()
+        self.targets = [t for t in targets if t not in done]
+        self.skipped = len(targets) - len(self.targets)
+        self.results: dict[BroadcastTarget, Echo | BaseException] = {}
+
+        self._msgs = msgs_to_dicts(msgs)
+        self._msgs_json = json.dumps(self._msgs, ensure_ascii=False)
+        self._pre_send_time = 0.0
+        self._send_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def total(self) -> int:
+        return len(self.targets)
+
+    @property
+    def done(self) -> int:
+        return len(self.results)
+
+    @property
+    def progress(self) -> float:
+        return self.done / self.total if self.total else 1.0
+
+    def start(self) -> "Broadcast":
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    def cancel(self) -> None:
+        """取消群发，已发送的结果保留在 :attr:`results` 中"""
+        if self._task is not None:
+            self._task.cancel()
+
+    def cancelled(self) -> bool:
+        return self._task is not None and self._task.cancelled()
+
+    def __await__(
+        self,
+    ) -> Generator[Any, Any, dict[BroadcastTarget, Echo | BaseException]]:
+        return self.start()._wait().__await__()
+
+    async def _wait(self) -> dict[BroadcastTarget, Echo | BaseException]:
+        await cast(asyncio.Task, self._task)
+        return self.results
+
+    def _make_action(self, target: BroadcastTarget) -> Action:
+        return _BroadcastAction(target, self._msgs, self._msgs_json)
+
+    async def _output(self, action: Action) -> Echo:
+        packet = OutPacket(
+            data=action.flatten(),
+            action_type=action.type,
+            action_params=action.params,
+            echo_id=action.id,
+        )
+        echo = await self.out_src.output(packet)
+        return Echo.resolve(action_type=echo.action_type, **echo.data)
+
+    async def _send(self, target: BroadcastTarget) -> None:
+        async with self._send_lock:
+            wait_time = self.interval - (time.perf_counter() - self._pre_send_time)
+            if wait_time > 0:
+                await asyncio.sleep(wait_time)
+            self._pre_send_time = time.perf_counter()
+
+        try:
+            echo = await self._send_action(self._make_action(target))
+            self.results[target] = echo
+            if echo.ok and self.checkpoint is not None:
+                self.checkpoint.mark(target)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.results[target] = e
+
+        if self.on_progress is not None:
+            self.on_progress(self.done, self.total)
+
+    async def _run(self) -> None:
+        pending = iter(self.targets)
+
+        async def worker() -> None:
+            for target in pending:
+                await self._send(target)
+
+        await asyncio.gather(*(worker() for _ in range(self.window)))
@@ -0,0 +1,261 @@
+import asyncio
+import copy
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from os import PathLike
+from typing import Any
+
+from melobot.adapter.model import ActionHandle
+from typing_extensions import Self
+
+from .action import Action
+from .echo import Echo
+from .event import (
+    Event,
+    FriendAddNoticeEvent,
+    GroupAdminNoticeEvent,
+    GroupDecreaseNoticeEvent,
+    GroupIncreaseNoticeEvent,
+)
+
+#: 默认可缓存的查询行为类型及其缓存有效期（秒）
+DEFAULT_QUERY_TTLS: dict[str, float] = {
+    "get_login_info": 3600,
+    "get_stranger_info": 600,
+    "get_friend_list": 300,
+    "get_group_info": 300,
+    "get_group_list": 300,
+    "get_group_member_info": 120,
+}
+
+
+class CachedActionHandle(ActionHandle):
+    """由缓存直接给出回应的行为操作句柄，不会产生实际的输出"""
+
+    def __init__(  # pylint: disable=super-init-not-called
+        self, action: Action, echo: Echo
+    ) -> None:
+        self.action = action
+        self.status = "FINISHED"
+        self._echo = echo
+        self._done = asyncio.Event()
+        self._done.set()
+
+    def execute(self) -> Self:
+        return self
+
+
+class QueryCache:
+    """onebot 查询行为的读穿透缓存
+
+    以 bot 账号、行为类型与参数为键缓存回应，各行为类型有独立的有效期。`no_cache` 为真的行为不读缓存，
+    但其回应会刷新缓存。群成员增减、群管理变动、好友添加的通知事件会使对应账号的缓存失效。
+
+    账号由调用方以 `scope` 给出（适配器使用当前事件的 `self_id`）。`scope` 为空字符串表示账号未知，
+    这样的条目只存在于内存中，不会写入数据库，以免重启后命中另一个账号的回应。
+    数据库的读写都在专用的线程中执行，不阻塞事件循环。命中时返回缓存回应的副本。
+
+    每个键有一个代数，失效时加一。查询发出前以 :meth:`generation` 取得代数并在写入时传给 :meth:`set`，
+    查询期间键被失效时，迟到的（可能已过时的）回应不会写入缓存
+    """
+
+    def __init__(
+        self,
+        ttls: dict[str, float] | None = None,
+        max_entries: int = 10000,
+        db_path: str | PathLike[str] | None = None,
+    ) -> None:
+        """初始化一个查询缓存
+
+        :param ttls: 可缓存的行为类型及其有效期（秒），为空则使用 :data:`DEFAULT_QUERY_TTLS`
+        :param max_entries: 内存中最多缓存的条目数，超出后按 LRU 淘汰
+        :param db_path: SQLite 数据库文件路径。不为空时缓存会同时写入数据库，重启后可直接命中
+        """
+        self.ttls = dict(DEFAULT_QUERY_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._mem: OrderedDict[str, tuple[float, Echo]] = OrderedDict()
+        # 键 -> 失效次数。记录过多时整体清空并推进纪元，此前取得的代数全部作废
+        self._gens: dict[str, int] = {}
+        self._epoch = 0
+        self._db: sqlite3.Connection | None = None
+        self._db_executor: ThreadPoolExecutor | None = None
+        if db_path is not None:
+            # 所有数据库操作都在同一个线程中按提交顺序执行
+            self._db_executor = ThreadPoolExecutor(1, thread_name_prefix="query_cache")
+            self._db = sqlite3.connect(
+                db_path, isolation_level=None, check_same_thread=False
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_cache "
+                "(key TEXT PRIMARY KEY, action_type TEXT, expire REAL, data TEXT)"
+            )
+            self._db.execute("DELETE FROM query_cache WHERE expire <= ?", (time.time(),))
+
+    @staticmethod
+    def make_key(action_type: str, params: dict[str, Any], scope: str = "") -> str:
+        params = {k: v for k, v in params.items() if k != "no_cache"}
+        return f"{scope}|{action_type}:{json.dumps(params, sort_keys=True)}"
+
+    def cacheable(self, action: Action) -> bool:
+        return action.type in self.ttls
+
+    def generation(self, action: Action, scope: str = "") -> tuple[int, int]:
+        """获取行为对应缓存条目的当前代数，在发出查询前调用
+
+        :param action: 行为对象
+        :param scope: 行为所属的 bot 账号
+        :return: 代数，写入回应时传给 :meth:`set`
+        """
+        return self._generation(self.make_key(action.type, action.params, scope))
+
+    def _generation(self, key: str) -> tuple[int, int]:
+        return (self._epoch, self._gens.get(key, 0))
+
+    def _db_run(self, sql: str, args: tuple[Any, ...]) -> None:
+        # 写入不需要等待结果，提交到数据库线程后立即返回
+        if self._db is not None and self._db_executor is not None:
+            self._db_executor.submit(self._db.execute, sql, args)
+
+    def _db_fetch(self, key: str) -> tuple[float, str] | None:
+        assert self._db is not None
+        return self._db.execute(  # type: ignore[no-any-return]
+            "SELECT expire, data FROM query_cache WHERE key = ?", (key,)
+        ).fetchone()
+
+    async def get(self, action: Action, scope: str = "") -> Echo | None:
+        """获取行为的缓存回应
+
+        :param action: 行为对象
+        :param scope: 行为所属的 bot 账号，为空字符串则只查找内存中的条目
+        :return: 缓存回应的副本，不可缓存、未命中或已过期时为空
+        """
+        if action.type not in self.ttls or action.params.get("no_cache"):
+            return None
+
+        key = self.make_key(action.type, action.params, scope)
+        now = time.time()
+        if (entry := self._mem.get(key)) is not None:
+            if entry[0] > now:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            del self._mem[key]
+
+        if self._db_executor is not None and scope:
+            gen = self._generation(key)
+            row = await asyncio.get_running_loop().run_in_executor(
+                self._db_executor, self._db_fetch, key
+            )
+            if row is not None and row[0] > time.time():
+                echo = Echo.resolve(action_type=action.type, **json.loads(row[1]))
+                # 读取数据库期间键被失效时，读到的行可能早于失效，不放入内存
+                if self._generation(key) == gen:
+                    self._mem_put(key, row[0], echo)
+                self.hits += 1
+                return copy.deepcopy(echo)
+
+        self.misses += 1
+        return None
+
+    def set(
+        self,
+        action: Action,
+        echo: Echo,
+        scope: str = "",
+        generation: tuple[int, int] | None = None,
+    ) -> None:
+        """缓存行为的回应，不可缓存的行为或失败的回应会被忽略
+
+        :param action: 行为对象
+        :param echo: 回应对象，缓存保存其副本
+        :param scope: 行为所属的 bot 账号，为空字符串则不写入数据库
+        :param generation: 发出查询前由 :meth:`generation` 取得的代数，此后键被失效过则忽略本次写入。
+            为空则总是写入
+        """
+        if action.type not in self.ttls or not echo.ok:
+            return
+
+        key = self.make_key(action.type, action.params, scope)
+        if generation is not None and self._generation(key) != generation:
+            return
+        expire = time.time() + self.ttls[action.type]
+        self._mem_put(key, expire, copy.deepcopy(echo))
+        if scope:
+            self._db_run(
+                "INSERT OR REPLACE INTO query_cache VALUES (?, ?, ?, ?)",
+                (key, action.type, expire, json.dumps(echo.raw, ensure_ascii=False)),
+            )
+
+    def invalidate(
+        self, action_type: str, params: dict[str, Any], scope: str = ""
+    ) -> None:
+        """使指定账号、行为类型与参数的缓存失效
+
+        :param action_type: 行为类型
+        :param params: 行为参数
+        :param scope: 行为所属的 bot 账号
+        """
+        key = self.make_key(action_type, params, scope)
+        if len(self._gens) >= self.max_entries and key not in self._gens:
+            self._gens.clear()
+            self._epoch += 1
+        self._gens[key] = self._gens.get(key, 0) + 1
+        self._mem.pop(key, None)
+        if scope:
+            self._db_run("DELETE FROM query_cache WHERE key = ?", (key,))
+
+    def invalidate_by_event(self, event: Event) -> None:
+        """根据通知事件使相关的缓存失效
+
+        事件所属账号的条目与账号未知的条目都会失效
+
+        :param event: 事件对象，与缓存无关的事件会被忽略
+        """
+        for scope in (str(event.self_id), ""):
+            self._invalidate_by_event(event, scope)
+
+    def _invalidate_by_event(self, event: Event, scope: str) -> None:
+        if isinstance(
+            event,
+            (GroupIncreaseNoticeEvent, GroupDecreaseNoticeEvent, GroupAdminNoticeEvent),
+        ):
+            gid, uid = event.group_id, event.user_id
+            self.invalidate(
+                "get_group_member_info", {"group_id": gid, "user_id": uid}, scope
+            )
+            if isinstance(event, GroupAdminNoticeEvent):
+                return
+            self.invalidate("get_group_info", {"group_id": gid}, scope)
+            if uid == event.self_id or (
+                isinstance(event, GroupDecreaseNoticeEvent) and event.is_kick_me()
+            ):
+                self.invalidate("get_group_list", {}, scope)
+
+        elif isinstance(event, FriendAddNoticeEvent):
+            self.invalidate("get_friend_list", {}, scope)
+            self.invalidate("get_stranger_info", {"user_id": event.user_id}, scope)
+
+    def clear(self) -> None:
+        self._mem.clear()
+        self._db_run("DELETE FROM query_cache", ())
+
+    def close(self) -> None:
+        """关闭数据库，等待尚未完成的写入"""
+        if self._db is not None and self._db_executor is not None:
+            self._db_executor.submit(self._db.close)
+            self._db_executor.shutdown(wait=True)
+            self._db = None
+            self._db_executor = None
+
+    def _mem_put(self, key: str, expire: float, echo: Echo) -> None:
+        self._mem[key] = (expire, echo)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
@@ -1,19 +1,91 @@
 from __future__ import annotations
 
-from typing import Any, Literal, Mapping, cast
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    Iterator,
+    Literal,
+    Mapping,
+    Sequence,
+    TypeVar,
+    cast,
+    overload,
+)
 
 from melobot.adapter.model import Echo as RootEcho
-from pydantic import BaseModel
+from pydantic import TypeAdapter
 from typing_extensions import TypedDict
 
 from ..const import PROTOCOL_IDENTIFIER
 from .event import _GroupMessageSender, _MessageSender
-from .segment import NodeSegment, Segment
+from .roster import GroupRoster
+from .segment import NodeSegment, Segment, _Model
+
+_T = TypeVar("_T")
+
+
+class LazyList(Sequence[_T], Generic[_T]):
+    """按需转换元素的只读序列
+
+    原始数据在访问对应元素时才被校验或转换，转换结果会被缓存。
+    因此只需要长度或少数元素时，不必为整个列表付出校验的开销
+    """
+
+    __slots__ = ("raw", "_converter", "_cache")
+
+    def __init__(self, raw: list[Any], converter: Callable[[Any], _T]) -> None:
+        """初始化一个按需转换的序列
+
+        :param raw: 原始元素列表
+        :param converter: 元素转换函数
+        """
+        self.raw = raw
+        self._converter = converter
+        self._cache: dict[int, _T] = {}
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    @overload
+    def __getitem__(self, index: int) -> _T: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[_T]: ...
+
+    def __getitem__(self, index: int | slice) -> _T | list[_T]:
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self.raw)))]
+
+        if index < 0:
+            index += len(self.raw)
+        if not 0 <= index < len(self.raw):
+            raise IndexError("序列索引超出范围")
+        return self._get(index)
+
+    def __iter__(self) -> Iterator[_T]:
+        for i in range(len(self.raw)):
+            yield self._get(i)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, LazyList):
+            other = list(other)
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({list(self)!r})"
+
+    def _get(self, index: int) -> _T:
+        if (elem := self._cache.get(index)) is None:
+            elem = self._cache[index] = self._converter(self.raw[index])
+        return elem
 
 
 class Echo(RootEcho):
 
-    class Model(BaseModel):
+    class Model(_Model):
         status: Literal["ok", "async", "failed"]
         retcode: int
         data: Mapping[str, Any] | list | None
@@ -177,7 +249,11 @@ class _GetForwardMsgEchoData(TypedDict): ...
 
 
 class _GetForwardMsgEchoDataInterface(_GetForwardMsgEchoData):
-    message: list[NodeSegment]
+    message: Sequence[NodeSegment]
+
+
+def _resolve_node(seg_dic: dict[str, Any]) -> NodeSegment:
+    return cast(NodeSegment, Segment.resolve(seg_dic["type"], seg_dic["data"]))
 
 
 class GetForwardMsgEcho(Echo):
@@ -192,15 +268,20 @@ class GetForwardMsgEcho(Echo):
         if self.data is None:
             return
 
-        data = kv_pairs["data"]
-        msgs = data["message"]
-        segs: list[Segment]
+        msgs = kv_pairs["data"]["message"]
         if isinstance(msgs, str):
-            segs = Segment.resolve_cq(msgs)
+            self.data["message"] = cast(list[NodeSegment], Segment.resolve_cq(msgs))
         else:
-            segs = [Segment.resolve(seg_dic["type"], seg_dic["data"]) for seg_dic in msgs]
+            self.data["message"] = LazyList(msgs, _resolve_node)
 
-        self.data["message"] = cast(list[NodeSegment], segs)
+    def iter_nodes(self) -> Iterator[NodeSegment]:
+        """逐个解析并迭代合并转发消息的节点
+
+        :return: 节点消息段的迭代器，回应数据为空时不产生元素
+        """
+        if self.data is None:
+            return iter(())
+        return iter(self.data["message"])
 
 
 class _GetLoginInfoEchoData(TypedDict):
@@ -297,9 +378,60 @@ class GetGroupMemberInfoEcho(Echo):
 class GetGroupMemberListEcho(Echo):
 
     class Model(Echo.Model):
-        data: list[_GetGroupMemberInfoEchoData] | None
+        data: list | None
+
+    data: LazyList[_GetGroupMemberInfoEchoData] | None
+
+    _member_adapter: TypeAdapter[_GetGroupMemberInfoEchoData] | None = None
+
+    def __init__(self, **kv_pairs: Any) -> None:
+        super().__init__(**kv_pairs)
+        self._roster: GroupRoster | None = None
+        if self.data is None:
+            return
+
+        cls = GetGroupMemberListEcho
+        if cls._member_adapter is None:
+            cls._member_adapter = TypeAdapter(_GetGroupMemberInfoEchoData)
+        self.data = LazyList(kv_pairs["data"], cls._member_adapter.validate_python)
+
+    def iter_members(self) -> Iterator[_GetGroupMemberInfoEchoData]:
+        """逐个校验并迭代群成员信息
+
+        :return: 群成员信息的迭代器，回应数据为空时不产生元素
+        """
+        if self.data is None:
+            return iter(())
+        return iter(self.data)
+
+    def roster(self, use_numpy: bool | None = None) -> GroupRoster | None:
+        """将群成员列表构建为列式存储、带索引的群成员名单
+
+        名单直接由原始数据构建，不会逐个校验群成员信息。构建结果会被缓存
 
-    data: list[_GetGroupMemberInfoEchoData] | None
+        :param use_numpy: 是否使用 NumPy，为空则在可用时使用
+        :return: 群成员名单，回应数据为空时为空
+        """
+        if self.data is None:
+            return None
+        if self._roster is None or (
+            use_numpy is not None and (self._roster.backend == "numpy") != use_numpy
+        ):
+            self._roster = GroupRoster(self.data.raw, use_numpy)
+        return self._roster
+
+    def get_member(self, user_id: int) -> _GetGroupMemberInfoEchoData | None:
+        """查找指定的群成员信息，只有匹配的成员会被校验
+
+        :param user_id: 群成员 qq 号
+        :return: 群成员信息，不存在时为空
+        """
+        if self.data is None:
+            return None
+        for i, member in enumerate(self.data.raw):
+            if member.get("user_id") == user_id:
+                return self.data[i]
+        return None
 
 
 class _CurrentTalkativeData(TypedDict):
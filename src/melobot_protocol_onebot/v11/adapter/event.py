@@ -4,15 +4,14 @@ from typing import Any, Literal, Sequence, cast
 
 from melobot.adapter import content
 from melobot.adapter.model import Event as RootEvent
-from pydantic import BaseModel
 
 from ..const import PROTOCOL_IDENTIFIER
-from .segment import Segment, TextSegment, segs_to_contents
+from .segment import Segment, TextSegment, _Model, segs_to_contents
 
 
 class Event(RootEvent):
 
-    class Model(BaseModel):
+    class Model(_Model):
         time: int
         self_id: int
         post_type: Literal["message", "notice", "request", "meta_event"] | str
@@ -166,7 +165,7 @@ class MessageEvent(Event):
 
 class _MessageSender:
 
-    class Model(BaseModel):
+    class Model(_Model):
         user_id: int | None = None
         nickname: str | None = None
         sex: Literal["male", "female", "unknown"] | None = None
@@ -231,7 +230,7 @@ class PrivateMessageEvent(MessageEvent):
 
 class _MessageAnonymous:
 
-    class Model(BaseModel):
+    class Model(_Model):
         id: int
         name: str
         flag: str
@@ -342,7 +341,7 @@ class LifeCycleMetaEvent(MetaEvent):
 
 class _MetaHeartBeatStatus:
 
-    class Model(BaseModel):
+    class Model(_Model):
         online: bool | None
         good: bool
 
@@ -444,7 +443,7 @@ class NoticeEvent(Event):
 
 class _GroupUploadFile:
 
-    class Model(BaseModel):
+    class Model(_Model):
         id: str
         name: str
         size: int
@@ -0,0 +1,424 @@
+import asyncio
+import binascii
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from os import PathLike
+from pathlib import Path
+from typing import BinaryIO, Iterator, TypeAlias, cast
+
+from ..metrics import Counter, MetricsRegistry
+
+#: 可用于发送的多媒体数据源：字节数据、文件路径（str 视为路径）或二进制文件对象
+MediaSource: TypeAlias = bytes | bytearray | memoryview | str | PathLike[str] | BinaryIO
+
+#: 分块编码的块大小，必须为 3 的倍数，以保证各块的 base64 编码可直接拼接
+MEDIA_CHUNK_SIZE = 3 * 256 * 1024
+#: 多媒体数据的默认大小上限（字节）
+MEDIA_SIZE_LIMIT = 64 * 1024 * 1024
+#: 低于该大小（字节）的数据直接在事件循环中编码，避免线程切换的开销
+MEDIA_OFFLOAD_THRESHOLD = 64 * 1024
+
+
+def _media_size(src: MediaSource) -> int | None:
+    if isinstance(src, (bytes, bytearray, memoryview)):
+        return memoryview(src).nbytes
+    if isinstance(src, (str, PathLike)):
+        return os.stat(src).st_size
+    if _has_fileno(src) and src.seekable():
+        return os.fstat(src.fileno()).st_size - src.tell()
+    return None
+
+
+def _has_fileno(src: BinaryIO) -> bool:
+    try:
+        src.fileno()
+    except (OSError, AttributeError, ValueError):
+        return False
+    return True
+
+
+def _iter_stream(fp: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    buf = b""
+    while chunk := fp.read(chunk_size):
+        buf += chunk
+        # 文件对象的单次读取可能不足 chunk_size，需对齐到 3 字节边界
+        cut = len(buf) - len(buf) % 3
+        if cut:
+            yield buf[:cut]
+            buf = buf[cut:]
+    if buf:
+        yield buf
+
+
+def _iter_chunks(src: MediaSource, chunk_size: int) -> Iterator[bytes | memoryview]:
+    if isinstance(src, (bytes, bytearray, memoryview)):
+        view = memoryview(src).cast("B")
+        for i in range(0, view.nbytes, chunk_size):
+            yield view[i : i + chunk_size]
+        return
+
+    if isinstance(src, (str, PathLike)):
+        with open(src, "rb") as fp:
+            yield from _iter_stream(fp, chunk_size)
+        return
+
+    yield from _iter_stream(src, chunk_size)
+
+
+def encode_base64(
+    src: MediaSource,
+    size_limit: int | None = MEDIA_SIZE_LIMIT,
+    chunk_size: int = MEDIA_CHUNK_SIZE,
+) -> str:
+    """分块编码多媒体数据为 onebot 可用的 base64 字符串
+
+    各块的编码结果只在最后拼接一次，不会产生完整的中间 bytes 副本
+
+    :param src: 多媒体数据源
+    :param size_limit: 数据大小上限（字节），为空则不限制
+    :param chunk_size: 分块大小（字节），必须为 3 的倍数
+    :return: 以 `base64://` 开头的字符串
+    """
+    if chunk_size <= 0 or chunk_size % 3:
+        raise ValueError(f"分块大小必须为 3 的正整数倍，当前值为：{chunk_size}")
+
+    if size_limit is not None and (size := _media_size(src)) is not None:
+        if size > size_limit:
+            raise ValueError(f"多媒体数据大小 {size} 字节超过上限 {size_limit} 字节")
+
+    total = 0
+    parts = ["base64://"]
+    for chunk in _iter_chunks(src, chunk_size):
+        total += len(chunk)
+        if size_limit is not None and total > size_limit:
+            raise ValueError(f"多媒体数据大小超过上限 {size_limit} 字节")
+        parts.append(binascii.b2a_base64(chunk, newline=False).decode("ascii"))
+    return "".join(parts)
+
+
+async def encode_base64_async(
+    src: MediaSource,
+    size_limit: int | None = MEDIA_SIZE_LIMIT,
+    chunk_size: int = MEDIA_CHUNK_SIZE,
+) -> str:
+    """与 :func:`encode_base64` 相同，但较大的数据会在工作线程中编码，不阻塞事件循环
+
+    :param src: 多媒体数据源
+    :param size_limit: 数据大小上限（字节），为空则不限制
+    :param chunk_size: 分块大小（字节），必须为 3 的倍数
+    :return: 以 `base64://` 开头的字符串
+    """
+    if (
+        isinstance(src, (bytes, bytearray, memoryview))
+        and memoryview(src).nbytes < MEDIA_OFFLOAD_THRESHOLD
+    ):
+        return encode_base64(src, size_limit, chunk_size)
+    return await asyncio.to_thread(encode_base64, src, size_limit, chunk_size)
+
+
+def _hash_media(src: MediaSource, chunk_size: int) -> str:
+    hasher = hashlib.sha256()
+    if isinstance(src, (bytes, bytearray, memoryview)):
+        hasher.update(src)
+        return hasher.hexdigest()
+
+    if isinstance(src, (str, PathLike)):
+        with open(src, "rb") as fp:
+            while chunk := fp.read(chunk_size):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    # 在读取前检查，调用方仍可改用其他方式发送未被消耗的数据
+    if not src.seekable():
+        raise ValueError("不可定位的文件对象无法在计算摘要后再次读取，请改用字节数据")
+    start = src.tell()
+    while chunk := src.read(chunk_size):
+        hasher.update(chunk)
+    src.seek(start)
+    return hasher.hexdigest()
+
+
+@dataclass
+class MediaCacheStats:
+    """多媒体缓存的命中统计"""
+
+    #: 以引用（实现端文件 id、缓存路径）命中的次数
+    ref_hits: int = 0
+    #: 在内存层命中的次数
+    mem_hits: int = 0
+    #: 在磁盘层命中的次数
+    disk_hits: int = 0
+    #: 未命中的次数
+    misses: int = 0
+    #: 被淘汰的条目数
+    evictions: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.ref_hits + self.mem_hits + self.disk_hits
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class MediaCache:
+    """以内容摘要为键的多媒体编码缓存
+
+    相同内容的多媒体数据只会编码一次。内存层与磁盘层均按 LRU 淘汰。
+    若为某内容登记了引用（如实现端返回的文件 id），则直接以引用代替编码结果发送。
+
+    .. note::
+        onebot v11 的发送回应中不含实现端的文件 id，因此适配器不会自动登记引用。
+        需要复用引用时，请在取得引用后自行调用 :meth:`set_ref`
+    """
+
+    def __init__(
+        self,
+        max_mem_bytes: int = 64 * 1024 * 1024,
+        disk_dir: str | PathLike[str] | None = None,
+        max_disk_bytes: int = 1024 * 1024 * 1024,
+        expose_path: bool = False,
+        max_refs: int = 4096,
+        size_limit: int | None = MEDIA_SIZE_LIMIT,
+        metrics: MetricsRegistry | None = None,
+    ) -> None:
+        """初始化一个多媒体缓存
+
+        :param max_mem_bytes: 内存层容量（字节，按编码后的字符数计）
+        :param disk_dir: 磁盘层目录，为空则不启用磁盘层
+        :param max_disk_bytes: 磁盘层容量（字节）
+        :param expose_path: 磁盘层是否对实现端可见。为真时磁盘层保存原始数据，
+            命中后以 `file://` 路径代替 base64 数据发送（要求实现端与 bot 位于同一主机）
+        :param max_refs: 最多登记的引用数
+        :param size_limit: 单个多媒体数据的大小上限（字节）
+        :param metrics: 指标注册表，为空则不收集指标
+        """
+        self.max_mem_bytes = max_mem_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.expose_path = expose_path
+        self.max_refs = max_refs
+        self.size_limit = size_limit
+        self.stats = MediaCacheStats()
+
+        self._lock = threading.Lock()
+        self._mem: OrderedDict[str, str] = OrderedDict()
+        self._mem_size = 0
+        self._refs: OrderedDict[str, str] = OrderedDict()
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_size = 0
+        self._disk_dir: Path | None = None
+        self._counters: dict[str, Counter] = {}
+        if metrics is not None:
+            for tier in ("ref", "mem", "disk"):
+                self._counters[f"{tier}_hits"] = metrics.counter(
+                    "onebot_media_cache_hits_total",
+                    "多媒体缓存的命中次数",
+                    {"tier": tier},
+                )
+            self._counters["misses"] = metrics.counter(
+                "onebot_media_cache_misses_total", "多媒体缓存的未命中次数"
+            )
+            self._counters["evictions"] = metrics.counter(
+                "onebot_media_cache_evictions_total", "多媒体缓存淘汰的条目数"
+            )
+            stats = self.stats
+            metrics.gauge(
+                "onebot_media_cache_hit_rate",
+                lambda: stats.hit_rate,
+                "多媒体缓存的命中率",
+            )
+
+        if disk_dir is not None:
+            self._disk_dir = Path(disk_dir).resolve()
+            self._disk_dir.mkdir(parents=True, exist_ok=True)
+            entries = sorted(
+                (p for p in self._disk_dir.iterdir() if p.is_file() and not p.suffix),
+                key=lambda p: p.stat().st_mtime,
+            )
+            for p in entries:
+                size = p.stat().st_size
+                self._disk[p.name] = size
+                self._disk_size += size
+            self._evict_disk()
+
+    def digest(self, src: MediaSource) -> str:
+        """计算多媒体数据的内容摘要
+
+        :param src: 多媒体数据源
+        :return: 十六进制摘要字符串
+        """
+        return _hash_media(src, MEDIA_CHUNK_SIZE)
+
+    def set_ref(
+        self, src: MediaSource | None, ref: str, *, digest: str | None = None
+    ) -> None:
+        """为某内容登记可复用的引用，此后该内容将以引用代替数据发送
+
+        :param src: 多媒体数据源（str 视为路径）。已知摘要时可为空
+        :param ref: 引用值，如实现端返回的文件 id 或缓存路径
+        :param digest: :meth:`digest` 返回的摘要，给出时不再计算数据源的摘要
+        """
+        if digest is None:
+            if src is None:
+                raise ValueError("登记引用时必须提供多媒体数据源或其摘要")
+            digest = self.digest(src)
+        with self._lock:
+            self._refs[digest] = ref
+            self._refs.move_to_end(digest)
+            while len(self._refs) > self.max_refs:
+                self._refs.popitem(last=False)
+                self._count("evictions")
+
+    def clear(self) -> None:
+        """清空内存层与引用（磁盘层保留）"""
+        with self._lock:
+            self._mem.clear()
+            self._mem_size = 0
+            self._refs.clear()
+
+    def encode(self, src: MediaSource) -> str:
+        """获取多媒体数据可发送的 file 字段值，未命中时编码并缓存
+
+        :param src: 多媒体数据源
+        :return: 引用、`file://` 路径或 `base64://` 字符串
+        """
+        return self._encode(self.digest(src), src)
+
+    async def encode_async(self, src: MediaSource) -> str:
+        """与 :meth:`encode` 相同，但较大的数据在工作线程中计算摘要，未命中时在工作线程中编码
+
+        引用与内存层的命中直接在事件循环中给出，不切换线程
+        """
+        if (
+            isinstance(src, (bytes, bytearray, memoryview))
+            and memoryview(src).nbytes < MEDIA_OFFLOAD_THRESHOLD
+        ):
+            digest = self.digest(src)
+        else:
+            digest = await asyncio.to_thread(self.digest, src)
+        if (hit := self._lookup_mem(digest)) is not None:
+            return hit
+        return await asyncio.to_thread(self._encode, digest, src)
+
+    def _encode(self, digest: str, src: MediaSource) -> str:
+        if (hit := self._lookup(digest)) is not None:
+            return hit
+
+        if self.expose_path and self._disk_dir is not None:
+            path = self._disk_write_raw(digest, src)
+            code = path.as_uri()
+        else:
+            code = encode_base64(src, self.size_limit)
+            self._disk_write_code(digest, code)
+
+        with self._lock:
+            self._count("misses")
+            self._mem_put(digest, code)
+        return code
+
+    def _lookup_mem(self, digest: str) -> str | None:
+        with self._lock:
+            if (ref := self._refs.get(digest)) is not None:
+                self._refs.move_to_end(digest)
+                self._count("ref_hits")
+                return ref
+            if (code := self._mem.get(digest)) is not None:
+                self._mem.move_to_end(digest)
+                self._count("mem_hits")
+                return code
+        return None
+
+    def _lookup(self, digest: str) -> str | None:
+        if (hit := self._lookup_mem(digest)) is not None:
+            return hit
+        with self._lock:
+            if self._disk_dir is None or digest not in self._disk:
+                return None
+            self._disk.move_to_end(digest)
+
+        path = self._disk_dir / digest
+        try:
+            os.utime(path)
+            code = path.as_uri() if self.expose_path else path.read_text("ascii")
+        except OSError:
+            with self._lock:
+                self._disk_size -= self._disk.pop(digest, 0)
+            return None
+
+        with self._lock:
+            self._count("disk_hits")
+            self._mem_put(digest, code)
+        return code
+
+    def _count(self, field: str) -> None:
+        # 调用方持有锁，计数器因此不会被多个线程同时修改
+        setattr(self.stats, field, getattr(self.stats, field) + 1)
+        if (counter := self._counters.get(field)) is not None:
+            counter.inc()
+
+    def _mem_put(self, digest: str, code: str) -> None:
+        if len(code) > self.max_mem_bytes:
+            return
+        if (old := self._mem.pop(digest, None)) is not None:
+            self._mem_size -= len(old)
+        self._mem[digest] = code
+        self._mem_size += len(code)
+        while self._mem_size > self.max_mem_bytes:
+            _, evicted = self._mem.popitem(last=False)
+            self._mem_size -= len(evicted)
+            self._count("evictions")
+
+    def _disk_write_code(self, digest: str, code: str) -> None:
+        if self._disk_dir is None:
+            return
+        path = self._disk_dir / digest
+        tmp = _tmp_path(path)
+        tmp.write_text(code, "ascii")
+        os.replace(tmp, path)
+        self._disk_add(digest, len(code))
+
+    def _disk_write_raw(self, digest: str, src: MediaSource) -> Path:
+        path = cast(Path, self._disk_dir) / digest
+        tmp = _tmp_path(path)
+        size = 0
+        with open(tmp, "wb") as fp:
+            for chunk in _iter_chunks(src, MEDIA_CHUNK_SIZE):
+                size += len(chunk)
+                if self.size_limit is not None and size > self.size_limit:
+                    fp.close()
+                    tmp.unlink()
+                    raise ValueError(f"多媒体数据大小超过上限 {self.size_limit} 字节")
+                fp.write(chunk)
+        os.replace(tmp, path)
+        self._disk_add(digest, size)
+        return path
+
+    def _disk_add(self, digest: str, size: int) -> None:
+        with self._lock:
+            self._disk_size += size - self._disk.pop(digest, 0)
+            self._disk[digest] = size
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        while self._disk_size > self.max_disk_bytes and len(self._disk) > 1:
+            digest, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            self._count("evictions")
+            if self.expose_path and (uri := self._mem.pop(digest, None)) is not None:
+                # 内存层缓存的是该文件的路径，文件删除后不能再命中
+                self._mem_size -= len(uri)
+            try:
+                (cast(Path, self._disk_dir) / digest).unlink()
+            except OSError:
+                pass
+
+
+def _tmp_path(path: Path) -> Path:
+    # 同一内容可能被多个线程同时写入，每次写入使用独立的临时文件
+    return path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import re
+from array import array
+from importlib.util import find_spec
+from typing import Any, Iterable, Literal, Mapping, Sequence, cast
+
+# NumPy 的导入开销较大，只检测是否可用，在首次构建 NumPy 后端的名单时才真正导入
+_HAS_NUMPY = find_spec("numpy") is not None
+
+#: 群成员角色表，角色列中存储的是角色在此表中的下标
+ROLES: tuple[Literal["owner", "admin", "member"], ...] = ("owner", "admin", "member")
+_ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+_LEVEL_REGEX = re.compile(r"\d+")
+
+
+def _parse_level(level: Any) -> int:
+    if isinstance(level, int):
+        return level
+    match = _LEVEL_REGEX.search(str(level))
+    return int(match.group()) if match else 0
+
+
+class GroupRoster:
+    """列式存储的群成员名单
+
+    `user_id`, `join_time`, `last_sent_time`, `level` 各存为一列紧凑数组，角色与群名片存为去重后的
+    表与下标列，并以 `user_id` 建立哈希索引。筛选操作在列上进行，安装了 NumPy 时使用向量化运算，
+    否则退化为基于 :mod:`array` 的逐行比较
+    """
+
+    def __init__(
+        self, members: Iterable[Mapping[str, Any]], use_numpy: bool | None = None
+    ) -> None:
+        """从群成员信息构建名单
+
+        :param members: 群成员信息（`get_group_member_list` 回应中的元素）
+        :param use_numpy: 是否使用 NumPy，为空则在可用时使用
+        """
+        if use_numpy is None:
+            use_numpy = _HAS_NUMPY
+        elif use_numpy and not _HAS_NUMPY:
+            raise ImportError("使用 NumPy 后端需要先安装 numpy")
+        self.backend: Literal["numpy", "array"] = "numpy" if use_numpy else "array"
+
+        self.group_id = 0
+        self.raw: list[Mapping[str, Any]] = []
+        #: 去重后的群名片表，群名片列中存储的是群名片在此表中的下标
+        self.cards: list[str] = []
+        self._card_codes: dict[str, int] = {}
+
+        user_ids = array("q")
+        join_times = array("q")
+        last_sent_times = array("q")
+        levels = array("l")
+        roles = array("b")
+        card_idxs = array("l")
+        for member in members:
+            self.raw.append(member)
+            self.group_id = member.get("group_id", self.group_id)
+            user_ids.append(member["user_id"])
+            join_times.append(member.get("join_time", 0))
+            last_sent_times.append(member.get("last_sent_time", 0))
+            levels.append(_parse_level(member.get("level", 0)))
+            roles.append(_ROLE_CODES.get(member.get("role", "member"), 2))
+
+            card = member.get("card", "")
+            if (code := self._card_codes.get(card)) is None:
+                code = self._card_codes[card] = len(self.cards)
+                self.cards.append(card)
+            card_idxs.append(code)
+
+        self._index = {uid: row for row, uid in enumerate(user_ids)}
+        # 各列为 numpy.ndarray 或 array.array，取决于所用的后端
+        self.user_ids: Any
+        self.join_times: Any
+        self.last_sent_times: Any
+        self.levels: Any
+        self.roles: Any
+        self.card_idxs: Any
+        if use_numpy:
+            import numpy as np
+
+            self.user_ids = np.frombuffer(user_ids, dtype=np.int64)
+            self.join_times = np.frombuffer(join_times, dtype=np.int64)
+            self.last_sent_times = np.frombuffer(last_sent_times, dtype=np.int64)
+            self.levels = np.asarray(levels, dtype=np.int64)
+            self.roles = np.frombuffer(roles, dtype=np.int8)
+            self.card_idxs = np.asarray(card_idxs, dtype=np.int64)
+        else:
+            self.user_ids = user_ids
+            self.join_times = join_times
+            self.last_sent_times = last_sent_times
+            self.levels = levels
+            self.roles = roles
+            self.card_idxs = card_idxs
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __contains__(self, user_id: object) -> bool:
+        return user_id in self._index
+
+    def row_of(self, user_id: int) -> int:
+        """获取群成员所在的行
+
+        :param user_id: 群成员 qq 号
+        :return: 行号
+        """
+        try:
+            return self._index[user_id]
+        except KeyError:
+            raise KeyError(f"群 {self.group_id} 的名单中不存在成员 {user_id}") from None
+
+    def member(self, user_id: int) -> Mapping[str, Any]:
+        return self.raw[self.row_of(user_id)]
+
+    def role_of(self, user_id: int) -> Literal["owner", "admin", "member"]:
+        return ROLES[int(self.roles[self.row_of(user_id)])]
+
+    def card_of(self, user_id: int) -> str:
+        return self.cards[int(self.card_idxs[self.row_of(user_id)])]
+
+    def is_admin(self, user_id: int) -> bool:
+        """判断群成员是否为管理员（群主也视为管理员）
+
+        :param user_id: 群成员 qq 号
+        :return: 是否为管理员，不在名单中时为假
+        """
+        row = self._index.get(user_id)
+        return row is not None and bool(self.roles[row] <= _ROLE_CODES["admin"])
+
+    def filter(
+        self,
+        roles: Iterable[Literal["owner", "admin", "member"]] | None = None,
+        joined_after: int | None = None,
+        joined_before: int | None = None,
+        sent_after: int | None = None,
+        sent_before: int | None = None,
+        min_level: int | None = None,
+        card: str | None = None,
+    ) -> list[int]:
+        """按条件筛选群成员，各条件之间为“与”关系，为空的条件不参与筛选
+
+        时间条件均为 unix 时间戳，区间为左闭右开
+
+        :param roles: 角色为其中之一
+        :param joined_after: 入群时间不早于
+        :param joined_before: 入群时间早于
+        :param sent_after: 最后发言时间不早于
+        :param sent_before: 最后发言时间早于
+        :param min_level: 等级不低于
+        :param card: 群名片等于
+        :return: 符合条件的群成员 qq 号列表，按名单顺序排列
+        """
+        role_codes = None if roles is None else {_ROLE_CODES[r] for r in roles}
+        card_code = None
+        if card is not None:
+            if (card_code := self._card_codes.get(card)) is None:
+                return []
+
+        if self.backend == "numpy":
+            return self._np_filter(
+                role_codes,
+                joined_after,
+                joined_before,
+                sent_after,
+                sent_before,
+                min_level,
+                card_code,
+            )
+
+        # 逐列收窄候选行，每个条件只在上一轮留下的行上比较
+        rows: Sequence[int] = range(len(self.raw))
+        if role_codes is not None:
+            role_col = self.roles
+            rows = [i for i in rows if role_col[i] in role_codes]
+        if card_code is not None:
+            card_col = self.card_idxs
+            rows = [i for i in rows if card_col[i] == card_code]
+        for col, low, high in (
+            (self.join_times, joined_after, joined_before),
+            (self.last_sent_times, sent_after, sent_before),
+            (self.levels, min_level, None),
+        ):
+            if low is not None:
+                rows = [i for i in rows if col[i] >= low]
+            if high is not None:
+                rows = [i for i in rows if col[i] < high]
+
+        user_ids = self.user_ids
+        return [user_ids[i] for i in rows]
+
+    def _np_filter(
+        self,
+        role_codes: set[int] | None,
+        joined_after: int | None,
+        joined_before: int | None,
+        sent_after: int | None,
+        sent_before: int | None,
+        min_level: int | None,
+        card_code: int | None,
+    ) -> list[int]:
+        import numpy as np
+
+        mask = np.ones(len(self), dtype=bool)
+        if role_codes is not None:
+            mask &= np.isin(self.roles, list(role_codes))
+        if card_code is not None:
+            mask &= self.card_idxs == card_code
+        if joined_after is not None:
+            mask &= self.join_times >= joined_after
+        if joined_before is not None:
+            mask &= self.join_times < joined_before
+        if sent_after is not None:
+            mask &= self.last_sent_times >= sent_after
+        if sent_before is not None:
+            mask &= self.last_sent_times < sent_before
+        if min_level is not None:
+            mask &= self.levels >= min_level
+        return cast(list[int], self.user_ids[mask].tolist())
+
+    def admins(self) -> list[int]:
+        """获取所有管理员（包括群主）
+
+        :return: 管理员 qq 号列表
+        """
+        return self.filter(roles=("owner", "admin"))
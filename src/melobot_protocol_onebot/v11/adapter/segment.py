@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-import base64
+import asyncio
 import json
 import re
 import warnings
@@ -10,6 +10,7 @@ from itertools import chain, zip_longest
 from typing import (
     Annotated,
     Any,
+    Callable,
     Generic,
     Literal,
     Match,
@@ -20,12 +21,12 @@ from typing import (
     overload,
 )
 
-from beartype.door import is_subhint
 from melobot.adapter import content as mbcontent
 from pydantic import (
     AnyHttpUrl,
     AnyUrl,
     BaseModel,
+    ConfigDict,
     Discriminator,
     Tag,
     UrlConstraints,
@@ -34,6 +35,7 @@ from pydantic import (
 from typing_extensions import NotRequired, Self, TypedDict, TypeVar
 
 from ..const import T, V
+from .media import MediaCache, encode_base64, encode_base64_async
 
 MediaUrl: TypeAlias = Annotated[
     AnyUrl, UrlConstraints(allowed_schemes=["http", "https", "file", "base64"])
@@ -163,9 +165,7 @@ def _segment_to_cq(type: str, data: dict[str, Any]) -> str:
 
 
 def base64_encode(data: bytes) -> str:
-    code = "base64://"
-    code += base64.b64encode(data).decode("utf-8")
-    return code
+    return encode_base64(data)
 
 
 def segs_to_contents(message: list[Segment]) -> list[mbcontent.Content]:
@@ -209,7 +209,17 @@ def segs_to_contents(message: list[Segment]) -> list[mbcontent.Content]:
     return contents
 
 
-def contents_to_segs(contents: list[mbcontent.Content]) -> list[Segment]:
+_B64_CONTENT_TYPES = (
+    mbcontent.ImageContent,
+    mbcontent.VoiceContent,
+    mbcontent.AudioContent,
+    mbcontent.VideoContent,
+)
+
+
+def _contents_to_segs(
+    contents: list[mbcontent.Content], encoder: Callable[[bytes], str]
+) -> list[Segment]:
     segments: list[Segment] = []
     for c in contents:
         if isinstance(c, mbcontent.TextContent):
@@ -217,28 +227,28 @@ def contents_to_segs(contents: list[mbcontent.Content]) -> list[Segment]:
 
         elif isinstance(c, mbcontent.ImageContent):
             if c.val:
-                file = base64_encode(c.val)
+                file = encoder(c.val)
                 segments.append(ImageSendSegment(file=file, cache=0))
             else:
                 segments.append(ImageSendSegment(file=cast(str, c.url), cache=0))
 
         elif isinstance(c, mbcontent.VoiceContent):
             if c.val:
-                file = base64_encode(c.val)
+                file = encoder(c.val)
                 segments.append(RecordSendSegment(file=file, cache=0))
             else:
                 segments.append(RecordSendSegment(file=cast(str, c.url), cache=0))
 
         elif isinstance(c, mbcontent.AudioContent):
             if c.val:
-                file = base64_encode(c.val)
+                file = encoder(c.val)
                 segments.append(RecordSendSegment(file=file, cache=0))
             else:
                 segments.append(RecordSendSegment(file=cast(str, c.url), cache=0))
 
         elif isinstance(c, mbcontent.VideoContent):
             if c.val:
-                file = base64_encode(c.val)
+                file = encoder(c.val)
                 segments.append(VideoSendSegment(file=file, cache=0))
             else:
                 segments.append(VideoSendSegment(file=cast(str, c.url), cache=0))
@@ -266,9 +276,58 @@ def contents_to_segs(contents: list[mbcontent.Content]) -> list[Segment]:
     return segments
 
 
+def contents_to_segs(
+    contents: list[mbcontent.Content], cache: MediaCache | None = None
+) -> list[Segment]:
+    return _contents_to_segs(contents, cache.encode if cache else base64_encode)
+
+
+async def contents_to_segs_async(
+    contents: list[mbcontent.Content], cache: MediaCache | None = None
+) -> list[Segment]:
+    """与 :func:`contents_to_segs` 相同，但多媒体数据的编码不在事件循环中进行"""
+    raws = [
+        c.val
+        for c in contents
+        if isinstance(c, _B64_CONTENT_TYPES) and isinstance(c.val, bytes) and c.val
+    ]
+    encoder = cache.encode_async if cache else encode_base64_async
+    codes = await asyncio.gather(*(encoder(raw) for raw in raws))
+    table = {id(raw): code for raw, code in zip(raws, codes)}
+    return _contents_to_segs(contents, lambda raw: table[id(raw)])
+
+
+class _Model(BaseModel):
+    """消息段、事件与回应的数据模型基类
+
+    校验器推迟到模型首次使用时才构建，而不是在导入时为所有模型构建，
+    只用到少数几种模型的进程因此不必承担其余模型的构建开销。可通过 :func:`build_models` 预先构建
+    """
+
+    model_config = ConfigDict(defer_build=True)
+
+
+def build_models() -> int:
+    """预先构建所有已定义的数据模型的校验器
+
+    适合在启动阶段或派生工作进程前调用，以免首个事件承担构建开销
+
+    :return: 本次构建的模型数
+    """
+    num = 0
+    pending = list(_Model.__subclasses__())
+    while pending:
+        model = pending.pop()
+        pending.extend(model.__subclasses__())
+        if not model.__pydantic_complete__:
+            model.model_rebuild(force=True)
+            num += 1
+    return num
+
+
 class Segment(Generic[_SegTypeT, _SegDataT]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: str
         data: dict
 
@@ -286,6 +345,8 @@ class Segment(Generic[_SegTypeT, _SegDataT]):
     def add_type(
         cls, seg_type_hint: type[T], seg_data_hint: type[V]
     ) -> type[_CustomSegment[T, V]]:  # type: ignore[type-var]
+        from beartype.door import is_subhint
+
         if not is_subhint(seg_type_hint, Literal):
             raise ValueError("新消息段的类型标注必须为 Literal")
         if not is_subhint(seg_data_hint, TypedDict):
@@ -319,6 +380,7 @@ class Segment(Generic[_SegTypeT, _SegDataT]):
             {
                 "Model": create_model(
                     type_dataname,
+                    __base__=_Model,
                     type=(seg_type_hint, ...),
                     data=(seg_data_hint, ...),
                 ),
@@ -388,7 +450,7 @@ class _TextData(TypedDict):
 
 class TextSegment(Segment[Literal["text"], _TextData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["text"]
         data: _TextData
 
@@ -412,7 +474,7 @@ class _FaceData(TypedDict):
 
 class FaceSegment(Segment[Literal["face"], _FaceData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["face"]
         data: _FaceData
 
@@ -440,7 +502,7 @@ class _ImageRecvData(TypedDict):
 
 class ImageSegment(Segment[Literal["image"], _ImageSendData | _ImageRecvData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["image"]
         data: _ImageSendData | _ImageRecvData
 
@@ -522,7 +584,7 @@ class _RecordRecvData(TypedDict):
 
 class RecordSegment(Segment[Literal["record"], _RecordSendData | _RecordRecvData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["record"]
         data: _RecordSendData | _RecordRecvData
 
@@ -600,7 +662,7 @@ class _VideoRecvData(TypedDict):
 
 class VideoSegment(Segment[Literal["video"], _VideoSendData | _VideoRecvData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["video"]
         data: _VideoSendData | _VideoRecvData
 
@@ -657,7 +719,7 @@ class _AtData(TypedDict):
 
 class AtSegment(Segment[Literal["at"], _AtData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["at"]
         data: _AtData
 
@@ -674,7 +736,7 @@ class _RpsData(TypedDict): ...
 
 class RpsSegment(Segment[Literal["rps"], _RpsData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["rps"]
         data: _RpsData
 
@@ -691,7 +753,7 @@ class _DictData(TypedDict): ...
 
 class DiceSegment(Segment[Literal["dice"], _DictData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["dice"]
         data: _DictData
 
@@ -708,7 +770,7 @@ class _ShakeData(TypedDict): ...
 
 class ShakeSegment(Segment[Literal["shake"], _ShakeData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["shake"]
         data: _ShakeData
 
@@ -733,7 +795,7 @@ class _PokeRecvData(TypedDict):
 
 class PokeSegment(Segment[Literal["poke"], _PokeSendData | _PokeRecvData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["poke"]
         data: _PokeSendData | _PokeRecvData
 
@@ -775,7 +837,7 @@ class _AnonymousData(TypedDict):
 
 class AnonymousSegment(Segment[Literal["anonymous"], _AnonymousData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["anonymous"]
         data: _AnonymousData
 
@@ -798,7 +860,7 @@ class _ShareData(TypedDict):
 
 class ShareSegment(Segment[Literal["share"], _ShareData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["share"]
         data: _ShareData
 
@@ -831,7 +893,7 @@ class _ContactGroupData(TypedDict):
 
 class ContactSegment(Segment[Literal["contact"], _ContactFriendData | _ContactGroupData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["contact"]
         data: _ContactFriendData | _ContactGroupData
 
@@ -872,7 +934,7 @@ class _LocationData(TypedDict):
 
 class LocationSegment(Segment[Literal["location"], _LocationData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["location"]
         data: _LocationData
 
@@ -911,7 +973,7 @@ class _MusicCustomData(TypedDict):
 
 class MusicSegment(Segment[Literal["music"], _MusicData | _MusicCustomData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["music"]
         data: _MusicData | _MusicCustomData
 
@@ -982,7 +1044,7 @@ class _ReplyData(TypedDict):
 
 class ReplySegment(Segment[Literal["reply"], _ReplyData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["reply"]
         data: _ReplyData
 
@@ -1000,7 +1062,7 @@ class _ForwardData(TypedDict):
 
 class ForwardSegment(Segment[Literal["forward"], _ForwardData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["forward"]
         data: _ForwardData
 
@@ -1043,7 +1105,7 @@ class NodeSegment(
     ]
 ):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["node"]
         data: Annotated[
             Annotated[_NodeReferData, Tag("0")]
@@ -1156,7 +1218,7 @@ class _XmlData(TypedDict):
 
 class XmlSegment(Segment[Literal["xml"], _XmlData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["xml"]
         data: _XmlData
 
@@ -1174,7 +1236,7 @@ class _JsonData(TypedDict):
 
 class JsonSegment(Segment[Literal["json"], _JsonData]):
 
-    class Model(BaseModel):
+    class Model(_Model):
         type: Literal["json"]
         data: _JsonData
 
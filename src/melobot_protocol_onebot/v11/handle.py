@@ -1,15 +1,20 @@
+import asyncio
+import time
 from functools import wraps
-from typing import Callable, cast
+from typing import Callable, Hashable, Literal, cast
 
 from melobot.ctx import Context
 from melobot.di import Depends, inject_deps
 from melobot.handle import Flow, get_event, no_deps_node
+from melobot.log import get_logger
 from melobot.typ import AsyncCallable, HandleLevel, LogicMode
 from melobot.utils import singleton
 
 from .adapter.event import Event, MessageEvent, MetaEvent, NoticeEvent, RequestEvent
+from .metrics import HandleMetrics, MetricsRegistry
 from .utils import check, match
 from .utils.abc import Checker, Matcher, ParseArgs, Parser
+from .utils.check import _send_text
 from .utils.parse import CmdArgFormatter, CmdParser
 
 
@@ -27,6 +32,26 @@ class Args(Depends):
 
 
 FlowDecorator = Callable[[AsyncCallable[..., bool | None]], Flow]
+OverflowPolicy = Literal["queue", "drop", "busy"]
+_BUSY_REPLY = "处理繁忙，请稍后再试"
+
+_METRICS: HandleMetrics | None = None
+
+
+def _session_key(event: Event) -> Hashable:
+    # 群事件按群，其他事件按用户，都没有时共用同一个键
+    if (gid := getattr(event, "group_id", None)) is not None:
+        return ("group", gid)
+    return ("user", getattr(event, "user_id", None))
+
+
+def set_handle_metrics(registry: MetricsRegistry | None) -> None:
+    """开启或关闭处理流的指标收集，对所有处理流生效
+
+    :param registry: 指标注册表，为空则关闭
+    """
+    global _METRICS
+    _METRICS = None if registry is None else HandleMetrics(registry)
 
 
 def on_event(
@@ -36,7 +61,30 @@ def on_event(
     priority: HandleLevel = HandleLevel.NORMAL,
     block: bool = False,
     temp: bool = False,
+    concurrency: int | None = None,
+    timeout: float | None = None,
+    overflow: OverflowPolicy = "queue",
+    busy_reply: str = _BUSY_REPLY,
+    busy_cooldown: float = 10,
 ) -> FlowDecorator:
+    """绑定一个处理事件的处理流
+
+    :param checker: 检查器
+    :param matcher: 匹配器，只对消息事件生效
+    :param parser: 解析器，只对消息事件生效
+    :param priority: 处理流优先级
+    :param block: 是否阻断向更低优先级处理流的传播
+    :param temp: 是否为临时处理流（只处理一次）
+    :param concurrency: 同时执行的处理函数数上限，为空则不限制
+    :param timeout: 处理函数的执行时限（秒），超时则取消执行，为空则不限制
+    :param overflow: 并发已满时的策略。`queue` 排队等待，`drop` 直接丢弃，
+        `busy` 丢弃并回复 `busy_reply`
+    :param busy_reply: `busy` 策略下回复的文本
+    :param busy_cooldown: 同一会话（群聊或私聊）中两次 `busy` 回复的最小间隔（秒），其间被拒绝的事件不回复
+    :return: 处理流装饰器
+    """
+    if concurrency is not None and concurrency < 1:
+        raise ValueError("处理流的并发上限必须为正整数")
 
     def flow_getter(func: AsyncCallable[..., bool | None]) -> Flow:
         if not isinstance(checker, Checker) and callable(checker):
@@ -44,10 +92,52 @@ def on_event(
         else:
             _checker = cast(Checker, checker)
 
+        # 指标标签与日志使用完整的限定名，不同模块中的同名处理函数不会混在一起
+        name = f"{func.__module__}.{getattr(func, '__qualname__', func)}"
         func = inject_deps(func)
+        # 每个处理流独立的隔舱：并发数只由信号量限制，超时只作用于处理函数本身，不包括排队时间
+        slots = None if concurrency is None else asyncio.Semaphore(concurrency)
+        busy_gate = (
+            check.CooldownChecker(busy_cooldown, _session_key)
+            if slots is not None and overflow == "busy"
+            else None
+        )
+
+        async def _run() -> bool | None:
+            if timeout is None:
+                return await func()
+            try:
+                return await asyncio.wait_for(func(), timeout)
+            except asyncio.TimeoutError:
+                if (metrics := _METRICS) is not None:
+                    metrics.limits(name)[2].inc()
+                get_logger().warning(f"处理流 {name} 执行超过 {timeout}s，已取消执行")
+                return None
+
+        async def _limited_run(event: Event) -> bool | None:
+            if slots is None:
+                return await _run()
+
+            if slots.locked():
+                metrics = _METRICS
+                if overflow != "queue":
+                    if metrics is not None:
+                        metrics.limits(name)[1].inc()
+                    if busy_gate is not None and await busy_gate.check(event):
+                        await _send_text(busy_reply)
+                    return None
+                if metrics is not None:
+                    metrics.limits(name)[0].inc()
+
+            async with slots:
+                return await _run()
 
         @wraps(func)
         async def _node() -> bool | None:
+            if (metrics := _METRICS) is not None:
+                calls, hits, seconds = metrics.flow(name)
+                calls.inc()
+
             event = cast(Event, get_event())
             status = await _checker.check(event)
             if not status:
@@ -68,7 +158,15 @@ def on_event(
 
             event.spread = not block
             with ArgsCtx().in_ctx(p_args):
-                return await func()
+                if metrics is None:
+                    return await _limited_run(event)
+
+                hits.inc()
+                start = time.perf_counter()
+                try:
+                    return await _limited_run(event)
+                finally:
+                    seconds.observe(time.perf_counter() - start)
 
         n = no_deps_node(_node)
         n.name = func.__name__
@@ -104,6 +202,11 @@ def on_message(
     priority: HandleLevel = HandleLevel.NORMAL,
     block: bool = False,
     temp: bool = False,
+    concurrency: int | None = None,
+    timeout: float | None = None,
+    overflow: OverflowPolicy = "queue",
+    busy_reply: str = _BUSY_REPLY,
+    busy_cooldown: float = 10,
 ) -> FlowDecorator:
     return on_event(
         _checker_join(lambda e: e.is_message(), checker),  # type: ignore[arg-type]
@@ -112,6 +215,11 @@ def on_message(
         priority,
         block,
         temp,
+        concurrency,
+        timeout,
+        overflow,
+        busy_reply,
+        busy_cooldown,
     )
 
 
@@ -144,6 +252,11 @@ def on_command(
     priority: HandleLevel = HandleLevel.NORMAL,
     block: bool = False,
     temp: bool = False,
+    concurrency: int | None = None,
+    timeout: float | None = None,
+    overflow: OverflowPolicy = "queue",
+    busy_reply: str = _BUSY_REPLY,
+    busy_cooldown: float = 10,
 ) -> FlowDecorator:
     return on_message(
         checker,
@@ -152,6 +265,11 @@ def on_command(
         priority,
         block,
         temp,
+        concurrency,
+        timeout,
+        overflow,
+        busy_reply,
+        busy_cooldown,
     )
 
 
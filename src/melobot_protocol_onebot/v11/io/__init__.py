@@ -1,4 +1,54 @@
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
 from .base import BaseIO
-from .duplex_http import HttpIO
-from .forward import ForwardWebSocketIO
-from .reverse import ReverseWebSocketIO
+from .dedup import EventDeduplicator
+from .journal import EventJournal
+from .quarantine import ErrorQuarantine
+from .trace import PacketTrace
+
+if TYPE_CHECKING:
+    from .duplex_http import HttpIO
+    from .failover import FailoverIO
+    from .forward import ForwardWebSocketIO
+    from .hub import Hub, HubWorkerIO
+    from .record import RecordIO, ReplayIO
+    from .reverse import ReverseWebSocketIO
+    from .workers import SharedRateLimit, run_workers
+    from .ws_options import WSTransportOptions
+
+# 各传输方式依赖的 aiohttp, websockets 等库导入较慢，因此只在首次访问对应的类时才导入其模块
+_LAZY_ATTRS = {
+    "HttpIO": ".duplex_http",
+    "FailoverIO": ".failover",
+    "ForwardWebSocketIO": ".forward",
+    "Hub": ".hub",
+    "HubWorkerIO": ".hub",
+    "RecordIO": ".record",
+    "ReplayIO": ".record",
+    "ReverseWebSocketIO": ".reverse",
+    "SharedRateLimit": ".workers",
+    "run_workers": ".workers",
+    "WSTransportOptions": ".ws_options",
+}
+
+__all__ = [
+    "BaseIO",
+    "EventDeduplicator",
+    "EventJournal",
+    "ErrorQuarantine",
+    "PacketTrace",
+    *_LAZY_ATTRS,
+]
+
+
+def __getattr__(name: str) -> Any:
+    if (mod_name := _LAZY_ATTRS.get(name)) is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    obj = getattr(import_module(mod_name, __name__), name)
+    globals()[name] = obj
+    return obj
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -1,20 +1,132 @@
+from asyncio import Future, Queue
+from functools import partial
+from typing import Any, Callable, Iterable
+
+from melobot.exceptions import IOError
 from melobot.io import AbstractIOSource
 from melobot.log import GenericLogger, get_logger
 from melobot.typ import abstractmethod
 
 from ..const import PROTOCOL_IDENTIFIER
+from ..metrics import IOMetrics
+from ..offload import Offloader
+from .dedup import EventDeduplicator
+from .journal import EventJournal
 from .packet import EchoPacket, InPacket, OutPacket
+from .quarantine import ErrorQuarantine
+from .trace import PacketTrace, debug_enabled
 
 
 class BaseIO(AbstractIOSource[InPacket, OutPacket, EchoPacket]):
     def __init__(self, cd_time: float) -> None:
         super().__init__(PROTOCOL_IDENTIFIER)
         self.cd_time = cd_time
+        self._metrics: IOMetrics | None = None
+        self._journal: EventJournal | None = None
+        self._dedup: EventDeduplicator | None = None
+        self._offload: Offloader | None = None
+        self._trace: PacketTrace | None = None
+        self._quarantine = ErrorQuarantine()
+        self._echo_table: dict[str, tuple[str, Future[EchoPacket]]] = {}
+        self._disconnect_callbacks: list[Callable[[list[OutPacket]], None]] = []
 
     @property
     def logger(self) -> GenericLogger:
         return get_logger()
 
+    @property
+    def trace(self) -> PacketTrace | None:
+        """原始数据包追踪器，未指定且启动时未开启 DEBUG 日志则为空"""
+        return self._trace
+
+    def live(self) -> bool:
+        """IO 源当前能否输出
+
+        面向连接的 IO 源在连接断开后即不可输出，即使尚未关闭（:meth:`opened` 仍为真）
+
+        :return: 能否输出
+        """
+        return self.opened()
+
+    def on_disconnect(self, callback: Callable[[list[OutPacket]], None]) -> None:
+        """注册连接断开时的回调
+
+        断开时尚未发送的数据包中，等待回应的会以 :class:`.IOError` 通知等待方，
+        其余（不等待回应的）数据包作为回调的参数，由回调决定是否转到其他 IO 源发送
+
+        :param callback: 回调
+        """
+        self._disconnect_callbacks.append(callback)
+
+    def _disconnected(self, pending: Iterable[OutPacket]) -> None:
+        # 未发送的数据包从未到达实现端，可以安全地转到其他 IO 源发送
+        orphans: list[OutPacket] = []
+        for packet in pending:
+            if packet.echo_id is None:
+                orphans.append(packet)
+            elif (item := self._pop_echo(packet.echo_id)) is not None:
+                item[1].set_exception(IOError(f"{self} 的连接已断开，行为未发送"))
+        if not orphans:
+            return
+        if not self._disconnect_callbacks:
+            self.logger.warning(
+                f"{self} 的连接已断开，{len(orphans)} 个未发送的行为被丢弃"
+            )
+        for callback in self._disconnect_callbacks:
+            callback(orphans)
+
+    @staticmethod
+    def _drain(buf: Queue[OutPacket]) -> list[OutPacket]:
+        packets = []
+        while not buf.empty():
+            packets.append(buf.get_nowait())
+        return packets
+
+    def discard_echo(self, echo_id: str) -> bool:
+        """丢弃一个等待中的行为回应
+
+        等待回应的一方超时或被取消时调用，此后迟到的回应会被直接忽略
+
+        :param echo_id: 行为的 echo 标识
+        :return: 是否存在等待该回应的记录
+        """
+        item = self._echo_table.pop(echo_id, None)
+        if item is None:
+            return False
+        if not item[1].done():
+            item[1].cancel()
+        return True
+
+    def _pop_echo(self, echo_id: str) -> tuple[str, Future[EchoPacket]] | None:
+        # 等待方已超时或被取消时，迟到的回应没有接收者，返回空值由调用方忽略
+        item = self._echo_table.pop(echo_id, None)
+        if item is None or item[1].done():
+            return None
+        return item
+
+    def _in_packet(self, raw: dict[str, Any]) -> InPacket:
+        # 启用事件日志时先写入日志，适配器分发完毕后通过输入包的 ack 回调标记完成
+        if self._journal is None:
+            return InPacket(time=raw["time"], data=raw)
+        seq = self._journal.append(raw)
+        return InPacket(time=raw["time"], data=raw, ack=partial(self._journal.ack, seq))
+
+    def _recover_journal(self) -> list[InPacket]:
+        if self._journal is None:
+            return []
+        return [
+            InPacket(time=raw["time"], data=raw, ack=partial(self._journal.ack, seq))
+            for seq, raw in self._journal.recover()
+        ]
+
+    def _init_trace(self) -> None:
+        # 未指定追踪器时，仅在日志器输出 DEBUG 日志时创建只记录日志的追踪器，保持原有的调试日志行为。
+        # 日志等级在启动时检查一次，此后热路径上只判断追踪器是否存在
+        if self._trace is not None:
+            self._trace.refresh()
+        elif debug_enabled(self.logger):
+            self._trace = PacketTrace(buffer_size=0)
+
     @abstractmethod
     async def open(self) -> None:
         raise NotImplementedError
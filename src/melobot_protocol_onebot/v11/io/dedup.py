@@ -0,0 +1,82 @@
+import json
+import time
+from typing import Any, Hashable
+
+from ..metrics import MetricsRegistry
+
+
+class EventDeduplicator:
+    """上报事件去重器
+
+    连接抖动重连，或同一账号接入多个 IO 源时，同一事件可能被上报多次。
+    多个 IO 源传入同一个去重器实例即可跨 IO 源去重。
+
+    带有 `message_id` 的事件以 `(self_id, post_type, message_id)` 为键，其他事件以内容的哈希为键。
+    键存储在两代轮换的集合中：当前代存满 `max_size` 个键或存在超过 `ttl` 秒后，成为上一代，
+    原来的上一代被丢弃。因此内存占用不超过 `2 * max_size` 个键，一个键至少被记住
+    `min(ttl, 填满一代所需时间)` 秒
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300,
+        max_size: int = 100000,
+        metrics: MetricsRegistry | None = None,
+    ) -> None:
+        """初始化一个去重器
+
+        :param ttl: 一代集合的最长存在时间（秒）
+        :param max_size: 一代集合的最大键数
+        :param metrics: 指标注册表，为空则不收集指标
+        """
+        if max_size < 1:
+            raise ValueError("去重器的集合大小必须为正整数")
+        self.ttl = ttl
+        self.max_size = max_size
+        #: 被丢弃的重复事件数
+        self.suppressed = 0
+
+        self._cur: set[Hashable] = set()
+        self._prev: set[Hashable] = set()
+        self._rotated_at = time.monotonic()
+        self._counter = (
+            None
+            if metrics is None
+            else metrics.counter("onebot_io_duplicate_events_total", "被丢弃的重复事件数")
+        )
+
+    def __len__(self) -> int:
+        return len(self._cur) + len(self._prev)
+
+    @staticmethod
+    def key_of(raw: dict[str, Any]) -> Hashable:
+        """计算事件的去重键
+
+        :param raw: 事件的原始字典
+        :return: 去重键
+        """
+        if (msg_id := raw.get("message_id")) is not None:
+            return (raw.get("self_id"), raw.get("post_type"), msg_id)
+        return hash(json.dumps(raw, ensure_ascii=False, sort_keys=True))
+
+    def seen(self, raw: dict[str, Any]) -> bool:
+        """检查事件是否重复，不重复则记录该事件
+
+        :param raw: 事件的原始字典
+        :return: 是否为重复事件
+        """
+        now = time.monotonic()
+        if len(self._cur) >= self.max_size or now - self._rotated_at >= self.ttl:
+            self._prev = self._cur
+            self._cur = set()
+            self._rotated_at = now
+
+        key = self.key_of(raw)
+        if key in self._cur or key in self._prev:
+            self.suppressed += 1
+            if self._counter is not None:
+                self._counter.inc()
+            return True
+
+        self._cur.add(key)
+        return False
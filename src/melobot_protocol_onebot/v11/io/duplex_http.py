@@ -4,14 +4,103 @@ import hmac
 import json
 import time
 from asyncio import Future
+from dataclasses import replace
+from typing import Any, Hashable
 
 import aiohttp
 import aiohttp.log
 import aiohttp.web
 from melobot.log import LogLevel
 
+from ..metrics import IOMetrics, MetricsRegistry
+from ..offload import Offloader
 from .base import BaseIO
+from .dedup import EventDeduplicator
+from .journal import EventJournal
 from .packet import EchoPacket, InPacket, OutPacket
+from .quarantine import ErrorQuarantine, preview_payload
+from .trace import PacketTrace
+from .workers import SharedRateLimit
+
+_SEND_MSG_TYPES = {
+    "send_msg": None,
+    "send_group_msg": "group",
+    "send_private_msg": "private",
+}
+
+
+def _quick_operation(
+    event: dict[str, Any], action_type: str, params: dict[str, Any]
+) -> dict[str, Any] | None:
+    """把针对某事件的行为转换为该事件的快速操作，无法转换时返回空"""
+    post_type = event.get("post_type")
+    if post_type == "request":
+        if params.get("flag") != event.get("flag"):
+            return None
+        if (
+            action_type == "set_friend_add_request"
+            and event.get("request_type") == "friend"
+        ):
+            op = {"approve": params.get("approve", True)}
+            if params.get("remark"):
+                op["remark"] = params["remark"]
+            return op
+        if (
+            action_type == "set_group_add_request"
+            and event.get("request_type") == "group"
+            and params.get("sub_type") == event.get("sub_type")
+        ):
+            op = {"approve": params.get("approve", True)}
+            if params.get("reason"):
+                op["reason"] = params["reason"]
+            return op
+        return None
+
+    if post_type != "message":
+        return None
+    is_group = event.get("message_type") == "group"
+    if action_type in _SEND_MSG_TYPES:
+        if (mtype := _SEND_MSG_TYPES[action_type]) is None:
+            mtype = params.get("message_type")
+        if mtype is None:
+            mtype = "group" if params.get("group_id") is not None else "private"
+        if is_group:
+            if mtype != "group" or params.get("group_id") != event.get("group_id"):
+                return None
+        elif mtype != "private" or params.get("user_id") != event.get("user_id"):
+            return None
+        op = {"reply": params["message"], "auto_escape": params.get("auto_escape", False)}
+        if is_group:
+            # 群消息的快速回复默认会 at 发送者，而普通的发送行为不会
+            op["at_sender"] = False
+        return op
+
+    if not is_group:
+        return None
+    if action_type == "delete_msg":
+        return (
+            {"delete": True}
+            if params.get("message_id") == event.get("message_id")
+            else None
+        )
+    if params.get("group_id") != event.get("group_id") or params.get(
+        "user_id"
+    ) != event.get("user_id"):
+        return None
+    if action_type == "set_group_kick" and not params.get("reject_add_request"):
+        return {"kick": True}
+    if action_type == "set_group_ban" and params.get("duration", 0) > 0:
+        return {"ban": True, "ban_duration": params["duration"]}
+    return None
+
+
+class _QuickSlot:
+    __slots__ = ("op", "dispatched")
+
+    def __init__(self) -> None:
+        # 已折叠的快速操作，多个互不冲突的操作合并为一个
+        self.op: dict[str, Any] = {}
+        self.dispatched = asyncio.Event()
 
 
 class HttpIO(BaseIO):
@@ -24,6 +113,15 @@ class HttpIO(BaseIO):
         secret: str | None = None,
         access_token: str | None = None,
         cd_time: float = 0.2,
+        metrics: MetricsRegistry | None = None,
+        journal: EventJournal | None = None,
+        dedup: EventDeduplicator | None = None,
+        offload: Offloader | None = None,
+        quick_reply: float | None = None,
+        reuse_port: bool = False,
+        rate_limit: SharedRateLimit | None = None,
+        trace: PacketTrace | None = None,
+        quarantine: ErrorQuarantine | None = None,
     ) -> None:
         super().__init__(cd_time)
         self.onebot_url = f"http://{onebot_host}:{onebot_port}"
@@ -33,21 +131,43 @@ class HttpIO(BaseIO):
         self.client_session: aiohttp.ClientSession
         self.secret = secret
         self.access_token = access_token
+        self.quick_reply = quick_reply
+        self.reuse_port = reuse_port
+        self.rate_limit = rate_limit
+        self._trace = trace
+        if quarantine is not None:
+            self._quarantine = quarantine
 
         self._tasks: list[asyncio.Task] = []
         self._in_buf: asyncio.Queue[InPacket] = asyncio.Queue()
         self._out_buf: asyncio.Queue[OutPacket] = asyncio.Queue()
-        self._echo_table: dict[str, tuple[str, Future[EchoPacket]]] = {}
         self._opened = asyncio.Event()
         self._pre_send_time = time.time_ns()
+        self._journal = journal
+        self._dedup = dedup
+        self._offload = offload
+        self._quick_slots: dict[Hashable, _QuickSlot] = {}
+        self._metrics_registry = metrics
+        if metrics is not None:
+            self._metrics = IOMetrics(
+                metrics,
+                f"http:{serve_host}:{serve_port}",
+                self._in_buf,
+                self._out_buf,
+                self._echo_table,
+            )
 
     async def _respond(self, request: aiohttp.web.Request) -> aiohttp.web.Response:
         if not self._opened.is_set():
             self._opened.set()
+            if self._metrics is not None:
+                self._metrics.connects.inc()
 
         data = await request.content.read()
         if data == b"":
             return aiohttp.web.Response(status=400)
+        if self._trace is not None:
+            self._trace.record("in", data)
 
         if self.secret is not None:
             sign = hmac.new(self.secret.encode(), data, "sha1").hexdigest()
@@ -58,34 +178,99 @@ class HttpIO(BaseIO):
                 self.logger.generic_obj("试图上报的数据", data, level=LogLevel.ERROR)
                 return aiohttp.web.Response(status=403)
 
+        resp = aiohttp.web.Response(status=204)
         try:
-            raw = json.loads(data.decode())
-            self.logger.generic_obj("收到上报，未格式化的字典", raw, level=LogLevel.DEBUG)
-            await self._in_buf.put(InPacket(time=raw["time"], data=raw))
-        except Exception:
-            self.logger.exception("OneBot v11 HTTP IO 源输入异常")
-            self.logger.generic_obj("异常点局部变量", locals(), level=LogLevel.ERROR)
-            self.logger.generic_obj("异常点的上报数据", raw, level=LogLevel.ERROR)
+            if self._offload is None:
+                raw = json.loads(data.decode())
+            else:
+                raw = await self._offload.loads(data)
+            if self._metrics is not None:
+                self._metrics.events.inc()
+            if self._dedup is not None and self._dedup.seen(raw):
+                return resp
+            packet = self._in_packet(raw)
+            if self.quick_reply is None or raw["post_type"] not in ("message", "request"):
+                await self._in_buf.put(packet)
+            elif (op := await self._wait_quick_operation(raw, packet)) is not None:
+                resp = aiohttp.web.json_response(op)
+        except Exception as e:
+            if self._metrics is not None:
+                self._metrics.input_errors.inc()
+            if self._quarantine.admit(e, data, f"http:{self.host}:{self.port}"):
+                self.logger.exception("OneBot v11 HTTP IO 源输入异常")
+                self.logger.generic_obj(
+                    "异常点的上报数据", preview_payload(data), level=LogLevel.ERROR
+                )
+            if self._trace is not None:
+                self._trace.on_error()
 
         finally:
-            return (  # pylint: disable=return-in-finally,lost-exception
-                aiohttp.web.Response(status=204)
-            )
+            return resp  # pylint: disable=return-in-finally,lost-exception
+
+    async def _wait_quick_operation(
+        self, raw: dict[str, Any], packet: InPacket
+    ) -> dict[str, Any] | None:
+        # 快速操作只绑定到触发行为的事件，事件分发完毕（输入包被确认）即响应，最多等待 quick_reply 秒
+        key = EventDeduplicator.key_of(raw)
+        slot = self._quick_slots[key] = _QuickSlot()
+        ack = packet.ack
+
+        def dispatched() -> None:
+            if ack is not None:
+                ack()
+            slot.dispatched.set()
+
+        try:
+            await self._in_buf.put(replace(packet, ack=dispatched))
+            try:
+                await asyncio.wait_for(slot.dispatched.wait(), self.quick_reply)
+                # 行为在独立的任务中执行，让出一次，使分发结束前已发起的行为也能折叠
+                await asyncio.sleep(0)
+            except asyncio.TimeoutError:
+                pass
+        finally:
+            if self._quick_slots.get(key) is slot:
+                del self._quick_slots[key]
+        return slot.op or None
+
+    def _fold_quick_operation(self, packet: OutPacket) -> bool:
+        if packet.trigger is None or not self._quick_slots:
+            return False
+        slot = self._quick_slots.get(EventDeduplicator.key_of(packet.trigger))
+        if slot is None:
+            return False
+        op = _quick_operation(packet.trigger, packet.action_type, packet.action_params)
+        # 同一响应中每种快速操作只能出现一次，冲突的行为照常发送
+        if op is None or op.keys() & slot.op.keys():
+            return False
+        slot.op.update(op)
+        return True
 
     async def _output_loop(self) -> None:
         while True:
             try:
                 out_packet = await self._out_buf.get()
-                wait_time = self.cd_time - ((time.time_ns() - self._pre_send_time) / 1e9)
+                if self.rate_limit is None:
+                    wait_time = self.cd_time - (
+                        (time.time_ns() - self._pre_send_time) / 1e9
+                    )
+                else:
+                    wait_time = self.rate_limit.reserve()
+                if self._metrics is not None and wait_time > 0:
+                    self._metrics.cd_wait.observe(wait_time)
                 await asyncio.sleep(wait_time)
                 asyncio.create_task(self._handle_output(out_packet))
                 self._pre_send_time = time.time_ns()
             except Exception:
+                if self._metrics is not None:
+                    self._metrics.output_errors.inc()
                 self.logger.exception("OneBot v11 HTTP IO 源输出异常")
                 self.logger.generic_obj("异常点局部变量", locals(), level=LogLevel.ERROR)
                 self.logger.generic_obj(
                     "异常点的发送数据", out_packet.data, level=LogLevel.ERROR
                 )
+                if self._trace is not None:
+                    self._trace.on_error()
 
     async def _handle_output(self, packet: OutPacket) -> None:
         try:
@@ -93,6 +278,8 @@ class HttpIO(BaseIO):
             if self.access_token is not None:
                 headers = {"Authorization": f"Bearer {self.access_token}"}
 
+            if self._trace is not None:
+                self._trace.record("out", packet.data)
             http_resp = await self.client_session.post(
                 f"{self.onebot_url}/{packet.action_type}",
                 json=packet.action_params,
@@ -101,11 +288,13 @@ class HttpIO(BaseIO):
             if packet.echo_id is None:
                 return
 
+            # HTTP API 的响应与请求一一对应，实现端不会回传 echo，直接按请求的 echo 匹配
             raw = await http_resp.json()
-            if (echo_id := raw["echo"]) is None:
+            if (item := self._pop_echo(packet.echo_id)) is None:
                 return
-
-            action_type, fut = self._echo_table.pop(echo_id)
+            action_type, fut = item
+            if self._metrics is not None:
+                self._metrics.echoes.inc()
             fut.set_result(
                 EchoPacket(
                     time=int(time.time()),
@@ -116,22 +305,37 @@ class HttpIO(BaseIO):
                 )
             )
         except aiohttp.ContentTypeError:
+            if self._metrics is not None:
+                self._metrics.output_errors.inc()
             self.logger.error(
                 "OneBot v11 HTTP IO 源无法解析上报数据。可能是 access_token 未配置或错误"
             )
         except Exception:
+            if self._metrics is not None:
+                self._metrics.output_errors.inc()
             self.logger.exception("OneBot v11 HTTP IO 源输出异常")
             self.logger.generic_obj("异常点局部变量", locals(), level=LogLevel.ERROR)
             self.logger.generic_obj("异常点的发送数据", packet.data, level=LogLevel.ERROR)
+            if self._trace is not None:
+                self._trace.on_error()
 
     async def open(self) -> None:
+        self._init_trace()
+        for packet in self._recover_journal():
+            self._in_buf.put_nowait(packet)
         self.client_session = aiohttp.ClientSession()
         app = aiohttp.web.Application()
         app.add_routes([aiohttp.web.post("/", self._respond)])
+        if self._metrics_registry is not None:
+            app.add_routes(
+                [aiohttp.web.get("/metrics", self._metrics_registry.handle_request)]
+            )
         runner = aiohttp.web.AppRunner(app)
 
         await runner.setup()
-        self.serve_site = aiohttp.web.TCPSite(runner, self.host, self.port)
+        self.serve_site = aiohttp.web.TCPSite(
+            runner, self.host, self.port, reuse_port=self.reuse_port or None
+        )
         await self.serve_site.start()
         self._tasks.append(asyncio.create_task(self._output_loop()))
 
@@ -148,6 +352,9 @@ class HttpIO(BaseIO):
             await self.client_session.close()
             for t in self._tasks:
                 t.cancel()
+            if self._journal is not None:
+                self._journal.close()
+            self._quarantine.close()
 
             self._opened.clear()
             self.logger.info("OneBot v11 HTTP IO 源已停止运行")
@@ -156,10 +363,21 @@ class HttpIO(BaseIO):
         return await self._in_buf.get()
 
     async def output(self, packet: OutPacket) -> EchoPacket:
+        if self._metrics is not None:
+            self._metrics.outputs.inc()
+        # 不需要回应的行为可以折叠进尚未响应的上报请求中，作为快速操作由实现端执行
+        if packet.echo_id is None and self._fold_quick_operation(packet):
+            return EchoPacket(noecho=True)
         await self._out_buf.put(packet)
         if packet.echo_id is None:
             return EchoPacket(noecho=True)
 
         fut: Future[EchoPacket] = Future()
         self._echo_table[packet.echo_id] = (packet.action_type, fut)
-        return await fut
+        if self._metrics is None:
+            return await fut
+
+        start = time.perf_counter()
+        echo = await fut
+        self._metrics.echo_latency.observe(time.perf_counter() - start)
+        return echo
@@ -0,0 +1,231 @@
+import asyncio
+import math
+import time
+from functools import partial
+from typing import Any, Sequence
+
+from melobot.exceptions import IOError
+
+from ..adapter.action import IDEMPOTENT_ACTION_TYPES
+from .base import BaseIO
+from .dedup import EventDeduplicator
+from .packet import EchoPacket, InPacket, OutPacket
+
+
+class _Health:
+    __slots__ = ("latency", "error_rate", "down_until", "outputs", "failures")
+
+    def __init__(self) -> None:
+        self.latency: float | None = None
+        self.error_rate = 0.0
+        self.down_until = 0.0
+        self.outputs = 0
+        self.failures = 0
+
+    def score(self, error_penalty: float) -> float:
+        if self.latency is None:
+            return math.inf
+        return self.latency * (1 + error_penalty * self.error_rate)
+
+
+class FailoverIO(BaseIO):
+    """故障转移 IO 源
+
+    聚合同一账号的多个 IO 源（如正向 WebSocket 为主、HTTP 为备）。所有 IO 源的上报事件合并后去重输入；
+    输出时选择最健康的 IO 源：以回应延迟的指数滑动平均为基础，按出错率加权，尚无测量数据的 IO 源
+    排在有数据的之后，得分相同时按传入顺序。
+
+    输出出错或等待回应超时的 IO 源会暂停使用 `cooldown` 秒。输出出错（IO 源已关闭、连接异常等）时，
+    该行为随即转到下一个可用的 IO 源重新发送；等待回应超时时行为可能已被执行，因此只有幂等的行为
+    （:data:`.IDEMPOTENT_ACTION_TYPES`）会被重新发送，其他行为直接以 :class:`.IOError` 失败。
+    超时或被取消的行为会从原 IO 源中丢弃，迟到的回应将被忽略。
+
+    连接已断开（:meth:`.BaseIO.live` 为假）的 IO 源不会被选中。IO 源断开时尚未发出的行为
+    会转到下一个可用的 IO 源发送
+    """
+
+    def __init__(
+        self,
+        ios: Sequence[BaseIO],
+        echo_timeout: float = 10,
+        cooldown: float = 30,
+        smoothing: float = 0.2,
+        error_penalty: float = 10,
+        dedup: EventDeduplicator | None = None,
+    ) -> None:
+        """初始化一个故障转移 IO 源
+
+        :param ios: 被聚合的 IO 源，按优先级排列
+        :param echo_timeout: 等待单个 IO 源回应的超时时间（秒）
+        :param cooldown: IO 源出错后暂停使用的时间（秒）
+        :param smoothing: 延迟与出错率滑动平均的平滑系数
+        :param error_penalty: 出错率对得分的加权
+        :param dedup: 上报事件去重器，为空则使用默认参数创建
+        """
+        if not ios:
+            raise ValueError("故障转移 IO 源至少需要一个 IO 源")
+        super().__init__(0)
+        self.ios = tuple(ios)
+        self.echo_timeout = echo_timeout
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self.error_penalty = error_penalty
+        self.dedup = EventDeduplicator() if dedup is None else dedup
+
+        self._health = {io: _Health() for io in self.ios}
+        for io in self.ios:
+            io.on_disconnect(partial(self._move_pending, io))
+        self._moving: set[asyncio.Task] = set()
+        self._in_buf: asyncio.Queue[InPacket] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self._ready = asyncio.Event()
+        self._open_fails = 0
+        self._opened = False
+
+    def health(self) -> list[dict[str, Any]]:
+        """获取各 IO 源的健康状况
+
+        :return: 按传入顺序排列的健康状况
+        """
+        now = time.monotonic()
+        return [
+            {
+                "io": io,
+                "opened": io.opened(),
+                "live": io.live(),
+                "latency": h.latency,
+                "error_rate": h.error_rate,
+                "cooling": h.down_until > now,
+                "outputs": h.outputs,
+                "failures": h.failures,
+            }
+            for io, h in self._health.items()
+        ]
+
+    async def _run(self, io: BaseIO) -> None:
+        try:
+            await io.open()
+        except Exception:
+            self.logger.exception(f"故障转移 IO 源中的 {io} 启动失败")
+            self._open_fails += 1
+            if self._open_fails == len(self.ios):
+                self._ready.set()
+            return
+
+        self._ready.set()
+        while True:
+            try:
+                packet = await io.input()
+                if not self.dedup.seen(packet.data):
+                    await self._in_buf.put(packet)
+                elif packet.ack is not None:
+                    # 重复的事件不会被分发，直接在来源 IO 源的事件日志中标记完成
+                    packet.ack()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.logger.exception(f"故障转移 IO 源从 {io} 输入异常")
+
+    async def open(self) -> None:
+        if self._opened:
+            return
+        self._ready.clear()
+        self._open_fails = 0
+        self._tasks = [asyncio.create_task(self._run(io)) for io in self.ios]
+        # 任一 IO 源就绪即可开始工作，其余 IO 源在后台继续启动
+        await self._ready.wait()
+        if self._open_fails == len(self.ios):
+            raise IOError("故障转移 IO 源中的所有 IO 源均启动失败")
+        self._opened = True
+        self.logger.info("OneBot v11 故障转移 IO 源已就绪")
+
+    def opened(self) -> bool:
+        return self._opened
+
+    async def close(self) -> None:
+        if self.opened():
+            for t in (*self._tasks, *self._moving):
+                t.cancel()
+            for io in self.ios:
+                if io.opened():
+                    await io.close()
+            self._opened = False
+            self.logger.info("OneBot v11 故障转移 IO 源已停止运行")
+
+    async def input(self) -> InPacket:
+        return await self._in_buf.get()
+
+    def _choose(self, tried: set[BaseIO]) -> BaseIO | None:
+        now = time.monotonic()
+        candidates = [io for io in self.ios if io not in tried and io.live()]
+        healthy = [io for io in candidates if self._health[io].down_until <= now]
+        # 都在冷却中时，仍然尝试冷却中的 IO 源，而不是直接放弃
+        pool = healthy or candidates
+        if not pool:
+            return None
+        return min(pool, key=lambda io: self._health[io].score(self.error_penalty))
+
+    def _penalize(self, health: _Health) -> None:
+        health.failures += 1
+        health.error_rate += self.smoothing * (1 - health.error_rate)
+        health.down_until = time.monotonic() + self.cooldown
+
+    def _move_pending(self, io: BaseIO, packets: list[OutPacket]) -> None:
+        # 断开的 IO 源交回的数据包不等待回应，其调用方已返回，由此处转发到其他 IO 源
+        self.logger.warning(
+            f"{io} 的连接已断开，{len(packets)} 个未发送的行为转到其他 IO 源"
+        )
+        self._penalize(self._health[io])
+        for packet in packets:
+            task = asyncio.create_task(self._output(packet, {io}))
+            self._moving.add(task)
+            task.add_done_callback(self._moved)
+
+    def _moved(self, task: asyncio.Task) -> None:
+        self._moving.discard(task)
+        if not task.cancelled() and (e := task.exception()) is not None:
+            self.logger.error(f"故障转移 IO 源转发未发送的行为失败。错误：{e!r}")
+
+    async def output(self, packet: OutPacket) -> EchoPacket:
+        return await self._output(packet, set())
+
+    async def _output(self, packet: OutPacket, tried: set[BaseIO]) -> EchoPacket:
+        while (io := self._choose(tried)) is not None:
+            tried.add(io)
+            health = self._health[io]
+            health.outputs += 1
+            start = time.perf_counter()
+            try:
+                echo = await asyncio.wait_for(io.output(packet), self.echo_timeout)
+            except asyncio.CancelledError:
+                if packet.echo_id is not None:
+                    io.discard_echo(packet.echo_id)
+                raise
+            except asyncio.TimeoutError:
+                # 超时不能说明行为未被执行，只有幂等的行为才能安全地转移重发
+                if packet.echo_id is not None:
+                    io.discard_echo(packet.echo_id)
+                self._penalize(health)
+                if packet.action_type not in IDEMPOTENT_ACTION_TYPES:
+                    raise IOError(
+                        f"{io} 等待 {packet.action_type} 行为的回应超时，"
+                        "该行为可能已被执行，不再转移到其他 IO 源"
+                    ) from None
+                self.logger.warning(f"{io} 等待回应超时，转移到其他 IO 源")
+                continue
+            except Exception as e:
+                self._penalize(health)
+                self.logger.warning(f"{io} 输出失败，转移到其他 IO 源。错误：{e!r}")
+                continue
+
+            health.error_rate -= self.smoothing * health.error_rate
+            if not echo.noecho:
+                latency = time.perf_counter() - start
+                health.latency = (
+                    latency
+                    if health.latency is None
+                    else health.latency + self.smoothing * (latency - health.latency)
+                )
+            return echo
+
+        raise IOError("故障转移 IO 源中没有可用于输出的 IO 源")
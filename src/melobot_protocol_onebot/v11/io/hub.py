@@ -0,0 +1,473 @@
+import asyncio
+import hashlib
+import json
+import struct
+import time
+from asyncio import Future
+from bisect import bisect_right
+from functools import partial
+from itertools import count
+from os import PathLike
+from typing import Any
+
+from melobot.exceptions import IOError
+from melobot.log import LogLevel
+
+from .base import BaseIO
+from .packet import EchoPacket, InPacket, OutPacket
+from .quarantine import ErrorQuarantine, preview_payload
+
+# 帧头：负载长度（大端序）
+_FRAME = struct.Struct(">I")
+
+
+def _encode(obj: dict[str, Any]) -> bytes:
+    payload = json.dumps(obj, ensure_ascii=False).encode()
+    return _FRAME.pack(len(payload)) + payload
+
+
+async def _read(reader: asyncio.StreamReader) -> Any:
+    (length,) = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    return json.loads(await reader.readexactly(length))
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """工作进程的一致性哈希环"""
+
+    def __init__(self, workers: int, vnodes: int = 64) -> None:
+        """初始化哈希环
+
+        :param workers: 工作进程数
+        :param vnodes: 每个工作进程的虚拟节点数
+        """
+        points = sorted(
+            (_hash(f"{w}#{v}"), w) for w in range(workers) for v in range(vnodes)
+        )
+        self._keys = [p for p, _ in points]
+        self._workers = [w for _, w in points]
+
+    def route(self, key: int | str, alive: set[int] | None = None) -> int | None:
+        """获取键所属的工作进程
+
+        :param key: 路由键
+        :param alive: 在线的工作进程，为空则视为全部在线。键所属的工作进程不在线时，沿环顺延到下一个在线的工作进程
+        :return: 工作进程序号，没有在线的工作进程时为空
+        """
+        start = bisect_right(self._keys, _hash(str(key)))
+        size = len(self._keys)
+        for i in range(size):
+            worker = self._workers[(start + i) % size]
+            if alive is None or worker in alive:
+                return worker
+        return None
+
+
+def route_key(raw: dict[str, Any]) -> int | None:
+    """获取事件的路由键：群事件为群号，其他事件为用户 qq 号，都没有时为空
+
+    :param raw: 事件的原始字典
+    :return: 路由键
+    """
+    if (gid := raw.get("group_id")) is not None:
+        return gid  # type: ignore[no-any-return]
+    return raw.get("user_id")
+
+
+class _WorkerConn:
+    __slots__ = ("writer", "frames", "actions", "inflight", "forwarding", "tasks")
+
+    def __init__(
+        self, writer: asyncio.StreamWriter, max_buffer: int, max_inflight: int
+    ) -> None:
+        self.writer = writer
+        # 发往工作进程的帧（事件与回应），满时阻塞事件的分发
+        self.frames: asyncio.Queue[bytes] = asyncio.Queue(max_buffer)
+        # 工作进程发来的行为，按到达顺序逐个提交
+        self.actions: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        # 等待回应的行为数上限
+        self.inflight = asyncio.Semaphore(max_inflight)
+        self.forwarding: set[asyncio.Task] = set()
+        self.tasks: list[asyncio.Task] = []
+
+
+class Hub:
+    """网关中枢
+
+    中枢独占与实现端的连接（可以是任意一种 IO 源），通过 Unix 套接字把原始事件转发给多个工作进程。
+    工作进程由群号或用户 qq 号的一致性哈希选出，因此同一会话的事件总在同一个工作进程中按序处理；
+    没有群号与用户 qq 号的事件（如心跳）发给所有工作进程。
+    工作进程的行为与回应经由中枢复用同一个连接，工作进程使用 :class:`HubWorkerIO` 接入。
+
+    每个工作进程有一个容量为 `max_buffer` 帧的发送队列，工作进程读取过慢时，事件的分发会在此阻塞，
+    而不是无限制地缓存。同一工作进程的行为按发出的顺序逐个提交给实现端，提交后并发地等待回应，
+    每个工作进程至多有 `max_inflight` 个等待回应的行为
+    """
+
+    def __init__(
+        self,
+        io: BaseIO,
+        path: str | PathLike[str],
+        workers: int,
+        vnodes: int = 64,
+        max_buffer: int = 1024,
+        max_inflight: int = 64,
+    ) -> None:
+        """初始化网关中枢
+
+        :param io: 连接实现端的 IO 源
+        :param path: Unix 套接字路径
+        :param workers: 工作进程数
+        :param vnodes: 一致性哈希中每个工作进程的虚拟节点数
+        :param max_buffer: 每个工作进程发送队列的容量（帧）
+        :param max_inflight: 每个工作进程等待回应的行为数上限
+        """
+        if workers < 1 or max_buffer < 1 or max_inflight < 1:
+            raise ValueError("工作进程数、发送队列容量与等待回应的行为数上限必须为正整数")
+        self.io = io
+        self.path = path
+        self.workers = workers
+        self.max_buffer = max_buffer
+        self.max_inflight = max_inflight
+        self.ring = HashRing(workers, vnodes)
+
+        self._conns: dict[int, _WorkerConn] = {}
+        self._has_worker = asyncio.Event()
+        self._server: asyncio.AbstractServer | None = None
+        self._pump: asyncio.Task | None = None
+        self._echo_ids = count()
+
+    @property
+    def logger(self) -> Any:
+        return self.io.logger
+
+    async def _handle_worker(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        worker = -1
+        conn: _WorkerConn | None = None
+        try:
+            hello = await _read(reader)
+            worker = hello["worker"]
+            if not 0 <= worker < self.workers or worker in self._conns:
+                self.logger.warning(f"网关中枢拒绝了工作进程 {worker} 的接入")
+                return
+            conn = self._conns[worker] = _WorkerConn(
+                writer, self.max_buffer, self.max_inflight
+            )
+            conn.tasks.append(asyncio.create_task(self._send_frames(conn)))
+            conn.tasks.append(asyncio.create_task(self._forward_actions(conn)))
+            self._has_worker.set()
+            self.logger.info(f"网关中枢：工作进程 {worker} 已接入")
+
+            while True:
+                await conn.actions.put(await _read(reader))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if conn is not None:
+                self._drop(worker, conn)
+                self.logger.warning(f"网关中枢：工作进程 {worker} 已断开")
+            writer.close()
+
+    def _drop(self, worker: int, conn: _WorkerConn) -> None:
+        if self._conns.get(worker) is conn:
+            del self._conns[worker]
+            if not self._conns:
+                self._has_worker.clear()
+        for t in (*conn.tasks, *conn.forwarding):
+            t.cancel()
+        # 唤醒阻塞在该工作进程发送队列上的分发
+        while not conn.frames.empty():
+            conn.frames.get_nowait()
+
+    async def _send_frames(self, conn: _WorkerConn) -> None:
+        try:
+            while True:
+                conn.writer.write(await conn.frames.get())
+                await conn.writer.drain()
+        except ConnectionError:
+            conn.writer.close()
+
+    async def _forward_actions(self, conn: _WorkerConn) -> None:
+        while True:
+            frame = await conn.actions.get()
+            await conn.inflight.acquire()
+            task = asyncio.create_task(self._forward_action(conn, frame))
+            conn.forwarding.add(task)
+            task.add_done_callback(partial(self._forwarded, conn))
+            # 让出一次，使该行为进入 IO 源的发送队列后再提交下一个，保持提交顺序
+            await asyncio.sleep(0)
+
+    def _forwarded(self, conn: _WorkerConn, task: asyncio.Task) -> None:
+        conn.forwarding.discard(task)
+        conn.inflight.release()
+        if not task.cancelled() and (e := task.exception()) is not None:
+            self.logger.error(f"网关中枢转发行为异常：{e!r}")
+
+    async def _forward_action(self, conn: _WorkerConn, frame: dict[str, Any]) -> None:
+        worker_echo = frame["echo"]
+        data: str = frame["data"]
+        echo_id = None
+        if worker_echo is not None:
+            # 不同工作进程生成的 echo 可能重复，转发前替换为中枢内唯一的 echo
+            echo_id = f"hub{next(self._echo_ids)}"
+            obj = json.loads(data)
+            obj["echo"] = echo_id
+            data = json.dumps(obj, ensure_ascii=False)
+
+        packet = OutPacket(
+            data=data,
+            action_type=frame["action"],
+            action_params=frame["params"],
+            echo_id=echo_id,
+        )
+        try:
+            echo = await self.io.output(packet)
+        except asyncio.CancelledError:
+            if echo_id is not None:
+                self.io.discard_echo(echo_id)
+            raise
+        except Exception:
+            self.logger.exception("网关中枢转发行为异常")
+            echo = EchoPacket(ok=False, status=-1, action_type=packet.action_type)
+
+        if worker_echo is None:
+            return
+        reply = {
+            "echo": worker_echo,
+            "ok": echo.ok,
+            "status": echo.status,
+            "data": echo.data,
+            "action": echo.action_type,
+        }
+        await conn.frames.put(_encode(reply))
+
+    async def _dispatch(self, raw: dict[str, Any]) -> None:
+        frame = _encode(raw)
+        if (key := route_key(raw)) is None:
+            for conn in list(self._conns.values()):
+                await conn.frames.put(frame)
+            return
+
+        worker = self.ring.route(key, set(self._conns))
+        if worker is not None:
+            await self._conns[worker].frames.put(frame)
+
+    async def _pump_events(self) -> None:
+        while True:
+            try:
+                packet = await self.io.input()
+                if not self._conns:
+                    await self._has_worker.wait()
+                await self._dispatch(packet.data)
+                if packet.ack is not None:
+                    # 对中枢而言，事件交给工作进程即视为分发完毕
+                    packet.ack()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.logger.exception("网关中枢分发事件异常")
+
+    async def start(self) -> None:
+        """启动中枢：先等待工作进程接入的套接字就绪，再连接实现端"""
+        if self._server is not None:
+            return
+        self._server = await asyncio.start_unix_server(self._handle_worker, self.path)
+        await self.io.open()
+        self._pump = asyncio.create_task(self._pump_events())
+        self.logger.info(f"网关中枢已启动，工作进程数：{self.workers}")
+
+    async def close(self) -> None:
+        if self._server is None:
+            return
+        if self._pump is not None:
+            self._pump.cancel()
+        self._server.close()
+        for worker, conn in list(self._conns.items()):
+            self._drop(worker, conn)
+            conn.writer.close()
+        await self.io.close()
+        self._server = None
+        self.logger.info("网关中枢已停止运行")
+
+    async def serve(self) -> None:
+        """启动中枢并一直运行，直到被取消"""
+        await self.start()
+        try:
+            await asyncio.Future()
+        finally:
+            await self.close()
+
+
+class HubWorkerIO(BaseIO):
+    """工作进程的 IO 源，通过 Unix 套接字接入 :class:`Hub`
+
+    与中枢的连接断开时，等待中的行为以 :class:`.IOError` 失败，随后按 `max_retry` 与 `retry_delay`
+    自动重连。重连期间输出的行为同样以 :class:`.IOError` 失败
+    """
+
+    def __init__(
+        self,
+        path: str | PathLike[str],
+        worker: int,
+        max_retry: int = -1,
+        retry_delay: float = 1,
+        cd_time: float = 0,
+        quarantine: ErrorQuarantine | None = None,
+    ) -> None:
+        """初始化工作进程的 IO 源
+
+        :param path: 中枢的 Unix 套接字路径
+        :param worker: 工作进程序号，从 0 开始
+        :param max_retry: 连接中枢的最大重试次数（首次连接与每次重连分别计数），为负数则不限
+        :param retry_delay: 重试间隔（秒）
+        :param cd_time: 发送行为操作的冷却时间（防风控）
+        :param quarantine: 输入异常的隔离器，为空则使用默认配置
+        """
+        super().__init__(cd_time)
+        if quarantine is not None:
+            self._quarantine = quarantine
+        self.path = path
+        self.worker = worker
+        self.max_retry = max_retry
+        self.retry_delay = retry_delay
+
+        self._reader: asyncio.StreamReader
+        self._writer: asyncio.StreamWriter
+        self._tasks: list[asyncio.Task] = []
+        self._in_buf: asyncio.Queue[InPacket] = asyncio.Queue()
+        self._opened = False
+        self._connected = False
+        self._write_lock = asyncio.Lock()
+        self._pre_send_time = time.time_ns()
+
+    async def _connect(self) -> None:
+        retries = 0
+        while True:
+            try:
+                self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+                self._writer.write(_encode({"worker": self.worker}))
+                await self._writer.drain()
+                break
+            except OSError as e:
+                if 0 <= self.max_retry <= retries:
+                    raise IOError("重试已达最大次数，已放弃连接网关中枢") from e
+                retries += 1
+                await asyncio.sleep(self.retry_delay)
+        self._connected = True
+
+    def _fail_pending(self) -> None:
+        for _, fut in self._echo_table.values():
+            if not fut.done():
+                fut.set_exception(
+                    IOError(f"工作进程 {self.worker} 与网关中枢的连接已断开")
+                )
+        self._echo_table.clear()
+
+    async def _input_loop(self) -> None:
+        while True:
+            raw: Any = None
+            try:
+                raw = await _read(self._reader)
+                if "post_type" in raw:
+                    await self._in_buf.put(InPacket(time=raw["time"], data=raw))
+                    continue
+
+                if (item := self._pop_echo(raw["echo"])) is None:
+                    continue
+                action_type, fut = item
+                fut.set_result(
+                    EchoPacket(
+                        time=int(time.time()),
+                        data=raw["data"],
+                        ok=raw["ok"],
+                        status=raw["status"],
+                        action_type=action_type,
+                    )
+                )
+            except (asyncio.IncompleteReadError, ConnectionError):
+                self.logger.warning(
+                    f"工作进程 {self.worker} 与网关中枢的连接已断开，正在重连"
+                )
+                self._connected = False
+                self._writer.close()
+                self._fail_pending()
+                try:
+                    await self._connect()
+                except IOError:
+                    self.logger.error(f"工作进程 {self.worker} 重连网关中枢失败，已放弃")
+                    self._opened = False
+                    return
+                self.logger.info(f"工作进程 {self.worker} 已重新接入网关中枢")
+            except Exception as e:
+                if self._quarantine.admit(e, raw, f"hub_worker:{self.worker}"):
+                    self.logger.exception(f"工作进程 {self.worker} 的 IO 源输入异常")
+                    self.logger.generic_obj(
+                        "异常点的上报数据", preview_payload(raw), level=LogLevel.ERROR
+                    )
+
+    async def open(self) -> None:
+        if self._opened:
+            return
+
+        await self._connect()
+        self._tasks.append(asyncio.create_task(self._input_loop()))
+        self._opened = True
+        self.logger.info(f"工作进程 {self.worker} 已接入网关中枢")
+
+    def opened(self) -> bool:
+        return self._opened
+
+    def live(self) -> bool:
+        return self._opened and self._connected
+
+    async def close(self) -> None:
+        if self._tasks:
+            for t in self._tasks:
+                t.cancel()
+            self._tasks.clear()
+            self._writer.close()
+            self._connected = False
+            self._fail_pending()
+            self._quarantine.close()
+            self._opened = False
+            self.logger.info(f"工作进程 {self.worker} 的 IO 源已停止运行")
+
+    async def input(self) -> InPacket:
+        return await self._in_buf.get()
+
+    async def output(self, packet: OutPacket) -> EchoPacket:
+        wait_time = self.cd_time - ((time.time_ns() - self._pre_send_time) / 1e9)
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+        self._pre_send_time = time.time_ns()
+
+        if not self._connected:
+            raise IOError(f"工作进程 {self.worker} 未连接到网关中枢")
+        frame = {
+            "action": packet.action_type,
+            "params": packet.action_params,
+            "echo": packet.echo_id,
+            "data": packet.data,
+        }
+        fut: Future[EchoPacket] | None = None
+        if packet.echo_id is not None:
+            # 先登记再发送，回应可能在等待写入缓冲区排空期间到达
+            fut = Future()
+            self._echo_table[packet.echo_id] = (packet.action_type, fut)
+        try:
+            async with self._write_lock:
+                self._writer.write(_encode(frame))
+                await self._writer.drain()
+        except ConnectionError as e:
+            if packet.echo_id is not None:
+                self.discard_echo(packet.echo_id)
+            raise IOError(f"工作进程 {self.worker} 发送行为失败") from e
+
+        if fut is None:
+            return EchoPacket(noecho=True)
+        return await fut
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+import struct
+import time
+from os import PathLike
+from pathlib import Path
+from typing import Any, BinaryIO, Literal
+
+# 记录头：记录类型、事件序号、负载长度
+_HEADER = struct.Struct("<BQI")
+_EVENT = 1
+_DONE = 2
+_SUFFIX = ".wal"
+
+
+class _Segment:
+    __slots__ = ("no", "path", "pending")
+
+    def __init__(self, no: int, path: Path) -> None:
+        self.no = no
+        self.path = path
+        self.pending = 0
+
+
+class EventJournal:
+    """上报事件的预写日志
+
+    IO 源在收到事件时追加写入日志，适配器将事件分发完毕（所有事件处理器执行结束）后，
+    通过输入包的 `ack` 回调将其标记完成。进程意外退出后，下次启动时未完成的事件会被重新放入输入队列，
+    因此事件至少被分发一次。
+
+    同一轮事件循环中追加的记录会合并为一次写入（组提交），是否以及何时 fsync 由 `fsync`
+    决定。日志按段存储，一个段及其之前的所有段中的事件都完成后，该段文件会被删除
+    """
+
+    def __init__(
+        self,
+        path: str | PathLike[str],
+        segment_size: int = 16 * 1024 * 1024,
+        fsync: Literal["always", "interval", "never"] = "interval",
+        fsync_interval: float = 1,
+    ) -> None:
+        """初始化一个事件日志
+
+        :param path: 日志目录，不存在时自动创建
+        :param segment_size: 单个段文件的大小上限（字节），超过后切换到新段
+        :param fsync: fsync 策略。`always` 每次组提交后 fsync，`interval` 至多每
+            `fsync_interval` 秒 fsync 一次，`never` 交由操作系统决定何时落盘
+        :param fsync_interval: `interval` 策略下的 fsync 间隔（秒）
+        """
+        self.path = Path(path)
+        self.segment_size = segment_size
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+
+        self._segments: list[_Segment] = []
+        self._fp: BinaryIO | None = None
+        self._buf = bytearray()
+        self._next_seq = 0
+        # 未完成的事件序号 -> 所在的段
+        self._seq_segs: dict[int, _Segment] = {}
+        self._flush_scheduled = False
+        self._last_sync = 0.0
+
+    @property
+    def pending(self) -> int:
+        """未完成的事件数"""
+        return len(self._seq_segs)
+
+    def recover(self) -> list[tuple[int, dict[str, Any]]]:
+        """打开日志，返回上次运行中未完成的事件
+
+        返回的事件需要由调用方按顺序放回输入队列，它们在日志中仍视为未完成，分发完毕后以序号调用
+        :meth:`ack`。重复调用时返回空列表
+
+        :return: 未完成事件的序号与原始字典
+        """
+        if self._fp is not None:
+            return []
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._segments.clear()
+        self._seq_segs.clear()
+        events: dict[int, tuple[_Segment, dict[str, Any]]] = {}
+        for file in sorted(self.path.glob(f"*{_SUFFIX}")):
+            seg = _Segment(int(file.stem), file)
+            self._segments.append(seg)
+            data = file.read_bytes()
+            pos = 0
+            while pos + _HEADER.size <= len(data):
+                kind, seq, length = _HEADER.unpack_from(data, pos)
+                pos += _HEADER.size
+                if pos + length > len(data):
+                    break
+                if kind == _EVENT:
+                    events[seq] = (seg, json.loads(data[pos : pos + length]))
+                else:
+                    events.pop(seq, None)
+                pos += length
+                self._next_seq = max(self._next_seq, seq + 1)
+
+        res: list[tuple[int, dict[str, Any]]] = []
+        for seq in sorted(events):
+            seg, raw = events[seq]
+            seg.pending += 1
+            self._seq_segs[seq] = seg
+            res.append((seq, raw))
+
+        # 旧段可能以写入中断的不完整记录结尾，新的记录总是写入新段
+        self._open_segment()
+        self._gc()
+        return res
+
+    def _open_segment(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+        no = self._segments[-1].no + 1 if self._segments else 0
+        file = self.path / f"{no:010d}{_SUFFIX}"
+        self._segments.append(_Segment(no, file))
+        self._fp = open(file, "ab")
+
+    def _gc(self) -> None:
+        while len(self._segments) > 1 and self._segments[0].pending == 0:
+            self._segments.pop(0).path.unlink(missing_ok=True)
+
+    def _write(self, kind: int, seq: int, payload: bytes = b"") -> None:
+        self._buf += _HEADER.pack(kind, seq, len(payload))
+        self._buf += payload
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self.flush)
+
+    def append(self, raw: dict[str, Any]) -> int:
+        """记录一个刚收到、即将放入输入队列的事件
+
+        日志须先以 :meth:`recover` 打开，否则上次运行中未完成的事件无人接收，会被当作已处理而丢失
+
+        :param raw: 事件的原始字典
+        :return: 事件序号，分发完毕后以此调用 :meth:`ack`
+        """
+        if self._fp is None:
+            raise RuntimeError("事件日志尚未打开，追加事件前须先调用 recover")
+        seq = self._next_seq
+        self._next_seq += 1
+        seg = self._seq_segs[seq] = self._segments[-1]
+        seg.pending += 1
+        self._write(_EVENT, seq, json.dumps(raw, ensure_ascii=False).encode())
+        return seq
+
+    def ack(self, seq: int) -> None:
+        """将一个已分发完毕的事件标记为完成，重复标记或日志已关闭时忽略
+
+        :param seq: 事件序号
+        """
+        if self._fp is None or (seg := self._seq_segs.pop(seq, None)) is None:
+            return
+        seg.pending -= 1
+        self._write(_DONE, seq)
+
+    def flush(self) -> None:
+        """立即执行一次组提交"""
+        self._flush_scheduled = False
+        if self._fp is None or not self._buf:
+            return
+
+        self._fp.write(self._buf)
+        self._buf.clear()
+        self._fp.flush()
+        now = time.monotonic()
+        if self.fsync == "always" or (
+            self.fsync == "interval" and now - self._last_sync >= self.fsync_interval
+        ):
+            os.fsync(self._fp.fileno())
+            self._last_sync = now
+
+        if self._fp.tell() >= self.segment_size:
+            self._open_segment()
+        self._gc()
+
+    def close(self) -> None:
+        """关闭日志，尚未分发完毕的事件保持未完成，下次启动时重新输入"""
+        if self._fp is None:
+            return
+        self.flush()
+        if self.fsync != "never":
+            os.fsync(self._fp.fileno())
+        self._fp.close()
+        self._fp = None
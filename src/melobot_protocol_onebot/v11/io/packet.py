@@ -1,4 +1,5 @@
 from dataclasses import dataclass, field
+from typing import Callable
 
 from melobot.io import EchoPacket as RootEchoPak
 from melobot.io import InPacket as RootInPack
@@ -11,6 +12,8 @@ from ..const import PROTOCOL_IDENTIFIER
 class InPacket(RootInPack):
     data: dict
     protocol: str = PROTOCOL_IDENTIFIER
+    #: 事件分发完毕后的确认回调，IO 源启用事件日志或快速操作时才存在
+    ack: Callable[[], None] | None = field(default=None, compare=False, repr=False)
 
 
 @dataclass(frozen=True, kw_only=True)
@@ -20,6 +23,8 @@ class OutPacket(RootOutPak):
     action_params: dict
     echo_id: str | None = None
     protocol: str = PROTOCOL_IDENTIFIER
+    #: 触发该行为的事件的原始字典，行为不由事件触发时为空
+    trigger: dict | None = field(default=None, compare=False, repr=False)
 
 
 @dataclass(frozen=True, kw_only=True)
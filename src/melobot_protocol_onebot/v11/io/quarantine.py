@@ -0,0 +1,192 @@
+import json
+import os
+import time
+from os import PathLike
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from melobot.log import get_logger
+
+from ..metrics import MetricsRegistry
+
+_Signature = tuple[str, str, int]
+
+#: 日志中原始数据包的最大长度（字符），超出部分被截断
+PAYLOAD_PREVIEW_SIZE = 2048
+
+
+def preview_payload(payload: Any, limit: int = PAYLOAD_PREVIEW_SIZE) -> str:
+    """将原始数据包截断为适合写入日志的字符串
+
+    :param payload: 原始数据包
+    :param limit: 最大长度（字符）
+    :return: 截断后的字符串
+    """
+    text: str
+    if isinstance(payload, (bytes, bytearray)):
+        text = bytes(payload).decode(errors="replace")
+    elif isinstance(payload, str):
+        text = payload
+    else:
+        text = repr(payload)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...（已截断，共 {len(text)} 字符）"
+
+
+class _Window:
+    __slots__ = ("since", "suppressed")
+
+    def __init__(self, since: float) -> None:
+        self.since = since
+        self.suppressed = 0
+
+
+class ErrorQuarantine:
+    """IO 源输入异常的隔离器
+
+    实现端发送大量畸形数据包时，每个数据包都完整地记录异常栈与原始数据，格式化日志的开销会
+    远超处理数据包本身。隔离器按异常签名（异常类型与抛出位置）限流：每个签名在每 `interval`
+    秒的窗口内只有第一次异常会被完整记录，其余仅计数，窗口结束后以一条汇总日志报告被抑制的次数。
+
+    指定 `dead_letter` 时，所有引发异常的原始数据包都会追加写入该文件（JSON Lines 格式），
+    文件超过 `max_bytes` 后轮换为 `.1` 备份，因此占用的磁盘空间不超过 `2 * max_bytes`。
+
+    多个 IO 源可共用同一个隔离器
+    """
+
+    def __init__(
+        self,
+        interval: float = 60,
+        dead_letter: str | PathLike[str] | None = None,
+        max_bytes: int = 16 * 1024 * 1024,
+        max_signatures: int = 256,
+        metrics: MetricsRegistry | None = None,
+    ) -> None:
+        """初始化一个隔离器
+
+        :param interval: 同一签名的异常被完整记录的最小间隔（秒）
+        :param dead_letter: 死信文件路径，为空则不保存引发异常的数据包
+        :param max_bytes: 死信文件的大小上限（字节）
+        :param max_signatures: 同时跟踪的签名数上限，超出时丢弃最早的签名
+        :param metrics: 指标注册表，为空则不收集指标
+        """
+        if max_bytes < 1 or max_signatures < 1:
+            raise ValueError("死信文件大小上限与签名数上限必须为正整数")
+        self.interval = interval
+        self.dead_letter = None if dead_letter is None else Path(dead_letter)
+        self.max_bytes = max_bytes
+        self.max_signatures = max_signatures
+        #: 隔离的异常总数
+        self.total = 0
+        #: 未被完整记录的异常数
+        self.suppressed = 0
+
+        self._windows: dict[_Signature, _Window] = {}
+        self._fp: BinaryIO | None = None
+        self._size = 0
+        self._counter = (
+            None
+            if metrics is None
+            else metrics.counter(
+                "onebot_io_quarantined_total", "IO 源输入处理中隔离的异常数"
+            )
+        )
+
+    @staticmethod
+    def signature(exc: BaseException) -> _Signature:
+        """计算异常的签名
+
+        :param exc: 异常
+        :return: 异常类型名、抛出异常的文件与行号
+        """
+        tb = exc.__traceback__
+        if tb is None:
+            return (type(exc).__qualname__, "", 0)
+        while tb.tb_next is not None:
+            tb = tb.tb_next
+        return (type(exc).__qualname__, tb.tb_frame.f_code.co_filename, tb.tb_lineno)
+
+    def admit(self, exc: BaseException, payload: Any, source: str = "") -> bool:
+        """登记一次异常，并判断是否应完整记录
+
+        :param exc: 异常
+        :param payload: 引发异常的原始数据包
+        :param source: 异常来源的标识，写入死信文件
+        :return: 是否应完整记录（记录异常栈与截断后的原始数据包）
+        """
+        self.total += 1
+        if self._counter is not None:
+            self._counter.inc()
+        sig = self.signature(exc)
+        if self.dead_letter is not None:
+            self._write_dead_letter(exc, sig, payload, source)
+
+        now = time.monotonic()
+        window = self._windows.get(sig)
+        if window is not None and now - window.since < self.interval:
+            window.suppressed += 1
+            self.suppressed += 1
+            return False
+
+        if window is not None:
+            self._report(sig, window)
+            del self._windows[sig]
+        elif len(self._windows) >= self.max_signatures:
+            old_sig = next(iter(self._windows))
+            self._report(old_sig, self._windows.pop(old_sig))
+        self._windows[sig] = _Window(now)
+        return True
+
+    def _report(self, sig: _Signature, window: _Window) -> None:
+        if window.suppressed:
+            get_logger().warning(
+                f"{sig[1]}:{sig[2]} 处的 {sig[0]} 异常在上一个记录窗口内"
+                f"又出现了 {window.suppressed} 次，已省略记录"
+            )
+
+    def flush(self) -> None:
+        """报告所有窗口中被抑制的异常次数，并将死信文件落盘"""
+        for sig, window in self._windows.items():
+            self._report(sig, window)
+            window.suppressed = 0
+        if self._fp is not None:
+            self._fp.flush()
+
+    def close(self) -> None:
+        self.flush()
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    def _write_dead_letter(
+        self, exc: BaseException, sig: _Signature, payload: Any, source: str
+    ) -> None:
+        if isinstance(payload, (bytes, bytearray)):
+            payload = bytes(payload).decode(errors="replace")
+        data = json.dumps(
+            {
+                "time": time.time(),
+                "source": source,
+                "error": f"{sig[0]}: {exc}",
+                "where": f"{sig[1]}:{sig[2]}",
+                "payload": payload,
+            },
+            ensure_ascii=False,
+            default=repr,
+        ).encode()
+        data += b"\n"
+
+        assert self.dead_letter is not None
+        if self._fp is None:
+            self.dead_letter.parent.mkdir(parents=True, exist_ok=True)
+            self._fp = open(self.dead_letter, "ab")
+            self._size = self._fp.tell()
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._fp.close()
+            os.replace(self.dead_letter, f"{self.dead_letter}.1")
+            self._fp = open(self.dead_letter, "ab")
+            self._size = 0
+
+        self._fp.write(data)
+        self._size += len(data)
@@ -0,0 +1,293 @@
+import asyncio
+import json
+import mmap
+import struct
+import time
+import zlib
+from collections import deque
+from os import PathLike
+from typing import Any, BinaryIO, Callable, Iterator
+
+from .base import BaseIO
+from .packet import EchoPacket, InPacket, OutPacket
+
+#: 录制日志的文件头
+MAGIC = b"MBOB11R\x01"
+#: 记录类型：上报事件
+RECORD_IN = 1
+#: 记录类型：输出的行为
+RECORD_OUT = 2
+#: 记录类型：行为的回应
+RECORD_ECHO = 3
+
+# 记录头：记录类型、录制时的 unix 时间戳、压缩后的负载长度
+_HEADER = struct.Struct("<BdI")
+# 回应记录负载的开头，其后是 echo 标识
+_ECHO_PREFIX = b'{"echo": '
+
+
+def _echo_key(action_type: str, params: dict) -> str:
+    return json.dumps([action_type, params], ensure_ascii=False, sort_keys=True)
+
+
+class RecordReader:
+    """录制日志的读取器
+
+    日志文件由文件头与若干条记录组成，每条记录为定长记录头加上独立压缩的 json 负载，
+    因此可以边写边读，也可以只解压需要的记录。文件通过内存映射读取，
+    即使是数 GB 的日志也不会整体载入内存。写入中断留下的不完整尾部记录会被忽略
+    """
+
+    def __init__(self, path: str | PathLike[str]) -> None:
+        self.path = path
+        self._fp = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._fp.close()
+            raise ValueError(f"{path} 不是录制日志文件") from None
+        if self._mm[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} 不是录制日志文件")
+
+    def scan(self) -> Iterator[tuple[int, float, int, int]]:
+        """扫描所有记录，不解压负载
+
+        :return: 迭代器，元素为记录类型、时间戳、负载偏移与负载长度
+        """
+        mm, pos, size = self._mm, len(MAGIC), len(self._mm)
+        while pos + _HEADER.size <= size:
+            kind, ts, length = _HEADER.unpack_from(mm, pos)
+            pos += _HEADER.size
+            if pos + length > size:
+                return
+            yield kind, ts, pos, length
+            pos += length
+
+    def load(self, offset: int, length: int) -> Any:
+        """解压并解析一条记录的负载
+
+        :param offset: 负载偏移
+        :param length: 负载长度
+        :return: 记录内容
+        """
+        return json.loads(zlib.decompress(self._mm[offset : offset + length]))
+
+    def peek(self, offset: int, length: int, size: int = 256) -> bytes:
+        """只解压一条记录负载的开头
+
+        :param offset: 负载偏移
+        :param length: 负载长度
+        :param size: 解压的最大字节数
+        :return: 负载开头至多 `size` 字节的原始数据
+        """
+        return zlib.decompressobj().decompress(self._mm[offset : offset + length], size)
+
+    def __iter__(self) -> Iterator[tuple[int, float, Any]]:
+        for kind, ts, offset, length in self.scan():
+            yield kind, ts, self.load(offset, length)
+
+    def close(self) -> None:
+        self._mm.close()
+        self._fp.close()
+
+
+class RecordIO(BaseIO):
+    """录制 IO 源
+
+    包装另一个 IO 源，把所有上报事件、输出的行为与行为回应连同时间戳追加写入压缩的录制日志，
+    日志可由 :class:`ReplayIO` 回放
+    """
+
+    def __init__(self, io: BaseIO, path: str | PathLike[str], level: int = 1) -> None:
+        """初始化一个录制 IO 源
+
+        :param io: 被录制的 IO 源
+        :param path: 日志文件路径，已存在时追加写入
+        :param level: zlib 压缩等级
+        """
+        super().__init__(io.cd_time)
+        self.io = io
+        self.path = path
+        self.level = level
+        self._fp: BinaryIO | None = None
+
+    def _write(self, kind: int, data: Any) -> None:
+        if self._fp is None:
+            return
+        payload = zlib.compress(json.dumps(data, ensure_ascii=False).encode(), self.level)
+        self._fp.write(_HEADER.pack(kind, time.time(), len(payload)) + payload)
+
+    def flush(self) -> None:
+        if self._fp is not None:
+            self._fp.flush()
+
+    async def open(self) -> None:
+        if self._fp is None:
+            self._fp = open(self.path, "ab")
+            if self._fp.tell() == 0:
+                self._fp.write(MAGIC)
+        await self.io.open()
+
+    def opened(self) -> bool:
+        return self.io.opened()
+
+    def live(self) -> bool:
+        return self.io.live()
+
+    def on_disconnect(self, callback: Callable[[list[OutPacket]], None]) -> None:
+        self.io.on_disconnect(callback)
+
+    async def close(self) -> None:
+        await self.io.close()
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    async def input(self) -> InPacket:
+        packet = await self.io.input()
+        self._write(RECORD_IN, packet.data)
+        return packet
+
+    async def output(self, packet: OutPacket) -> EchoPacket:
+        self._write(
+            RECORD_OUT,
+            {
+                "action": packet.action_type,
+                "params": packet.action_params,
+                "echo": packet.echo_id,
+            },
+        )
+        echo = await self.io.output(packet)
+        if not echo.noecho:
+            self._write(RECORD_ECHO, {"echo": packet.echo_id, "data": echo.data})
+        return echo
+
+
+class ReplayIO(BaseIO):
+    """回放 IO 源
+
+    按录制时的节奏（可加速）回放录制日志中的上报事件。输出的行为按行为类型与参数匹配录制的回应，
+    同一行为的多次回应按录制顺序给出，用尽后重复最后一个。
+    打开时只建立回应在日志中的位置索引（回应记录只解压开头以读出 echo 标识），回应在被匹配时才解压。
+
+    回放源本身也可以被 :class:`RecordIO` 包装，对比两份日志即可检查行为是否发生变化
+    """
+
+    def __init__(
+        self, path: str | PathLike[str], speed: float | None = 1, cd_time: float = 0
+    ) -> None:
+        """初始化一个回放 IO 源
+
+        :param path: 日志文件路径
+        :param speed: 回放倍速，为空则不等待，尽快回放
+        :param cd_time: 发送行为操作的冷却时间（防风控）
+        """
+        super().__init__(cd_time)
+        if speed is not None and speed <= 0:
+            raise ValueError("回放倍速必须为正数")
+        self.path = path
+        self.speed = speed
+        #: 已回放的事件数
+        self.replayed = 0
+        #: 没有匹配到录制回应的行为数
+        self.unmatched = 0
+        #: 所有事件回放完成时被设置
+        self.finished = asyncio.Event()
+
+        self._reader: RecordReader | None = None
+        self._records: Iterator[tuple[int, float, int, int]] = iter(())
+        # 行为的匹配键 -> 录制的回应负载的偏移与长度
+        self._echoes: dict[str, deque[tuple[int, int]]] = {}
+        self._first_ts: float | None = None
+        self._start_time: float | None = None
+
+    async def open(self) -> None:
+        if self._reader is not None:
+            return
+
+        reader = RecordReader(self.path)
+        pending: dict[str, str] = {}
+        for kind, ts, offset, length in reader.scan():
+            if kind == RECORD_IN:
+                if self._first_ts is None:
+                    self._first_ts = ts
+                continue
+
+            if kind == RECORD_OUT:
+                rec = reader.load(offset, length)
+                if rec["echo"] is not None:
+                    pending[rec["echo"]] = _echo_key(rec["action"], rec["params"])
+            elif kind == RECORD_ECHO:
+                echo_id = self._echo_id(reader, offset, length)
+                if key := pending.pop(echo_id, None):
+                    self._echoes.setdefault(key, deque()).append((offset, length))
+
+        self._reader = reader
+        self._records = reader.scan()
+        self.logger.info(f"OneBot v11 回放 IO 源已载入录制日志：{self.path}")
+
+    @staticmethod
+    def _echo_id(reader: RecordReader, offset: int, length: int) -> Any:
+        # 回应的负载可能很大（如群成员列表），通常只需解压开头即可读出 echo 标识
+        head = reader.peek(offset, length)
+        if head.startswith(_ECHO_PREFIX):
+            try:
+                text = head[len(_ECHO_PREFIX) :].decode(errors="ignore")
+                return json.JSONDecoder().raw_decode(text)[0]
+            except ValueError:
+                pass
+        return reader.load(offset, length)["echo"]
+
+    def opened(self) -> bool:
+        return self._reader is not None
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._records = iter(())
+            self._reader.close()
+            self._reader = None
+            self.logger.info("OneBot v11 回放 IO 源已停止运行")
+
+    async def input(self) -> InPacket:
+        loop = asyncio.get_running_loop()
+        if self._start_time is None:
+            self._start_time = loop.time()
+
+        for kind, ts, offset, length in self._records:
+            if kind != RECORD_IN:
+                continue
+            if self.speed is not None and self._first_ts is not None:
+                delay = (ts - self._first_ts) / self.speed
+                await asyncio.sleep(delay - (loop.time() - self._start_time))
+
+            data = self._reader.load(offset, length)  # type: ignore[union-attr]
+            self.replayed += 1
+            return InPacket(time=data["time"], data=data)
+
+        self.finished.set()
+        # 事件已全部回放，此后不再有输入
+        return await loop.create_future()  # type: ignore[no-any-return]
+
+    async def output(self, packet: OutPacket) -> EchoPacket:
+        if packet.echo_id is None:
+            return EchoPacket(noecho=True)
+
+        await asyncio.sleep(self.cd_time)
+        queue = self._echoes.get(_echo_key(packet.action_type, packet.action_params))
+        if queue:
+            offset, length = queue.popleft() if len(queue) > 1 else queue[0]
+            data = self._reader.load(offset, length)["data"]  # type: ignore[union-attr]
+        else:
+            self.unmatched += 1
+            self.logger.warning(f"录制日志中没有与此行为匹配的回应：{packet.action_type}")
+            data = {"status": "failed", "retcode": -1, "data": None}
+        data["echo"] = packet.echo_id
+
+        return EchoPacket(
+            time=int(time.time()),
+            data=data,
+            ok=data["status"] == "ok",
+            status=data["retcode"],
+            action_type=packet.action_type,
+        )
@@ -11,13 +11,31 @@ import websockets.server
 from melobot.log import LogLevel
 from websockets import ConnectionClosed
 
+from ..metrics import IOMetrics, MetricsRegistry
+from ..offload import Offloader
 from .base import BaseIO
+from .dedup import EventDeduplicator
+from .journal import EventJournal
 from .packet import EchoPacket, InPacket, OutPacket
+from .quarantine import ErrorQuarantine, preview_payload
+from .trace import PacketTrace
+from .ws_options import WSTransportOptions
 
 
 class ReverseWebSocketIO(BaseIO):
     def __init__(
-        self, host: str, port: int, cd_time: float = 0.2, access_token: str | None = None
+        self,
+        host: str,
+        port: int,
+        cd_time: float = 0.2,
+        access_token: str | None = None,
+        metrics: MetricsRegistry | None = None,
+        journal: EventJournal | None = None,
+        dedup: EventDeduplicator | None = None,
+        offload: Offloader | None = None,
+        ws_options: WSTransportOptions | None = None,
+        trace: PacketTrace | None = None,
+        quarantine: ErrorQuarantine | None = None,
     ) -> None:
         super().__init__(cd_time)
         self.host = host
@@ -29,11 +47,26 @@ class ReverseWebSocketIO(BaseIO):
         self._tasks: list[asyncio.Task] = []
         self._in_buf: asyncio.Queue[InPacket] = asyncio.Queue()
         self._out_buf: asyncio.Queue[OutPacket] = asyncio.Queue()
-        self._echo_table: dict[str, tuple[str, Future[EchoPacket]]] = {}
         self._opened = asyncio.Event()
+        self._live = False
         self._pre_send_time = time.time_ns()
+        self._journal = journal
+        self._dedup = dedup
+        self._offload = offload
+        self.ws_options = WSTransportOptions() if ws_options is None else ws_options
+        self._trace = trace
+        if quarantine is not None:
+            self._quarantine = quarantine
         self._conn_requested = False
         self._request_lock = asyncio.Lock()
+        if metrics is not None:
+            self._metrics = IOMetrics(
+                metrics,
+                f"reverse_ws:{host}:{port}",
+                self._in_buf,
+                self._out_buf,
+                self._echo_table,
+            )
 
     async def _req_check(
         self, _: str, headers: websockets.HeadersLike
@@ -60,6 +93,8 @@ class ReverseWebSocketIO(BaseIO):
                 and _headers.get("Authorization") != f"Bearer {self.access_token}"
             ):
                 self.logger.warning("OneBot 实现端的 access_token 不匹配，拒绝连接")
+                if self._metrics is not None:
+                    self._metrics.connect_failures.inc()
                 return resp_403(auth_failed)
 
             self._conn_requested = True
@@ -68,27 +103,42 @@ class ReverseWebSocketIO(BaseIO):
     async def _input_loop(self, ws: websockets.server.WebSocketServerProtocol) -> None:
         # pylint: disable=duplicate-code
         self.conn = ws
+        self.ws_options.apply(ws)
+        self._live = True
         self._opened.set()
+        if self._metrics is not None:
+            self._metrics.connects.inc()
         self.logger.info("OneBot v11 反向 WebSocket IO 源与实现端建立了连接")
 
         while True:
+            raw_str: str | bytes = ""
             try:
                 raw_str = await self.conn.recv()
-                self.logger.generic_obj(
-                    "收到上报，未格式化的字符串", raw_str, level=LogLevel.DEBUG
-                )
+                if self._trace is not None:
+                    self._trace.record("in", raw_str)
                 if raw_str == "":
                     continue
-                raw = json.loads(raw_str)
+                if self._offload is None:
+                    raw = json.loads(raw_str)
+                else:
+                    raw = await self._offload.loads(raw_str)
 
                 if "post_type" in raw:
-                    await self._in_buf.put(InPacket(time=raw["time"], data=raw))
+                    if self._metrics is not None:
+                        self._metrics.events.inc()
+                    if self._dedup is not None and self._dedup.seen(raw):
+                        continue
+                    await self._in_buf.put(self._in_packet(raw))
                     continue
 
                 if (echo_id := raw["echo"]) is None:
                     continue
 
-                action_type, fut = self._echo_table.pop(echo_id)
+                if (item := self._pop_echo(echo_id)) is None:
+                    continue
+                action_type, fut = item
+                if self._metrics is not None:
+                    self._metrics.echoes.inc()
                 fut.set_result(
                     EchoPacket(
                         time=int(time.time()),
@@ -99,30 +149,62 @@ class ReverseWebSocketIO(BaseIO):
                     )
                 )
             except ConnectionClosed:
-                self.logger.warning("OneBot v11 正向 WebSocket IO 源的 ws 连接已关闭")
-            except Exception:
-                self.logger.exception("OneBot v11 反向 WebSocket IO 源输入异常")
-                self.logger.generic_obj("异常点局部变量", locals(), level=LogLevel.ERROR)
-                self.logger.generic_obj("异常点的上报数据", raw, level=LogLevel.ERROR)
+                self.logger.warning("OneBot v11 反向 WebSocket IO 源的 ws 连接已关闭")
+                self._lose_conn()
+                break
+            except Exception as e:
+                if self._metrics is not None:
+                    self._metrics.input_errors.inc()
+                if self._quarantine.admit(
+                    e, raw_str, f"reverse_ws:{self.host}:{self.port}"
+                ):
+                    self.logger.exception("OneBot v11 反向 WebSocket IO 源输入异常")
+                    self.logger.generic_obj(
+                        "异常点的上报数据", preview_payload(raw_str), level=LogLevel.ERROR
+                    )
+                if self._trace is not None:
+                    self._trace.on_error()
+
+    def _lose_conn(self, *unsent: OutPacket) -> None:
+        self._live = False
+        self._disconnected([*unsent, *self._drain(self._out_buf)])
 
     async def _output_loop(self) -> None:
         while True:
             try:
                 out_packet = await self._out_buf.get()
                 wait_time = self.cd_time - ((time.time_ns() - self._pre_send_time) / 1e9)
+                if self._metrics is not None and wait_time > 0:
+                    self._metrics.cd_wait.observe(wait_time)
                 await asyncio.sleep(wait_time)
                 await self.conn.send(out_packet.data)
+                if self._trace is not None:
+                    self._trace.record("out", out_packet.data)
                 self._pre_send_time = time.time_ns()
+            except ConnectionClosed:
+                # 连接断开时取出的数据包没有发出，与队列中剩余的数据包一起转交
+                self._lose_conn(out_packet)
             except Exception:
+                if self._metrics is not None:
+                    self._metrics.output_errors.inc()
                 self.logger.exception("OneBot v11 反向 WebSocket IO 源输出异常")
                 self.logger.generic_obj("异常点局部变量", locals(), level=LogLevel.ERROR)
                 self.logger.generic_obj(
                     "异常点的发送数据", out_packet.data, level=LogLevel.ERROR
                 )
+                if self._trace is not None:
+                    self._trace.on_error()
 
     async def open(self) -> None:
+        self._init_trace()
+        for packet in self._recover_journal():
+            self._in_buf.put_nowait(packet)
         self.server = await websockets.serve(
-            self._input_loop, self.host, self.port, process_request=self._req_check
+            self._input_loop,
+            self.host,
+            self.port,
+            process_request=self._req_check,
+            **self.ws_options.server_kwargs(),
         )
         self._tasks.append(asyncio.create_task(self._output_loop()))
         self.logger.info("OneBot v11 反向 WebSocket IO 源启动了服务，等待连接中")
@@ -131,12 +213,18 @@ class ReverseWebSocketIO(BaseIO):
     def opened(self) -> bool:
         return self._opened.is_set()
 
+    def live(self) -> bool:
+        return self.opened() and self._live
+
     async def close(self) -> None:
         if self.opened():
-            await self.server.close()  # type: ignore[func-returns-value]
+            self.server.close()
             await self.server.wait_closed()
             for t in self._tasks:
                 t.cancel()
+            if self._journal is not None:
+                self._journal.close()
+            self._quarantine.close()
 
             self._opened.clear()
             self.logger.info("OneBot v11 反向 WebSocket IO 源已停止运行")
@@ -145,10 +233,18 @@ class ReverseWebSocketIO(BaseIO):
         return await self._in_buf.get()
 
     async def output(self, packet: OutPacket) -> EchoPacket:
+        if self._metrics is not None:
+            self._metrics.outputs.inc()
         await self._out_buf.put(packet)
         if packet.echo_id is None:
             return EchoPacket(noecho=True)
 
         fut: Future[EchoPacket] = Future()
         self._echo_table[packet.echo_id] = (packet.action_type, fut)
-        return await fut
+        if self._metrics is None:
+            return await fut
+
+        start = time.perf_counter()
+        echo = await fut
+        self._metrics.echo_latency.observe(time.perf_counter() - start)
+        return echo
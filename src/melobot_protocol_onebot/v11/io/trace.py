@@ -0,0 +1,153 @@
+import json
+import logging
+import re
+import time
+from collections import deque
+from os import PathLike
+from pathlib import Path
+from typing import Any, Iterable, Literal
+
+from melobot.log import GenericLogger, LogLevel, get_logger
+
+_GROUP_ID_REGEX = re.compile(rb'"group_id"\s*:\s*(\d+)')
+
+
+def debug_enabled(logger: GenericLogger) -> bool:
+    """判断日志器是否会输出 DEBUG 级别的日志
+
+    基于 :mod:`logging` 的日志器（包括 melobot 内置日志器与空日志器）按其等级与 handler 的等级判断，
+    其他经修补的日志器无从判断，视为会输出
+
+    :param logger: 日志器
+    :return: 是否会输出
+    """
+    if not isinstance(logger, logging.Logger):
+        return True
+    if not logger.isEnabledFor(LogLevel.DEBUG):
+        return False
+
+    # melobot 内置日志器自身的等级恒为 DEBUG，实际输出的等级由各 handler 决定
+    cur: logging.Logger | None = logger
+    while cur is not None:
+        if any(h.level <= LogLevel.DEBUG for h in cur.handlers):
+            return True
+        cur = cur.parent if cur.propagate else None
+    return False
+
+
+class PacketTrace:
+    """原始数据包的调试追踪
+
+    IO 源只在持有追踪器时才记录原始数据包，未持有时热路径上仅剩一次属性判断。
+    记录分为两部分：
+
+    - 环形缓冲区保存最近 `buffer_size` 个收发的原始数据包（只保存引用，不做格式化），
+      可随时通过 :meth:`dump` 导出，IO 源出现异常时也会自动导出到 `dump_dir`
+    - 抽样日志：每 `sample` 个数据包以 DEBUG 级别记录一个，指定了 `groups` 时，
+      这些群的数据包总会被记录。日志器是否输出 DEBUG 日志在构造与 :meth:`refresh` 时检查并缓存
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = 256,
+        sample: int = 1,
+        groups: Iterable[int] | None = None,
+        dump_dir: str | PathLike[str] | None = None,
+        dump_interval: float = 60,
+    ) -> None:
+        """初始化一个追踪器
+
+        :param buffer_size: 环形缓冲区大小，为 0 则不缓存
+        :param sample: 抽样间隔，为 0 则只记录 `groups` 中的群的数据包
+        :param groups: 总会被记录日志的群号
+        :param dump_dir: 出现异常时导出缓冲区的目录，为空则不自动导出
+        :param dump_interval: 两次自动导出的最小间隔（秒）
+        """
+        if buffer_size < 0 or sample < 0:
+            raise ValueError("缓冲区大小与抽样间隔不能为负数")
+        self.sample = sample
+        self.groups = frozenset(groups) if groups is not None else frozenset()
+        self.dump_dir = None if dump_dir is None else Path(dump_dir)
+        self.dump_interval = dump_interval
+        #: 已记录的数据包数
+        self.count = 0
+
+        self._ring: deque[tuple[float, str, str | bytes]] = deque(maxlen=buffer_size)
+        self._pre_dump_time = -dump_interval
+        self._log_enabled = False
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def refresh(self) -> None:
+        """重新检查日志器是否会输出 DEBUG 日志，在运行中调整日志等级后调用"""
+        self._log_enabled = (self.sample > 0 or bool(self.groups)) and debug_enabled(
+            get_logger()
+        )
+
+    def record(self, direction: Literal["in", "out"], data: str | bytes) -> None:
+        """记录一个原始数据包
+
+        :param direction: 数据包方向，`in` 为收到的数据，`out` 为发送的数据
+        :param data: 数据包的原始内容
+        """
+        self.count += 1
+        self._ring.append((time.time(), direction, data))
+        if not self._log_enabled:
+            return
+
+        if (self.sample and self.count % self.sample == 0) or self._in_groups(data):
+            get_logger().generic_obj(
+                "收到的原始数据包" if direction == "in" else "发送的原始数据包",
+                data,
+                level=LogLevel.DEBUG,
+            )
+
+    def _in_groups(self, data: str | bytes) -> bool:
+        if not self.groups:
+            return False
+        raw = data.encode() if isinstance(data, str) else data
+        match = _GROUP_ID_REGEX.search(raw)
+        return match is not None and int(match.group(1)) in self.groups
+
+    def dump(self, path: str | PathLike[str] | None = None) -> list[dict[str, Any]]:
+        """导出环形缓冲区中的数据包
+
+        :param path: 以 JSON Lines 格式写入的文件路径，为空则不写入
+        :return: 按时间先后排列的数据包，每项包含 `time`, `direction`, `data`
+        """
+        res = [
+            {
+                "time": t,
+                "direction": direction,
+                "data": (
+                    data.decode(errors="replace") if isinstance(data, bytes) else data
+                ),
+            }
+            for t, direction, data in self._ring
+        ]
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as fp:
+                for item in res:
+                    fp.write(json.dumps(item, ensure_ascii=False))
+                    fp.write("\n")
+        return res
+
+    def on_error(self) -> Path | None:
+        """IO 源出现异常时调用，按间隔限制将缓冲区导出到 `dump_dir`
+
+        :return: 导出的文件路径，未导出则为空
+        """
+        now = time.monotonic()
+        if self.dump_dir is None or not self._ring:
+            return None
+        if now - self._pre_dump_time < self.dump_interval:
+            return None
+
+        self._pre_dump_time = now
+        self.dump_dir.mkdir(parents=True, exist_ok=True)
+        path = self.dump_dir / f"packets-{time.time_ns()}.jsonl"
+        self.dump(path)
+        get_logger().error(f"最近 {len(self._ring)} 个原始数据包已导出到 {path}")
+        return path
@@ -0,0 +1,66 @@
+import multiprocessing
+import time
+from typing import Any, Callable
+
+
+class SharedRateLimit:
+    """跨进程共享的发送速率预算
+
+    所有持有同一实例的进程合计每 `interval` 秒最多发送一个行为。实例需要在父进程中创建，
+    并在启动子进程时作为参数传入
+    """
+
+    def __init__(self, interval: float) -> None:
+        """初始化一个共享速率预算
+
+        :param interval: 相邻两次发送的最小间隔（秒）
+        """
+        self.interval = interval
+        ctx = multiprocessing.get_context("spawn")
+        self._lock = ctx.Lock()
+        self._next = ctx.Value("d", 0.0, lock=False)
+
+    def reserve(self) -> float:
+        """预约下一个发送时刻
+
+        :return: 距离预约时刻还需等待的时间（秒）
+        """
+        with self._lock:
+            now = time.time()
+            at: float = max(self._next.value, now)
+            self._next.value = at + self.interval
+        return at - now
+
+
+def run_workers(
+    target: Callable[..., Any], workers: int, args: tuple[Any, ...] = ()
+) -> None:
+    """以多个工作进程运行 bot，用于多进程的 :class:`.HttpIO`
+
+    每个工作进程调用 `target(worker_id, *args)`，在其中创建启用了 `reuse_port` 的 :class:`.HttpIO`
+    并运行 bot。内核通过 `SO_REUSEPORT` 把实现端的连接分配到各工作进程，每个工作进程使用自己的
+    连接池发送行为。需要共享发送速率时，在 `args` 中传入 :class:`SharedRateLimit`。
+
+    内核按连接而不是按请求分配，实现端只使用一个长连接上报时所有事件仍会落在同一个工作进程
+
+    :param target: 工作进程的入口函数，必须可以被 pickle（即模块顶层函数）
+    :param workers: 工作进程数
+    :param args: 传给入口函数的其他参数
+    """
+    if workers < 1:
+        raise ValueError("工作进程数必须为正整数")
+
+    ctx = multiprocessing.get_context("spawn")
+    procs = [
+        ctx.Process(target=target, args=(i, *args), daemon=True) for i in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+                p.join()
@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from typing import Any
+
+from websockets.extensions.permessage_deflate import (
+    ClientPerMessageDeflateFactory,
+    ServerPerMessageDeflateFactory,
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class WSTransportOptions:
+    """WebSocket 传输参数
+
+    局域网部署带宽充足，可以关闭压缩以节省 CPU；公网部署可以开启压缩并调整窗口大小与压缩等级
+
+    :ivar compression: 是否启用 permessage-deflate 压缩
+    :ivar client_max_window_bits: 客户端压缩窗口大小（8-15），为空使用协商的默认值
+    :ivar server_max_window_bits: 服务端压缩窗口大小（8-15），为空使用协商的默认值
+    :ivar compress_level: zlib 压缩等级（0-9），为空使用库的默认值
+    :ivar max_size: 单条消息的最大字节数，超过时连接会被关闭，为空则不限。
+        `get_group_member_list` 等行为的回应可能远超 websockets 默认的 1 MiB
+    :ivar max_queue: 接收队列的最大消息数，为空则不限
+    :ivar read_limit: 读取缓冲区的高水位（字节）
+    :ivar write_limit_high: 写入缓冲区的高水位（字节），超过时发送会等待缓冲区排空
+    :ivar write_limit_low: 写入缓冲区的低水位（字节），为空则为高水位的四分之一
+    :ivar ping_interval: 发送 ping 的间隔（秒），为空则不发送
+    :ivar ping_timeout: 等待 pong 的超时时间（秒），为空则不超时
+    """
+
+    compression: bool = True
+    client_max_window_bits: int | None = None
+    server_max_window_bits: int | None = None
+    compress_level: int | None = None
+    max_size: int | None = 16 * 1024 * 1024
+    max_queue: int | None = 32
+    read_limit: int = 2**16
+    write_limit_high: int = 2**16
+    write_limit_low: int | None = None
+    ping_interval: float | None = 20
+    ping_timeout: float | None = 20
+
+    def _deflate_args(self) -> dict[str, Any] | None:
+        if (
+            self.client_max_window_bits is None
+            and self.server_max_window_bits is None
+            and self.compress_level is None
+        ):
+            return None
+        args: dict[str, Any] = {"server_max_window_bits": self.server_max_window_bits}
+        if self.client_max_window_bits is not None:
+            args["client_max_window_bits"] = self.client_max_window_bits
+        if self.compress_level is not None:
+            args["compress_settings"] = {"level": self.compress_level}
+        return args
+
+    def _kwargs(self, client: bool) -> dict[str, Any]:
+        kwargs: dict[str, Any] = {
+            "max_size": self.max_size,
+            "max_queue": self.max_queue,
+            "read_limit": self.read_limit,
+            "write_limit": self.write_limit_high,
+            "ping_interval": self.ping_interval,
+            "ping_timeout": self.ping_timeout,
+            "compression": "deflate" if self.compression else None,
+        }
+        if self.compression and (args := self._deflate_args()) is not None:
+            factory = (
+                ClientPerMessageDeflateFactory
+                if client
+                else ServerPerMessageDeflateFactory
+            )
+            kwargs["compression"] = None
+            kwargs["extensions"] = [factory(**args)]
+        return kwargs
+
+    def client_kwargs(self) -> dict[str, Any]:
+        """获取 `websockets.connect` 的参数"""
+        return self._kwargs(client=True)
+
+    def server_kwargs(self) -> dict[str, Any]:
+        """获取 `websockets.serve` 的参数"""
+        return self._kwargs(client=False)
+
+    def apply(self, conn: Any) -> None:
+        """对已建立的连接设置写入缓冲区的低水位
+
+        :param conn: websockets 连接
+        """
+        if self.write_limit_low is not None:
+            conn.transport.set_write_buffer_limits(
+                high=self.write_limit_high, low=self.write_limit_low
+            )
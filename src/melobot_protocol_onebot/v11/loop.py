@@ -0,0 +1,91 @@
+import asyncio
+from typing import Literal
+
+LoopBackend = Literal["auto", "uvloop", "asyncio"]
+
+
+def install_loop(backend: LoopBackend = "auto") -> Literal["uvloop", "asyncio"]:
+    """设置之后创建的事件循环所使用的实现，需要在启动 bot 之前调用
+
+    :param backend: `uvloop` 使用 uvloop，未安装时报错；`auto` 在安装了 uvloop 时使用 uvloop，
+        否则使用标准库实现；`asyncio` 恢复标准库实现
+    :return: 实际使用的实现
+    """
+    if backend == "asyncio":
+        asyncio.set_event_loop_policy(None)
+        return "asyncio"
+
+    try:
+        import uvloop
+    except ImportError:
+        if backend == "uvloop":
+            raise ImportError(
+                "使用 uvloop 需要先安装 uvloop：pip install uvloop"
+            ) from None
+        asyncio.set_event_loop_policy(None)
+        return "asyncio"
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return "uvloop"
+
+
+def current_loop_backend() -> Literal["uvloop", "asyncio"]:
+    """获取正在运行（或将要创建）的事件循环的实现
+
+    :return: 事件循环的实现
+    """
+    cls: type
+    try:
+        cls = type(asyncio.get_running_loop())
+    except RuntimeError:
+        cls = type(asyncio.get_event_loop_policy())
+    return "uvloop" if cls.__module__.startswith("uvloop") else "asyncio"
+
+
+async def check_loop() -> None:
+    """在当前事件循环上检查 IO 源依赖的 asyncio 原语
+
+    覆盖 IO 源使用的 `Queue`、`Event`、`create_task`、`sleep`、不绑定循环创建的 `Future`、
+    `wait_for` 超时，以及 TCP 流的收发。检查失败时抛出 :class:`RuntimeError`
+    """
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    event = asyncio.Event()
+    fut: asyncio.Future[int] = asyncio.Future()
+
+    async def producer() -> None:
+        await asyncio.sleep(0.001)
+        for i in range(3):
+            await queue.put(i)
+        fut.set_result(3)
+        event.set()
+
+    task = asyncio.create_task(producer())
+    got = [await queue.get() for _ in range(3)]
+    await event.wait()
+    if got != [0, 1, 2] or await fut != 3 or not task.done():
+        raise RuntimeError("事件循环的队列、事件或 Future 行为异常")
+
+    try:
+        await asyncio.wait_for(asyncio.sleep(1), 0.001)
+    except asyncio.TimeoutError:
+        pass
+    else:
+        raise RuntimeError("事件循环的超时行为异常")
+
+    async def echo(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        writer.write(await reader.readexactly(4))
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(echo, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"ping")
+        data = await reader.readexactly(4)
+        writer.close()
+    finally:
+        server.close()
+        await server.wait_closed()
+    if data != b"ping":
+        raise RuntimeError("事件循环的 TCP 收发异常")
@@ -0,0 +1,408 @@
+from __future__ import annotations
+
+import asyncio
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Literal, Mapping, Sized
+
+if TYPE_CHECKING:
+    import aiohttp.web
+
+#: 默认的延迟直方图分桶（秒）
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+_LabelKey = tuple[tuple[str, str], ...]
+
+
+def _label_key(labels: Mapping[str, str] | None) -> _LabelKey:
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(key: _LabelKey, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return f"{{{','.join(parts)}}}" if parts else ""
+
+
+def _fmt_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """单调递增的计数器
+
+    只在事件循环线程中修改，因此无需加锁
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value: float = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Histogram:
+    """固定分桶的直方图"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum: float = 0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Gauge:
+    """读取时才求值的仪表，适合队列长度一类已由其他对象维护的量"""
+
+    __slots__ = ("func",)
+
+    def __init__(self, func: Callable[[], float]) -> None:
+        self.func = func
+
+    @property
+    def value(self) -> float:
+        return self.func()
+
+
+_Metric = Counter | Histogram | Gauge
+
+
+class _Family:
+    __slots__ = ("name", "help", "type", "children")
+
+    def __init__(
+        self, name: str, help: str, type: Literal["counter", "histogram", "gauge"]
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.type = type
+        self.children: dict[_LabelKey, _Metric] = {}
+
+
+class MetricsRegistry:
+    """指标注册表
+
+    IO 源、适配器与处理流在构造时传入注册表即开启指标收集，不传入则完全不收集。
+    指标可通过 :meth:`collect` 拉取，或以 Prometheus 文本格式通过 `/metrics` 暴露
+    """
+
+    def __init__(self) -> None:
+        self._families: dict[str, _Family] = {}
+        self._runner: aiohttp.web.AppRunner | None = None
+
+    def _get(
+        self,
+        name: str,
+        help: str,
+        type: Literal["counter", "histogram", "gauge"],
+        labels: Mapping[str, str] | None,
+        factory: Callable[[], _Metric],
+    ) -> Any:
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = _Family(name, help, type)
+        elif family.type != type:
+            raise ValueError(f"指标 {name} 已被注册为 {family.type} 类型")
+
+        key = _label_key(labels)
+        if (metric := family.children.get(key)) is None:
+            metric = family.children[key] = factory()
+        return metric
+
+    def counter(
+        self, name: str, help: str = "", labels: Mapping[str, str] | None = None
+    ) -> Counter:
+        """获取计数器，不存在则创建
+
+        :param name: 指标名
+        :param help: 指标说明
+        :param labels: 标签
+        :return: 计数器
+        """
+        return self._get(name, help, "counter", labels, Counter)  # type: ignore[no-any-return]
+
+    def histogram(
+        self,
+        name: str,
+        help: str = "",
+        labels: Mapping[str, str] | None = None,
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        """获取直方图，不存在则创建
+
+        :param name: 指标名
+        :param help: 指标说明
+        :param labels: 标签
+        :param buckets: 分桶上界，只在创建时生效
+        :return: 直方图
+        """
+        return self._get(  # type: ignore[no-any-return]
+            name, help, "histogram", labels, lambda: Histogram(buckets)
+        )
+
+    def gauge(
+        self,
+        name: str,
+        func: Callable[[], float],
+        help: str = "",
+        labels: Mapping[str, str] | None = None,
+    ) -> Gauge:
+        """注册仪表，同名同标签的仪表会被替换
+
+        :param name: 指标名
+        :param func: 求值函数
+        :param help: 指标说明
+        :param labels: 标签
+        :return: 仪表
+        """
+        gauge: Gauge = self._get(name, help, "gauge", labels, lambda: Gauge(func))
+        gauge.func = func
+        return gauge
+
+    def collect(self) -> dict[str, dict[_LabelKey, float | dict[str, Any]]]:
+        """拉取所有指标的当前值
+
+        :return: 指标名 -> 标签 -> 值。直方图的值为包含 `buckets`, `counts`, `sum`, `count` 的字典
+        """
+        res: dict[str, dict[_LabelKey, float | dict[str, Any]]] = {}
+        for name, family in self._families.items():
+            values: dict[_LabelKey, float | dict[str, Any]] = {}
+            for key, metric in family.children.items():
+                if isinstance(metric, Histogram):
+                    values[key] = {
+                        "buckets": metric.buckets,
+                        "counts": list(metric.counts),
+                        "sum": metric.sum,
+                        "count": metric.count,
+                    }
+                else:
+                    values[key] = metric.value
+            res[name] = values
+        return res
+
+    def render(self) -> str:
+        """以 Prometheus 文本格式输出所有指标
+
+        :return: 文本格式的指标
+        """
+        lines: list[str] = []
+        for name, family in self._families.items():
+            if family.help:
+                lines.append(f"# HELP {name} {family.help}")
+            lines.append(f"# TYPE {name} {family.type}")
+            for key, metric in family.children.items():
+                if not isinstance(metric, Histogram):
+                    lines.append(f"{name}{_fmt_labels(key)} {_fmt_value(metric.value)}")
+                    continue
+
+                acc = 0
+                for bound, num in zip((*metric.buckets, float("inf")), metric.counts):
+                    acc += num
+                    le = f'le="{_fmt_value(bound)}"'
+                    lines.append(f"{name}_bucket{_fmt_labels(key, le)} {acc}")
+                lines.append(f"{name}_sum{_fmt_labels(key)} {_fmt_value(metric.sum)}")
+                lines.append(f"{name}_count{_fmt_labels(key)} {metric.count}")
+        lines.append("")
+        return "\n".join(lines)
+
+    async def handle_request(self, _: aiohttp.web.Request) -> aiohttp.web.Response:
+        """aiohttp 请求处理函数，可直接挂载到已有的 aiohttp 应用上"""
+        import aiohttp.web
+
+        return aiohttp.web.Response(
+            text=self.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    async def serve(self, host: str, port: int, path: str = "/metrics") -> None:
+        """启动独立的指标服务，用于没有 HTTP 服务的 IO 源（如 WebSocket IO 源）
+
+        :param host: 服务地址
+        :param port: 服务端口
+        :param path: 指标路径
+        """
+        if self._runner is not None:
+            raise RuntimeError("指标服务已在运行")
+
+        # aiohttp 只在需要独立指标服务时才导入，避免拖慢不使用 HTTP 的进程的启动
+        import aiohttp.web
+
+        app = aiohttp.web.Application()
+        app.add_routes([aiohttp.web.get(path, self.handle_request)])
+        self._runner = aiohttp.web.AppRunner(app)
+        await self._runner.setup()
+        await aiohttp.web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class IOMetrics:
+    """单个 IO 源的指标集合"""
+
+    __slots__ = (
+        "events",
+        "echoes",
+        "outputs",
+        "input_errors",
+        "output_errors",
+        "connects",
+        "connect_failures",
+        "echo_latency",
+        "cd_wait",
+    )
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        source: str,
+        in_buf: asyncio.Queue,
+        out_buf: asyncio.Queue,
+        echo_table: Sized,
+    ) -> None:
+        """初始化 IO 源的指标
+
+        :param registry: 指标注册表
+        :param source: IO 源标识，作为 `source` 标签的值
+        :param in_buf: 输入队列
+        :param out_buf: 输出队列
+        :param echo_table: 等待回应的表
+        """
+        labels = {"source": source}
+        r = registry
+        self.events = r.counter("onebot_io_events_total", "收到的上报事件数", labels)
+        self.echoes = r.counter("onebot_io_echoes_total", "收到的行为回应数", labels)
+        self.outputs = r.counter("onebot_io_outputs_total", "输出的行为数", labels)
+        self.input_errors = r.counter(
+            "onebot_io_input_errors_total", "输入处理异常数（含解码失败）", labels
+        )
+        self.output_errors = r.counter(
+            "onebot_io_output_errors_total", "输出处理异常数", labels
+        )
+        self.connects = r.counter("onebot_io_connects_total", "连接建立次数", labels)
+        self.connect_failures = r.counter(
+            "onebot_io_connect_failures_total", "连接建立失败次数", labels
+        )
+        self.echo_latency = r.histogram(
+            "onebot_io_echo_latency_seconds", "行为从提交到收到回应的耗时", labels
+        )
+        self.cd_wait = r.histogram(
+            "onebot_io_cd_wait_seconds", "输出前因发送冷却而等待的时间", labels
+        )
+        r.gauge("onebot_io_in_queue_depth", in_buf.qsize, "输入队列长度", labels)
+        r.gauge("onebot_io_out_queue_depth", out_buf.qsize, "输出队列长度", labels)
+        r.gauge(
+            "onebot_io_echo_table_size",
+            echo_table.__len__,
+            "等待回应的行为数",
+            labels,
+        )
+
+
+class AdapterMetrics:
+    """适配器的指标集合"""
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+        self.query_cache_hits = registry.counter(
+            "onebot_adapter_query_cache_hits_total", "由查询缓存直接给出回应的行为数"
+        )
+        self.coalesced = registry.counter(
+            "onebot_adapter_coalesced_total", "与执行中的相同查询合并的行为数"
+        )
+        self._actions: dict[str, Counter] = {}
+        self._events: dict[str, Counter] = {}
+
+    def action(self, action_type: str) -> Counter:
+        if (c := self._actions.get(action_type)) is None:
+            c = self._actions[action_type] = self.registry.counter(
+                "onebot_adapter_actions_total", "提交的行为数", {"action": action_type}
+            )
+        return c
+
+    def event(self, post_type: str) -> Counter:
+        if (c := self._events.get(post_type)) is None:
+            c = self._events[post_type] = self.registry.counter(
+                "onebot_adapter_events_total", "处理的事件数", {"post_type": post_type}
+            )
+        return c
+
+
+class HandleMetrics:
+    """处理流的指标集合"""
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+        self._flows: dict[str, tuple[Counter, Counter, Histogram]] = {}
+        self._limits: dict[str, tuple[Counter, Counter, Counter]] = {}
+
+    def flow(self, name: str) -> tuple[Counter, Counter, Histogram]:
+        """获取处理流的指标
+
+        :param name: 处理流名称
+        :return: 调用次数、通过检查并执行的次数、执行耗时
+        """
+        if (res := self._flows.get(name)) is None:
+            labels = {"flow": name}
+            res = self._flows[name] = (
+                self.registry.counter(
+                    "onebot_handle_calls_total", "处理流被调用的次数", labels
+                ),
+                self.registry.counter(
+                    "onebot_handle_hits_total", "处理流通过检查并执行的次数", labels
+                ),
+                self.registry.histogram(
+                    "onebot_handle_seconds", "处理流执行的耗时", labels
+                ),
+            )
+        return res
+
+    def limits(self, name: str) -> tuple[Counter, Counter, Counter]:
+        """获取处理流并发限制相关的指标
+
+        :param name: 处理流名称
+        :return: 因并发已满而排队的次数、因并发已满而拒绝的次数、执行超时的次数
+        """
+        if (res := self._limits.get(name)) is None:
+            labels = {"flow": name}
+            res = self._limits[name] = (
+                self.registry.counter(
+                    "onebot_handle_queued_total", "因并发已满而排队等待的调用数", labels
+                ),
+                self.registry.counter(
+                    "onebot_handle_rejected_total", "因并发已满而被拒绝的调用数", labels
+                ),
+                self.registry.counter(
+                    "onebot_handle_timeouts_total", "执行超时被取消的调用数", labels
+                ),
+            )
+        return res
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from .metrics import MetricsRegistry
+
+_T = TypeVar("_T")
+
+
+def _timed(func: Callable[..., _T], *args: Any) -> tuple[_T, float]:
+    start = time.perf_counter()
+    res = func(*args)
+    return res, time.perf_counter() - start
+
+
+class _LagProbe:
+    # 等待转移的任务期间，按固定间隔在事件循环中触发回调，累计回调晚于预定时间的延迟，
+    # 即事件循环在这段时间内实际被阻塞的时间
+    __slots__ = ("loop", "interval", "lag", "_due", "_handle")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float) -> None:
+        self.loop = loop
+        self.interval = interval
+        self.lag = 0.0
+        self._due = loop.time() + interval
+        self._handle = loop.call_at(self._due, self._tick)
+
+    def _tick(self) -> None:
+        now = self.loop.time()
+        self.lag += now - self._due
+        self._due = now + self.interval
+        self._handle = self.loop.call_at(self._due, self._tick)
+
+    def stop(self) -> float:
+        self._handle.cancel()
+        # 任务完成的回调同样要等事件循环空闲才能运行，最后一段的延迟也计入
+        if (now := self.loop.time()) > self._due:
+            self.lag += now - self._due
+        return self.lag
+
+
+class Offloader:
+    """按大小把解码与解析工作转移到线程池或进程池
+
+    超过阈值的上报数据在池中执行 `json.loads`，消息段过多的事件在池中执行 `Event.resolve`，
+    小数据仍在事件循环中直接处理。调用方总是等待结果后再处理下一个数据，因此同一 IO 源中的顺序不变。
+
+    默认使用线程池。`json.loads` 与模型校验不释放 GIL，线程池不能并行解码，
+    但事件循环会按解释器的线程切换间隔得到运行，不会被一个大数据包阻塞到解码结束。
+    需要真正的并行时可传入进程池，代价是结果需要在进程间序列化。
+
+    等待转移的任务期间，以 `probe_interval` 为间隔探测事件循环的延迟。任务在池中的耗时即在事件循环中
+    直接执行时的阻塞时间，减去等待期间探测到的阻塞时间，就是转移为事件循环避免的阻塞时间
+    """
+
+    def __init__(
+        self,
+        size_threshold: int = 256 * 1024,
+        segment_threshold: int = 200,
+        executor: Executor | None = None,
+        max_workers: int = 2,
+        metrics: MetricsRegistry | None = None,
+        probe_interval: float = 0.005,
+    ) -> None:
+        """初始化一个转移器
+
+        :param size_threshold: 上报数据的字节数（字符数）超过此值时转移解码
+        :param segment_threshold: 事件的消息段数超过此值时转移解析
+        :param executor: 执行器，为空则创建线程池
+        :param max_workers: 创建线程池时的线程数
+        :param metrics: 指标注册表，为空则不收集指标
+        :param probe_interval: 探测事件循环延迟的间隔（秒）
+        """
+        self.size_threshold = size_threshold
+        self.segment_threshold = segment_threshold
+        self.probe_interval = probe_interval
+        self.executor = (
+            ThreadPoolExecutor(max_workers, thread_name_prefix="onebot-offload")
+            if executor is None
+            else executor
+        )
+        #: 被转移的任务数
+        self.offloaded = 0
+        #: 被转移的任务在池中的总耗时（秒）
+        self.offloaded_seconds = 0.0
+        #: 转移为事件循环避免的总阻塞时间（秒）
+        self.stall_avoided_seconds = 0.0
+
+        self._counter = self._seconds = self._avoided = None
+        if metrics is not None:
+            self._counter = metrics.counter(
+                "onebot_offload_total", "被转移到池中执行的任务数"
+            )
+            self._seconds = metrics.counter(
+                "onebot_offload_seconds_total",
+                "被转移的任务在池中的总耗时",
+            )
+            self._avoided = metrics.counter(
+                "onebot_offload_stall_avoided_seconds_total",
+                "转移为事件循环避免的阻塞时间",
+            )
+
+    async def _run(self, func: Callable[..., _T], *args: Any) -> _T:
+        loop = asyncio.get_running_loop()
+        probe = _LagProbe(loop, self.probe_interval)
+        try:
+            res, cost = await loop.run_in_executor(self.executor, _timed, func, *args)
+        finally:
+            lag = probe.stop()
+        avoided = max(cost - lag, 0.0)
+        self.offloaded += 1
+        self.offloaded_seconds += cost
+        self.stall_avoided_seconds += avoided
+        if self._counter is not None:
+            self._counter.inc()
+        if self._seconds is not None:
+            self._seconds.inc(cost)
+        if self._avoided is not None:
+            self._avoided.inc(avoided)
+        return res
+
+    async def loads(self, data: str | bytes) -> Any:
+        """解码 json 数据，超过阈值时在池中执行
+
+        :param data: json 数据
+        :return: 解码结果
+        """
+        if len(data) <= self.size_threshold:
+            return json.loads(data)
+        return await self._run(json.loads, data)
+
+    def heavy_event(self, raw: dict[str, Any]) -> bool:
+        """判断事件是否需要在池中解析
+
+        :param raw: 事件的原始字典
+        :return: 是否需要转移
+        """
+        msg = raw.get("message")
+        if isinstance(msg, list):
+            return len(msg) > self.segment_threshold
+        return isinstance(msg, str) and len(msg) > self.size_threshold
+
+    async def resolve(
+        self, func: Callable[[dict[str, Any]], _T], raw: dict[str, Any]
+    ) -> _T:
+        """解析事件，事件过大时在池中执行
+
+        :param func: 解析函数
+        :param raw: 事件的原始字典
+        :return: 解析结果
+        """
+        if not self.heavy_event(raw):
+            return func(raw)
+        return await self._run(func, raw)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False)
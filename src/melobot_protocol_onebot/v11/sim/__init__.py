@@ -0,0 +1,2 @@
+from .payload import DEFAULT_EVENT_MIX, PayloadFactory
+from .simulator import SimConfig, SimStats, Simulator
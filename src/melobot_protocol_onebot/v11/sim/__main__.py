@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import json
+
+from .simulator import SimConfig, SimStats, Simulator
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m melobot_protocol_onebot.v11.sim",
+        description="OneBot v11 实现端模拟器与压测工具",
+    )
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    ws_server = sub.add_parser(
+        "ws-server", help="作为 WebSocket 服务端（对接 ForwardWebSocketIO）"
+    )
+    ws_server.add_argument("--host", default="127.0.0.1")
+    ws_server.add_argument("--port", type=int, default=8080)
+
+    ws_client = sub.add_parser(
+        "ws-client", help="作为 WebSocket 客户端（对接 ReverseWebSocketIO）"
+    )
+    ws_client.add_argument("url")
+
+    http = sub.add_parser("http", help="作为 HTTP 上报端与 API 服务端（对接 HttpIO）")
+    http.add_argument("post_url", help="事件上报地址")
+    http.add_argument("--host", default="127.0.0.1", help="API 服务地址")
+    http.add_argument("--port", type=int, default=8090, help="API 服务端口")
+
+    for p in (ws_server, ws_client, http):
+        p.add_argument("--rate", type=float, default=100, help="上报速率（个/秒）")
+        p.add_argument("--duration", type=float, default=10, help="上报持续时间（秒）")
+        p.add_argument("--total", type=int, default=None, help="上报事件总数")
+        p.add_argument(
+            "--mix",
+            type=json.loads,
+            default=None,
+            help='事件组成，如 {"group_message": 1}',
+        )
+        p.add_argument("--self-id", type=int, default=10000)
+        p.add_argument("--latency", type=float, default=0, help="回应延迟（秒）")
+        p.add_argument("--jitter", type=float, default=0, help="回应延迟抖动（秒）")
+        p.add_argument("--error-rate", type=float, default=0, help="回应失败比例")
+        p.add_argument(
+            "--linger", type=float, default=1, help="上报结束后的等待时间（秒）"
+        )
+        p.add_argument("--seed", type=int, default=None)
+        p.add_argument("--access-token", default=None)
+        p.add_argument("--secret", default=None)
+    return parser.parse_args()
+
+
+async def _run(args: argparse.Namespace) -> SimStats:
+    sim = Simulator(
+        SimConfig(
+            rate=args.rate,
+            duration=args.duration,
+            total=args.total,
+            mix=args.mix,
+            self_id=args.self_id,
+            echo_latency=args.latency,
+            echo_jitter=args.jitter,
+            error_rate=args.error_rate,
+            linger=args.linger,
+            seed=args.seed,
+            access_token=args.access_token,
+            secret=args.secret,
+        )
+    )
+    if args.mode == "ws-server":
+        return await sim.serve_ws(args.host, args.port)
+    if args.mode == "ws-client":
+        return await sim.connect_ws(args.url)
+    return await sim.serve_http(args.host, args.port, args.post_url)
+
+
+def main() -> None:
+    stats = asyncio.run(_run(_parse_args()))
+    print(json.dumps(stats.report(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+import random
+import time
+from typing import Any, Mapping
+
+from ..adapter.echo import Echo
+from ..adapter.event import Event
+
+#: 默认的事件组成，键为事件种类，值为权重
+DEFAULT_EVENT_MIX: dict[str, float] = {
+    "group_message": 80,
+    "private_message": 10,
+    "poke": 3,
+    "group_recall": 2,
+    "group_increase": 2,
+    "group_decrease": 1,
+    "friend_request": 1,
+    "group_request": 1,
+}
+
+_WORDS = ("你好", "今天", "吃什么", "hello", "world", "melobot", "哈哈哈", "确实", "？")
+
+
+class PayloadFactory:
+    """模拟实现端的上报事件与行为回应生成器
+
+    生成的数据与实现端的格式一致，可通过 :meth:`check` 用适配器的事件与回应模型校验
+    """
+
+    def __init__(
+        self,
+        self_id: int = 10000,
+        group_num: int = 20,
+        user_num: int = 500,
+        mix: Mapping[str, float] | None = None,
+        seed: int | None = None,
+    ) -> None:
+        """初始化一个生成器
+
+        :param self_id: 模拟的机器人 qq 号
+        :param group_num: 模拟的群数
+        :param user_num: 模拟的用户数
+        :param mix: 事件组成，为空则使用 :data:`DEFAULT_EVENT_MIX`
+        :param seed: 随机种子，为空则不固定
+        """
+        mix = DEFAULT_EVENT_MIX if mix is None else mix
+        for kind in mix:
+            if not hasattr(self, f"_make_{kind}"):
+                raise ValueError(f"不支持的模拟事件种类：{kind}")
+
+        self.self_id = self_id
+        self.groups = [100000 + i for i in range(group_num)]
+        self.users = [20000 + i for i in range(user_num)]
+        self._kinds = list(mix.keys())
+        self._weights = list(mix.values())
+        self._rng = random.Random(seed)
+        self._msg_id = 0
+
+    def _next_msg_id(self) -> int:
+        self._msg_id += 1
+        return self._msg_id
+
+    def _head(self, post_type: str) -> dict[str, Any]:
+        return {"time": int(time.time()), "self_id": self.self_id, "post_type": post_type}
+
+    def _message(self) -> tuple[list[dict[str, Any]], str]:
+        rng = self._rng
+        segs: list[dict[str, Any]] = []
+        if rng.random() < 0.2:
+            segs.append({"type": "at", "data": {"qq": str(rng.choice(self.users))}})
+        if rng.random() < 0.1:
+            segs.append({"type": "face", "data": {"id": str(rng.randint(0, 300))}})
+        text = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 8)))
+        segs.append({"type": "text", "data": {"text": text}})
+        return segs, text
+
+    def _make_group_message(self) -> dict[str, Any]:
+        uid = self._rng.choice(self.users)
+        message, raw = self._message()
+        return self._head("message") | {
+            "message_type": "group",
+            "sub_type": "normal",
+            "message_id": self._next_msg_id(),
+            "group_id": self._rng.choice(self.groups),
+            "user_id": uid,
+            "anonymous": None,
+            "message": message,
+            "raw_message": raw,
+            "font": 0,
+            "sender": {
+                "user_id": uid,
+                "nickname": f"user-{uid}",
+                "card": "",
+                "sex": "unknown",
+                "age": 0,
+                "area": "",
+                "level": "1",
+                "role": "member",
+                "title": "",
+            },
+        }
+
+    def _make_private_message(self) -> dict[str, Any]:
+        uid = self._rng.choice(self.users)
+        message, raw = self._message()
+        return self._head("message") | {
+            "message_type": "private",
+            "sub_type": "friend",
+            "message_id": self._next_msg_id(),
+            "user_id": uid,
+            "message": message,
+            "raw_message": raw,
+            "font": 0,
+            "sender": {
+                "user_id": uid,
+                "nickname": f"user-{uid}",
+                "sex": "unknown",
+                "age": 0,
+            },
+        }
+
+    def _make_poke(self) -> dict[str, Any]:
+        return self._head("notice") | {
+            "notice_type": "notify",
+            "sub_type": "poke",
+            "group_id": self._rng.choice(self.groups),
+            "user_id": self._rng.choice(self.users),
+            "target_id": self.self_id,
+        }
+
+    def _make_group_recall(self) -> dict[str, Any]:
+        uid = self._rng.choice(self.users)
+        return self._head("notice") | {
+            "notice_type": "group_recall",
+            "group_id": self._rng.choice(self.groups),
+            "user_id": uid,
+            "operator_id": uid,
+            "message_id": self._rng.randint(1, max(self._msg_id, 1)),
+        }
+
+    def _make_group_increase(self) -> dict[str, Any]:
+        return self._head("notice") | {
+            "notice_type": "group_increase",
+            "sub_type": "approve",
+            "group_id": self._rng.choice(self.groups),
+            "operator_id": self._rng.choice(self.users),
+            "user_id": self._rng.choice(self.users),
+        }
+
+    def _make_group_decrease(self) -> dict[str, Any]:
+        uid = self._rng.choice(self.users)
+        return self._head("notice") | {
+            "notice_type": "group_decrease",
+            "sub_type": "leave",
+            "group_id": self._rng.choice(self.groups),
+            "operator_id": uid,
+            "user_id": uid,
+        }
+
+    def _make_friend_request(self) -> dict[str, Any]:
+        return self._head("request") | {
+            "request_type": "friend",
+            "user_id": self._rng.choice(self.users),
+            "comment": "hello",
+            "flag": f"{self._rng.getrandbits(64):016x}",
+        }
+
+    def _make_group_request(self) -> dict[str, Any]:
+        return self._head("request") | {
+            "request_type": "group",
+            "sub_type": "add",
+            "group_id": self._rng.choice(self.groups),
+            "user_id": self._rng.choice(self.users),
+            "comment": "hello",
+            "flag": f"{self._rng.getrandbits(64):016x}",
+        }
+
+    def _make_heartbeat(self) -> dict[str, Any]:
+        return self._head("meta_event") | {
+            "meta_event_type": "heartbeat",
+            "status": {"online": True, "good": True},
+            "interval": 5000,
+        }
+
+    def event(self, kind: str | None = None) -> dict[str, Any]:
+        """生成一个上报事件
+
+        :param kind: 事件种类，为空则按事件组成随机选择
+        :return: 上报数据
+        """
+        if kind is None:
+            kind = self._rng.choices(self._kinds, self._weights)[0]
+        return getattr(self, f"_make_{kind}")()  # type: ignore[no-any-return]
+
+    def echo_data(self, action_type: str, params: Mapping[str, Any]) -> Any:
+        """生成行为回应的数据部分
+
+        :param action_type: 行为类型
+        :param params: 行为参数
+        :return: 回应数据，未模拟的行为类型为空
+        """
+        rng = self._rng
+        match action_type:
+            case "send_msg" | "send_private_msg" | "send_group_msg":
+                return {"message_id": self._next_msg_id()}
+            case "send_private_forward_msg" | "send_group_forward_msg":
+                return {
+                    "message_id": self._next_msg_id(),
+                    "forward_id": f"{rng.getrandbits(64):016x}",
+                }
+            case "get_login_info":
+                return {"user_id": self.self_id, "nickname": "melobot"}
+            case "get_stranger_info":
+                uid = params.get("user_id", 0)
+                return {
+                    "user_id": uid,
+                    "nickname": f"user-{uid}",
+                    "sex": "unknown",
+                    "age": 0,
+                }
+            case "get_friend_list":
+                return [
+                    {"user_id": uid, "nickname": f"user-{uid}", "remark": ""}
+                    for uid in self.users[:50]
+                ]
+            case "get_group_info":
+                return self._group_info(params.get("group_id", self.groups[0]))
+            case "get_group_list":
+                return [self._group_info(gid) for gid in self.groups]
+            case "get_group_member_info":
+                return self._member_info(
+                    params.get("group_id", self.groups[0]),
+                    params.get("user_id", self.users[0]),
+                )
+            case "get_group_member_list":
+                gid = params.get("group_id", self.groups[0])
+                return [self._member_info(gid, uid) for uid in self.users]
+            case "get_status":
+                return {"online": True, "good": True}
+            case "get_version_info":
+                return {
+                    "app_name": "melobot-sim",
+                    "app_version": "1.0.0",
+                    "protocol_version": "v11",
+                }
+            case "can_send_image" | "can_send_record":
+                return {"yes": True}
+            case _:
+                return None
+
+    def _group_info(self, group_id: int) -> dict[str, Any]:
+        return {
+            "group_id": group_id,
+            "group_name": f"group-{group_id}",
+            "member_count": len(self.users),
+            "max_member_count": 2000,
+        }
+
+    def _member_info(self, group_id: int, user_id: int) -> dict[str, Any]:
+        return {
+            "group_id": group_id,
+            "user_id": user_id,
+            "nickname": f"user-{user_id}",
+            "card": "",
+            "sex": "unknown",
+            "age": 0,
+            "area": "",
+            "join_time": 1700000000,
+            "last_sent_time": int(time.time()),
+            "level": "1",
+            "role": "owner" if user_id == self.users[0] else "member",
+            "unfriendly": False,
+            "title": "",
+            "title_expire_time": 0,
+            "card_changeable": True,
+        }
+
+    def echo(
+        self,
+        action_type: str,
+        params: Mapping[str, Any],
+        echo_id: str | None,
+        failed: bool = False,
+    ) -> dict[str, Any]:
+        """生成一个行为回应
+
+        :param action_type: 行为类型
+        :param params: 行为参数
+        :param echo_id: 行为的 echo 标识
+        :param failed: 是否生成失败的回应
+        :return: 回应数据
+        """
+        if failed:
+            return {"status": "failed", "retcode": 100, "data": None, "echo": echo_id}
+        return {
+            "status": "ok",
+            "retcode": 0,
+            "data": self.echo_data(action_type, params),
+            "echo": echo_id,
+        }
+
+    def check(self) -> None:
+        """用适配器的事件与回应模型校验每种事件与已模拟的回应，不合法时抛出异常"""
+        for kind in self._kinds:
+            Event.resolve(self.event(kind))
+        for action_type in (
+            "send_msg",
+            "send_group_forward_msg",
+            "get_login_info",
+            "get_stranger_info",
+            "get_friend_list",
+            "get_group_info",
+            "get_group_list",
+            "get_group_member_info",
+            "get_group_member_list",
+            "get_status",
+            "get_version_info",
+            "can_send_image",
+        ):
+            Echo.resolve(action_type=action_type, **self.echo(action_type, {}, "0"))
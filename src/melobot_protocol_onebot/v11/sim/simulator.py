@@ -0,0 +1,356 @@
+import asyncio
+import hmac
+import http
+import json
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Mapping
+
+import aiohttp
+import aiohttp.web
+import websockets
+import websockets.server
+from websockets.exceptions import ConnectionClosed
+
+from .payload import PayloadFactory
+
+_REPLY_ACTIONS = frozenset(
+    {
+        "send_msg",
+        "send_private_msg",
+        "send_group_msg",
+        "send_private_forward_msg",
+        "send_group_forward_msg",
+    }
+)
+
+
+@dataclass
+class SimConfig:
+    """模拟实现端的配置
+
+    :ivar rate: 上报事件的目标速率（个/秒）
+    :ivar duration: 上报持续时间（秒），为空则不限
+    :ivar total: 上报事件总数，为空则不限
+    :ivar mix: 事件组成，为空则使用默认组成
+    :ivar self_id: 模拟的机器人 qq 号
+    :ivar group_num: 模拟的群数
+    :ivar user_num: 模拟的用户数
+    :ivar echo_latency: 回应行为前的平均延迟（秒）
+    :ivar echo_jitter: 回应延迟的随机抖动范围（秒）
+    :ivar error_rate: 回应失败的比例
+    :ivar linger: 上报结束后继续等待行为的时间（秒）
+    :ivar seed: 随机种子，为空则不固定
+    :ivar access_token: 鉴权用的 access_token
+    :ivar secret: HTTP 上报签名用的密钥
+    """
+
+    rate: float = 100
+    duration: float | None = 10
+    total: int | None = None
+    mix: Mapping[str, float] | None = None
+    self_id: int = 10000
+    group_num: int = 20
+    user_num: int = 500
+    echo_latency: float = 0
+    echo_jitter: float = 0
+    error_rate: float = 0
+    linger: float = 1
+    seed: int | None = None
+    access_token: str | None = None
+    secret: str | None = None
+
+
+@dataclass
+class SimStats:
+    """模拟运行的统计
+
+    回复延迟为消息事件上报到机器人向同一会话发送消息之间的耗时，每条消息事件最多匹配一次回复
+    """
+
+    events: int = 0
+    actions: int = 0
+    failed_echoes: int = 0
+    reply_latencies: list[float] = field(default_factory=list)
+    start_time: float = 0
+    end_time: float = 0
+
+    def percentile(self, q: float) -> float:
+        """计算回复延迟的分位数
+
+        :param q: 分位（0-100）
+        :return: 延迟（秒），没有样本时为 0
+        """
+        if not self.reply_latencies:
+            return 0
+        data = sorted(self.reply_latencies)
+        idx = min(len(data) - 1, max(0, round(q / 100 * len(data)) - 1))
+        return data[idx]
+
+    def report(self) -> dict[str, Any]:
+        elapsed = max(self.end_time - self.start_time, 1e-9)
+        lat = self.reply_latencies
+        return {
+            "elapsed": elapsed,
+            "events": self.events,
+            "event_rate": self.events / elapsed,
+            "actions": self.actions,
+            "action_rate": self.actions / elapsed,
+            "failed_echoes": self.failed_echoes,
+            "replies": len(lat),
+            "reply_latency_ms": {
+                "mean": sum(lat) / len(lat) * 1000 if lat else 0,
+                "p50": self.percentile(50) * 1000,
+                "p90": self.percentile(90) * 1000,
+                "p99": self.percentile(99) * 1000,
+                "max": max(lat) * 1000 if lat else 0,
+            },
+        }
+
+
+class Simulator:
+    """OneBot v11 实现端模拟器与压测工具
+
+    可作为 WebSocket 服务端（对接 :class:`.ForwardWebSocketIO`）、WebSocket 客户端（对接
+    :class:`.ReverseWebSocketIO`），或 HTTP 上报端与 API 服务端（对接 :class:`.HttpIO`）运行。
+    按目标速率上报事件，按配置的延迟与失败率回应行为，并统计回复延迟
+    """
+
+    def __init__(self, config: SimConfig | None = None) -> None:
+        self.config = SimConfig() if config is None else config
+        self.factory = PayloadFactory(
+            self.config.self_id,
+            self.config.group_num,
+            self.config.user_num,
+            self.config.mix,
+            self.config.seed,
+        )
+        self.stats = SimStats()
+
+        self._rng = random.Random(self.config.seed)
+        self._pending: dict[tuple[str, int], deque[float]] = {}
+        self._stopped = asyncio.Event()
+        self._reply_tasks: set[asyncio.Task] = set()
+
+    def stop(self) -> None:
+        """提前结束上报"""
+        self._stopped.set()
+
+    def _track(self, event: dict[str, Any], now: float) -> None:
+        if event["post_type"] != "message":
+            return
+        if event["message_type"] == "group":
+            key = ("group", event["group_id"])
+        else:
+            key = ("private", event["user_id"])
+        self._pending.setdefault(key, deque()).append(now)
+
+    def _match_reply(self, action_type: str, params: Mapping[str, Any]) -> None:
+        if action_type not in _REPLY_ACTIONS:
+            return
+        if "group_id" in params and params.get("message_type") != "private":
+            key = ("group", params["group_id"])
+        elif "user_id" in params:
+            key = ("private", params["user_id"])
+        else:
+            return
+        if waits := self._pending.get(key):
+            self.stats.reply_latencies.append(time.perf_counter() - waits.popleft())
+
+    async def _answer(
+        self, action_type: str, params: Mapping[str, Any], echo_id: str | None
+    ) -> dict[str, Any]:
+        self.stats.actions += 1
+        self._match_reply(action_type, params)
+
+        cfg = self.config
+        delay = cfg.echo_latency + self._rng.uniform(-cfg.echo_jitter, cfg.echo_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        failed = self._rng.random() < cfg.error_rate
+        if failed:
+            self.stats.failed_echoes += 1
+        return self.factory.echo(action_type, params, echo_id, failed)
+
+    async def _pump(self, send: Callable[[str], Awaitable[Any]]) -> None:
+        cfg = self.config
+        loop = asyncio.get_running_loop()
+        interval = 1 / cfg.rate
+        start = loop.time()
+        self.stats.start_time = time.perf_counter()
+
+        idx = 0
+        while not self._stopped.is_set():
+            if cfg.total is not None and idx >= cfg.total:
+                break
+            if cfg.duration is not None and loop.time() - start >= cfg.duration:
+                break
+
+            delay = start + idx * interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            event = self.factory.event()
+            self._track(event, time.perf_counter())
+            await send(json.dumps(event, ensure_ascii=False))
+            self.stats.events += 1
+            idx += 1
+
+    async def _finish(self) -> SimStats:
+        try:
+            await asyncio.wait_for(self._stopped.wait(), self.config.linger)
+        except asyncio.TimeoutError:
+            pass
+        self.stats.end_time = time.perf_counter()
+        for t in self._reply_tasks:
+            t.cancel()
+        return self.stats
+
+    async def _ws_reply(self, ws: Any, raw: dict[str, Any]) -> None:
+        echo = await self._answer(raw["action"], raw.get("params", {}), raw.get("echo"))
+        if "echo" in raw:
+            try:
+                await ws.send(json.dumps(echo, ensure_ascii=False))
+            except ConnectionClosed:
+                pass
+
+    async def _ws_recv(self, ws: Any) -> None:
+        try:
+            async for frame in ws:
+                t = asyncio.create_task(self._ws_reply(ws, json.loads(frame)))
+                self._reply_tasks.add(t)
+                t.add_done_callback(self._reply_tasks.discard)
+        except ConnectionClosed:
+            self._stopped.set()
+
+    async def _run_ws(self, ws: Any) -> SimStats:
+        receiver = asyncio.create_task(self._ws_recv(ws))
+        try:
+            await self._pump(ws.send)
+            return await self._finish()
+        finally:
+            receiver.cancel()
+
+    async def serve_ws(self, host: str, port: int) -> SimStats:
+        """作为 WebSocket 服务端运行，等待 :class:`.ForwardWebSocketIO` 连接后开始上报
+
+        :param host: 服务地址
+        :param port: 服务端口
+        :return: 运行统计
+        """
+        conn_fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        done = asyncio.Event()
+
+        async def check(
+            _: str, headers: websockets.HeadersLike
+        ) -> tuple[http.HTTPStatus, websockets.HeadersLike, bytes] | None:
+            token = self.config.access_token
+            if (
+                token is not None
+                and dict(headers).get("Authorization") != f"Bearer {token}"
+            ):
+                return http.HTTPStatus.FORBIDDEN, [], b"Authorization failed\n"
+            if conn_fut.done():
+                return http.HTTPStatus.FORBIDDEN, [], b"Already connected\n"
+            return None
+
+        async def handler(ws: websockets.server.WebSocketServerProtocol) -> None:
+            conn_fut.set_result(ws)
+            await done.wait()
+
+        server = await websockets.serve(handler, host, port, process_request=check)
+        try:
+            return await self._run_ws(await conn_fut)
+        finally:
+            done.set()
+            server.close()
+            await server.wait_closed()
+
+    async def connect_ws(
+        self, url: str, retry_delay: float = 1, max_retry: int = 30
+    ) -> SimStats:
+        """作为 WebSocket 客户端运行，连接到 :class:`.ReverseWebSocketIO` 后开始上报
+
+        :param url: 连接地址
+        :param retry_delay: 连接失败的重试间隔（秒）
+        :param max_retry: 最大重试次数
+        :return: 运行统计
+        """
+        headers = None
+        if self.config.access_token is not None:
+            headers = {"Authorization": f"Bearer {self.config.access_token}"}
+
+        for i in range(max_retry + 1):
+            try:
+                ws = await websockets.connect(url, extra_headers=headers)
+                break
+            except OSError:
+                if i == max_retry:
+                    raise
+                await asyncio.sleep(retry_delay)
+
+        try:
+            return await self._run_ws(ws)
+        finally:
+            await ws.close()
+
+    async def serve_http(
+        self, host: str, port: int, post_url: str, max_inflight: int = 256
+    ) -> SimStats:
+        """作为 HTTP API 服务端运行，同时向 :class:`.HttpIO` 的服务地址上报事件
+
+        :param host: API 服务地址
+        :param port: API 服务端口
+        :param post_url: 事件上报地址
+        :param max_inflight: 同时在途的最大上报请求数
+        :return: 运行统计
+        """
+        token = self.config.access_token
+
+        async def api(request: aiohttp.web.Request) -> aiohttp.web.Response:
+            if (
+                token is not None
+                and request.headers.get("Authorization") != f"Bearer {token}"
+            ):
+                return aiohttp.web.Response(status=401)
+            params = await request.json() if request.can_read_body else {}
+            echo = await self._answer(request.match_info["action"], params, None)
+            echo.pop("echo")
+            return aiohttp.web.json_response(echo)
+
+        app = aiohttp.web.Application()
+        app.add_routes([aiohttp.web.post("/{action}", api)])
+        runner = aiohttp.web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await aiohttp.web.TCPSite(runner, host, port).start()
+
+        sem = asyncio.Semaphore(max_inflight)
+        session = aiohttp.ClientSession()
+
+        async def post(data: str) -> None:
+            body = data.encode()
+            headers = {"Content-Type": "application/json"}
+            if self.config.secret is not None:
+                sign = hmac.new(self.config.secret.encode(), body, "sha1").hexdigest()
+                headers["X-Signature"] = f"sha1={sign}"
+            try:
+                async with session.post(post_url, data=body, headers=headers) as resp:
+                    await resp.read()
+            except aiohttp.ClientError:
+                pass
+            finally:
+                sem.release()
+
+        async def send(data: str) -> None:
+            await sem.acquire()
+            t = asyncio.create_task(post(data))
+            self._reply_tasks.add(t)
+            t.add_done_callback(self._reply_tasks.discard)
+
+        try:
+            await self._pump(send)
+            return await self._finish()
+        finally:
+            await session.close()
+            await runner.cleanup()
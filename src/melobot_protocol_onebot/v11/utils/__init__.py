@@ -1,6 +1,7 @@
 from .abc import ParseArgs
 from .check import (
     AtMsgChecker,
+    CooldownChecker,
     GroupMsgChecker,
     GroupRole,
     LevelRole,
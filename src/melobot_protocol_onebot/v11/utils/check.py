@@ -1,5 +1,8 @@
+import math
+import time
 from enum import Enum
-from typing import Literal, Optional, cast
+from operator import attrgetter
+from typing import Callable, Hashable, Literal, Optional, Sequence, cast
 
 from melobot.typ import AsyncCallable
 
@@ -8,6 +11,16 @@ from ..adapter.segment import AtSegment
 from .abc import Checker
 
 
+async def _send_text(text: str) -> None:
+    # 通用文本发送接口在 melobot 3.0.0rc4 中位于 handle.generic，之后的版本移到了 adapter.generic。
+    # 只在需要回复时导入，因此两种版本下导入本包都不受影响
+    try:
+        from melobot.handle.generic import send_text
+    except ImportError:
+        from melobot.adapter.generic import send_text
+    await send_text(text)
+
+
 class LevelRole(int, Enum):
     """用户权限等级枚举"""
 
@@ -316,3 +329,116 @@ class AtMsgChecker(Checker):
         if self.qid is None:
             return len(qids) > 0
         return any(id == self.qid for id in qids)
+
+
+class CooldownChecker(Checker):
+    """冷却检查器
+
+    同一个键（默认为用户 qq 号）在通过检查后的 `cooldown` 秒内，再次检查均不通过。
+    与其他检查器以 `&` 组合时应放在最后，这样只有其他检查都通过时才会开始冷却。
+
+    键的冷却结束时间存储在字典中，同时按到期时间放入时间轮的槽中（每槽 `resolution` 秒）。
+    每次检查时只清扫上次检查以来到期的槽，因此检查与清扫的均摊复杂度均为 O(1)，过期的键会被自动移除。
+    跟踪的键数超过 `max_keys` 时，最早到期的键会被提前移除，并同时从所在的槽中移除，
+    因此字典与时间轮中的键数都不超过 `max_keys`
+    """
+
+    def __init__(
+        self,
+        cooldown: float,
+        key: str | Sequence[str] | Callable[[Event], Hashable] = "user_id",
+        max_keys: int = 100000,
+        resolution: float | None = None,
+        hint: str | None = None,
+    ) -> None:
+        """初始化一个冷却检查器
+
+        :param cooldown: 冷却时间（秒）
+        :param key: 冷却的键，为事件的属性名、属性名序列（如 `("group_id", "user_id")`）或从事件计算键的函数
+        :param max_keys: 同时跟踪的键数上限
+        :param resolution: 时间轮每槽的时长（秒），为空则取冷却时间的 1/64
+        :param hint: 冷却中的提示文本，可使用 `{remain}` 占位冷却剩余秒数。
+            每个键在一次冷却中至多提示一次，为空则不提示
+        """
+        super().__init__()
+        if cooldown <= 0 or max_keys < 1:
+            raise ValueError("冷却时间与键数上限必须为正数")
+        self.cooldown = cooldown
+        self.max_keys = max_keys
+        self.resolution = cooldown / 64 if resolution is None else resolution
+        self.hint = hint
+
+        if callable(key):
+            self._key_of = key
+        elif isinstance(key, str):
+            self._key_of = attrgetter(key)
+        else:
+            self._key_of = attrgetter(*key)
+
+        self._expires: dict[Hashable, float] = {}
+        self._hinted: set[Hashable] = set()
+        self._wheel: list[set[Hashable]] = [
+            set() for _ in range(math.ceil(cooldown / self.resolution) + 1)
+        ]
+        self._tick = math.floor(time.monotonic() / self.resolution)
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def _slot(self, expire: float) -> set[Hashable]:
+        return self._wheel[math.floor(expire / self.resolution) % len(self._wheel)]
+
+    def _forget(self, key: Hashable) -> None:
+        self._slot(self._expires.pop(key)).discard(key)
+        self._hinted.discard(key)
+
+    def _sweep(self, now: float) -> None:
+        # 只清扫已完全过去的槽，当前槽中的键可能尚未到期
+        tick = math.floor(now / self.resolution)
+        if tick - self._tick >= len(self._wheel):
+            for slot in self._wheel:
+                slot.clear()
+            self._expires.clear()
+            self._hinted.clear()
+        else:
+            wheel, expires = self._wheel, self._expires
+            for t in range(self._tick, tick):
+                # 槽中恰好是到期时间落在该槽内的键，槽已完全过去，因此它们都已到期
+                slot = wheel[t % len(wheel)]
+                for key in slot:
+                    del expires[key]
+                    self._hinted.discard(key)
+                slot.clear()
+        self._tick = tick
+
+    def remain(self, event: Event) -> float:
+        """获取事件对应的键的剩余冷却时间
+
+        :param event: 事件
+        :return: 剩余冷却时间（秒），不在冷却中为 0
+        """
+        now = time.monotonic()
+        self._sweep(now)
+        return max(self._expires.get(self._key_of(event), now) - now, 0)
+
+    async def check(self, event: Event) -> bool:
+        now = time.monotonic()
+        self._sweep(now)
+        key = self._key_of(event)
+
+        expire = self._expires.get(key)
+        if expire is not None and expire > now:
+            if self.hint is not None and key not in self._hinted:
+                self._hinted.add(key)
+                await _send_text(self.hint.format(remain=math.ceil(expire - now)))
+            return False
+
+        if expire is not None:
+            self._forget(key)
+        elif len(self._expires) >= self.max_keys:
+            self._forget(next(iter(self._expires)))
+
+        expire = now + self.cooldown
+        self._expires[key] = expire
+        self._slot(expire).add(key)
+        return True
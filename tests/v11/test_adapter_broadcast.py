@@ -0,0 +1,148 @@
+import json
+import time
+
+from melobot.adapter import AdapterLifeSpan
+from melobot.ctx import LoggerCtx
+from melobot.log.base import Logger
+
+from melobot_protocol_onebot.v11.adapter import segment
+from melobot_protocol_onebot.v11.adapter.action import Action
+from melobot_protocol_onebot.v11.adapter.base import Adapter
+from melobot_protocol_onebot.v11.adapter.broadcast import Broadcast, BroadcastCheckpoint
+from melobot_protocol_onebot.v11.adapter.echo import SendMsgEcho
+from melobot_protocol_onebot.v11.io.base import BaseIO
+from melobot_protocol_onebot.v11.io.packet import EchoPacket, InPacket, OutPacket
+from melobot_protocol_onebot.v11.metrics import MetricsRegistry
+from tests.base import *
+
+_SEND_ECHO = {"status": "ok", "retcode": 0, "data": {"message_id": 1}}
+_FAIL_ECHO = {"status": "failed", "retcode": 100, "data": None}
+
+
+class SendIO(BaseIO):
+    def __init__(self, fail_ids: tuple[int, ...] = ()) -> None:
+        super().__init__(0)
+        self.fail_ids = fail_ids
+        self.outputs: list[OutPacket] = []
+        self.inflight = 0
+        self.max_inflight = 0
+
+    async def open(self) -> None:
+        pass
+
+    def opened(self) -> bool:
+        return True
+
+    async def close(self) -> None:
+        pass
+
+    async def input(self) -> InPacket:
+        raise NotImplementedError
+
+    async def output(self, packet: OutPacket) -> EchoPacket:
+        self.outputs.append(packet)
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        await aio.sleep(0.01)
+        self.inflight -= 1
+        params = packet.action_params
+        tid = params.get("group_id", params.get("user_id"))
+        data = _FAIL_ECHO if tid in self.fail_ids else _SEND_ECHO
+        return EchoPacket(data=data, action_type=packet.action_type)
+
+
+async def test_broadcast_packet() -> None:
+    io = SendIO()
+    msgs = [segment.TextSegment('引号"与\\'), segment.FaceSegment(1)]
+    results = await Broadcast(io, msgs, group_ids=[1, 2], user_ids=[3], window=2)
+
+    assert len(results) == 3 and io.max_inflight == 2
+    assert all(isinstance(e, SendMsgEcho) and e.ok for e in results.values())
+    for packet in io.outputs:
+        data = json.loads(packet.data)
+        assert data["params"] == packet.action_params
+        assert data["echo"] == packet.echo_id
+    assert json.loads(io.outputs[2].data)["params"] == {
+        "message_type": "private",
+        "user_id": 3,
+        "message": [s.to_dict(force_str=True) for s in msgs],
+        "auto_escape": False,
+    }
+
+
+async def test_broadcast_checkpoint(tmp_path) -> None:
+    io = SendIO(fail_ids=(2,))
+    checkpoint = BroadcastCheckpoint(tmp_path / "bc.txt")
+    progress: list[tuple[int, int]] = []
+    results = await Broadcast(
+        io,
+        "hi",
+        [1, 2, 3],
+        checkpoint=checkpoint,
+        on_progress=lambda *a: progress.append(a),
+    )
+    checkpoint.close()
+    assert not results[("group", 2)].ok
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+
+    resume = BroadcastCheckpoint(tmp_path / "bc.txt")
+    task = Broadcast(SendIO(), "hi", [1, 2, 3], checkpoint=resume)
+    assert task.skipped == 2 and task.targets == [("group", 2)]
+    await task
+    resume.close()
+    assert len(BroadcastCheckpoint(tmp_path / "bc.txt").done) == 3
+
+
+async def test_broadcast_cancel() -> None:
+    io = SendIO()
+    task = Broadcast(io, "hi", range(100), interval=0.01).start()
+    await aio.sleep(0.05)
+    task.cancel()
+    with pt.raises(aio.CancelledError):
+        await task
+    assert task.cancelled()
+    assert 0 < task.done < 100
+
+
+class SerialIO(SendIO):
+    # 与真实的输出源一样，数据包按提交顺序逐个发送
+    def __init__(self) -> None:
+        super().__init__()
+        self.lock = aio.Lock()
+
+    async def output(self, packet: OutPacket) -> EchoPacket:
+        async with self.lock:
+            return await super().output(packet)
+
+
+async def test_broadcast_interactive_latency() -> None:
+    io = SerialIO()
+    task = Broadcast(io, "hi", range(50)).start()
+    await aio.sleep(0.05)
+
+    start = time.perf_counter()
+    await io.output(OutPacket(data="{}", action_type="send_msg", action_params={}))
+    latency = time.perf_counter() - start
+    # 交互回复之前至多排有一个群发数据包
+    assert latency < 0.035
+    assert 0 < task.done < task.total
+    task.cancel()
+
+
+async def test_broadcast_adapter() -> None:
+    with LoggerCtx().in_ctx(Logger("broadcast_adapter", to_console=False)):
+        io, other = SendIO(fail_ids=(2,)), SendIO()
+        registry = MetricsRegistry()
+        adapter = Adapter(metrics=registry)
+        adapter.out_srcs.extend((other, io))
+        seen: list[Action] = []
+
+        @adapter.on(AdapterLifeSpan.BEFORE_ACTION)
+        async def _(action: Action) -> None:
+            seen.append(action)
+
+        results = await adapter.broadcast("hi", [1, 2], out_src=io)
+        assert results[("group", 1)].ok and not results[("group", 2)].ok
+        assert len(seen) == 2 and len(io.outputs) == 2 and not other.outputs
+        assert adapter._metrics.action("send_msg").value == 2
+        assert not adapter._output_factory._watchers
@@ -0,0 +1,202 @@
+from melobot.ctx import ActionManualSignalCtx, LoggerCtx
+from melobot.log.base import Logger
+
+from melobot_protocol_onebot.v11.adapter import action, echo, event
+from melobot_protocol_onebot.v11.adapter.base import Adapter
+from melobot_protocol_onebot.v11.adapter.cache import QueryCache
+from melobot_protocol_onebot.v11.io.base import BaseIO
+from melobot_protocol_onebot.v11.io.packet import EchoPacket, InPacket, OutPacket
+from tests.base import *
+
+_MEMBER_DATA = {
+    "group_id": 1,
+    "user_id": 2,
+    "nickname": "n",
+    "card": "c",
+    "sex": "unknown",
+    "age": 0,
+    "area": "",
+    "join_time": 0,
+    "last_sent_time": 0,
+    "level": "1",
+    "role": "member",
+    "unfriendly": False,
+    "title": "",
+    "title_expire_time": 0,
+    "card_changeable": True,
+}
+_MEMBER_ECHO = {"status": "ok", "retcode": 0, "data": _MEMBER_DATA}
+_NOTICE_DICT = {
+    "time": 1725292489,
+    "self_id": 123456,
+    "post_type": "notice",
+    "notice_type": "group_admin",
+    "sub_type": "set",
+    "group_id": 1,
+    "user_id": 2,
+}
+
+
+class CountIO(BaseIO):
+    def __init__(self) -> None:
+        super().__init__(0)
+        self.outputs: list[OutPacket] = []
+
+    async def open(self) -> None:
+        pass
+
+    def opened(self) -> bool:
+        return True
+
+    async def close(self) -> None:
+        pass
+
+    async def input(self) -> InPacket:
+        raise NotImplementedError
+
+    async def output(self, packet: OutPacket) -> EchoPacket:
+        self.outputs.append(packet)
+        await aio.sleep(0.01)
+        return EchoPacket(data=_MEMBER_ECHO, action_type=packet.action_type)
+
+
+async def test_query_cache(tmp_path) -> None:
+    cache = QueryCache(db_path=tmp_path / "cache.db")
+    act = action.GetGroupMemberInfoAction(1, 2)
+    assert await cache.get(act, "123456") is None
+    cache.set(act, echo.Echo.resolve(action_type=act.type, **_MEMBER_ECHO), "123456")
+    assert (await cache.get(act, "123456")).data["card"] == "c"
+    no_cache = action.GetGroupMemberInfoAction(1, 2, no_cache=True)
+    assert await cache.get(no_cache, "123456") is None
+    cache.close()
+
+    warm = QueryCache(db_path=tmp_path / "cache.db")
+    assert isinstance(await warm.get(act, "123456"), echo.GetGroupMemberInfoEcho)
+    warm.invalidate_by_event(event.Event.resolve(_NOTICE_DICT))
+    assert await warm.get(act, "123456") is None
+    assert warm.hits == 1 and warm.misses == 1
+    warm.close()
+
+
+async def test_query_cache_scope(tmp_path) -> None:
+    cache = QueryCache(db_path=tmp_path / "cache.db")
+    act = action.GetLoginInfoAction()
+    login = {"status": "ok", "retcode": 0, "data": {"user_id": 1, "nickname": "a"}}
+    cache.set(act, echo.Echo.resolve(action_type=act.type, **login), "1")
+    cache.set(act, echo.Echo.resolve(action_type=act.type, **login), "")
+    # 不同账号的回应互不可见
+    assert await cache.get(act, "2") is None
+    hit = await cache.get(act, "1")
+    hit.data["nickname"] = "changed"
+    assert (await cache.get(act, "1")).data["nickname"] == "a"
+    assert (await cache.get(act, "")).data["nickname"] == "a"
+    cache.close()
+
+    # 账号未知的条目不会写入数据库
+    warm = QueryCache(db_path=tmp_path / "cache.db")
+    assert await warm.get(act, "") is None
+    assert (await warm.get(act, "1")).data["user_id"] == 1
+    warm.close()
+
+
+async def test_query_cache_generation() -> None:
+    cache = QueryCache(max_entries=2)
+    act = action.GetGroupMemberInfoAction(1, 2)
+    member = echo.Echo.resolve(action_type=act.type, **_MEMBER_ECHO)
+    gen = cache.generation(act, "123456")
+    # 查询期间收到失效通知，迟到的回应不再写入
+    cache.invalidate_by_event(event.Event.resolve(_NOTICE_DICT))
+    cache.set(act, member, "123456", gen)
+    assert await cache.get(act, "123456") is None
+    cache.set(act, member, "123456", cache.generation(act, "123456"))
+    assert await cache.get(act, "123456") is not None
+
+    # 代数记录超出上限时整体作废，旧的代数不再有效
+    gen = cache.generation(act, "123456")
+    for gid in range(3):
+        cache.invalidate("get_group_info", {"group_id": gid}, "123456")
+    assert len(cache._gens) <= 2
+    assert cache.generation(act, "123456") != gen
+
+
+async def test_adapter_query_cache() -> None:
+    with LoggerCtx().in_ctx(Logger()):
+        io = CountIO()
+        adapter = Adapter(query_cache=QueryCache())
+        adapter.out_srcs.append(io)
+
+        get_info = adapter.with_echo(adapter.get_group_member_info)
+        first = await (await get_info(1, 2))[0]
+        await aio.sleep(0.01)
+        second = await (await get_info(1, 2))[0]
+        assert first is not second and first.data == second.data
+        assert len(io.outputs) == 1
+
+        await (await get_info(1, 2, no_cache=True))[0]
+        await (await adapter.get_group_member_info(1, 2))[0]
+        assert len(io.outputs) == 3
+
+        # 查询执行期间收到失效通知，回应不会写入缓存
+        adapter.query_cache.clear()
+        handles = await get_info(1, 2)
+        adapter.query_cache.invalidate_by_event(event.Event.resolve(_NOTICE_DICT))
+        await handles[0]
+        await aio.sleep(0.01)
+        await (await get_info(1, 2))[0]
+        assert len(io.outputs) == 5
+
+
+async def test_adapter_coalesce() -> None:
+    with LoggerCtx().in_ctx(Logger()):
+        io = CountIO()
+        adapter = Adapter()
+        adapter.out_srcs.append(io)
+
+        get_info = adapter.with_echo(adapter.get_group_member_info)
+        results = await aio.gather(*(get_info(1, 2) for _ in range(10)))
+        assert len({id(r) for r in results}) == 1
+        echoes = await aio.gather(*(r[0] for r in results))
+        assert all(e is echoes[0] for e in echoes)
+        assert len(io.outputs) == 1
+
+        await aio.sleep(0.01)
+        await (await get_info(1, 2))[0]
+        await (await get_info(1, 3))[0]
+        assert len(io.outputs) == 3
+
+        # 手动执行的句柄不参与合并，也不会长期占用合并的键
+        with ActionManualSignalCtx().unfold(True):
+            manual = await aio.gather(*(get_info(1, 2) for _ in range(2)))
+        assert manual[0] is not manual[1] and not adapter._inflight
+        assert all(h.status == "PENDING" for hs in manual for h in hs)
+        assert not adapter._output_factory._watchers
+        assert len(io.outputs) == 3
+
+        solo = Adapter(coalesce_types=())
+        solo.out_srcs.append(io)
+        await aio.gather(*(solo.get_group_member_info(1, 2) for _ in range(3)))
+        assert len(io.outputs) == 6
+
+
+class FailIO(CountIO):
+    async def output(self, packet: OutPacket) -> EchoPacket:
+        self.outputs.append(packet)
+        await aio.sleep(0.01)
+        raise RuntimeError("output failed")
+
+
+async def test_adapter_coalesce_failure() -> None:
+    with LoggerCtx().in_ctx(Logger("coalesce_failure", to_console=False)):
+        io = FailIO()
+        adapter = Adapter(query_cache=QueryCache())
+        adapter.out_srcs.append(io)
+
+        get_info = adapter.with_echo(adapter.get_group_member_info)
+        await get_info(1, 2)
+        assert len(adapter._inflight) == 1
+        await aio.sleep(0.05)
+        # 输出失败后立即释放合并的键，后续相同的查询重新输出
+        assert not adapter._inflight
+        await get_info(1, 2)
+        await aio.sleep(0.05)
+        assert len(io.outputs) == 2 and not adapter._output_factory._watchers
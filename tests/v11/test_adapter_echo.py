@@ -188,3 +188,53 @@ async def test_other():
         ).data["os_version"]
         == "1.0.0"
     )
+
+
+async def test_lazy_member_list():
+    members = [
+        {
+            "group_id": 1,
+            "user_id": uid,
+            "nickname": "melody",
+            "card": "",
+            "sex": "unknown",
+            "age": 0,
+            "area": "",
+            "join_time": 0,
+            "last_sent_time": 0,
+            "level": "1",
+            "role": "member",
+            "unfriendly": False,
+            "title": "",
+            "title_expire_time": 0,
+            "card_changeable": True,
+        }
+        for uid in range(100)
+    ]
+    members.append({"user_id": "bad"})
+    e = echo.GetGroupMemberListEcho(**li_ec(members))
+    assert len(e.data) == 101
+    assert e.get_member(42)["nickname"] == "melody"
+    assert e.get_member(1000) is None
+    assert e.data[-2]["user_id"] == 99
+    assert [m["user_id"] for m in e.data[:3]] == [0, 1, 2]
+    with pt.raises(ValueError):
+        list(e.iter_members())
+    assert next(e.iter_members()) is e.data[0]
+    assert echo.GetGroupMemberListEcho(**li_ec(None)).get_member(1) is None
+
+
+async def test_lazy_forward_nodes():
+    node = {
+        "type": "node",
+        "data": {
+            "user_id": "10001000",
+            "nickname": "某人",
+            "content": [{"type": "text", "data": {"text": "哈喽～"}}],
+        },
+    }
+    e = echo.GetForwardMsgEcho(**ec(message=[node, node]))
+    assert len(e.data["message"]) == 2
+    nodes = list(e.iter_nodes())
+    assert nodes[1].data["nickname"] == "某人"
+    assert nodes == e.data["message"]
@@ -0,0 +1,157 @@
+import base64
+import io
+
+from melobot.adapter import content as mc
+
+from melobot_protocol_onebot.v11.adapter import media, segment
+from melobot_protocol_onebot.v11.metrics import MetricsRegistry
+from tests.base import *
+
+_DATA = bytes(range(256)) * 1000 + b"tail"
+_CODE = "base64://" + base64.b64encode(_DATA).decode()
+
+
+class _SlowReader(io.BytesIO):
+    def read(self, size: int = -1) -> bytes:
+        return super().read(min(size, 1000))
+
+
+async def test_encode_sources(tmp_path) -> None:
+    assert media.encode_base64(_DATA) == _CODE
+    assert media.encode_base64(_DATA, chunk_size=3) == _CODE
+    assert media.encode_base64(io.BytesIO(_DATA)) == _CODE
+    assert media.encode_base64(_SlowReader(_DATA), chunk_size=3 * 1024) == _CODE
+
+    path = tmp_path / "a.bin"
+    path.write_bytes(_DATA)
+    assert media.encode_base64(path) == _CODE
+    assert media.encode_base64(str(path)) == _CODE
+    with open(path, "rb") as fp:
+        assert await media.encode_base64_async(fp) == _CODE
+    assert await media.encode_base64_async(_DATA) == _CODE
+    assert await media.encode_base64_async(b"abc") == "base64://YWJj"
+
+
+async def test_encode_limit() -> None:
+    with pt.raises(ValueError):
+        media.encode_base64(_DATA, size_limit=len(_DATA) - 1)
+    with pt.raises(ValueError):
+        media.encode_base64(_SlowReader(_DATA), size_limit=len(_DATA) - 1)
+    with pt.raises(ValueError):
+        media.encode_base64(_DATA, chunk_size=1000)
+    assert media.encode_base64(_DATA, size_limit=len(_DATA)) == _CODE
+
+
+async def test_contents_to_segs_async() -> None:
+    contents = [
+        mc.TextContent("hi"),
+        mc.ImageContent(name="a.jpg", raw=_DATA),
+        mc.VideoContent(name="b.mp4", url="https://example.com/b.mp4"),
+    ]
+    segs = await segment.contents_to_segs_async(contents)
+    assert [s.to_dict() for s in segs] == [
+        s.to_dict() for s in segment.contents_to_segs(contents)
+    ]
+    assert segs[1].data["file"] == _CODE
+
+
+async def test_media_cache(tmp_path) -> None:
+    cache = media.MediaCache(max_mem_bytes=len(_CODE) + 10, disk_dir=tmp_path)
+    assert cache.encode(_DATA) == _CODE
+    assert await cache.encode_async(_DATA) == _CODE
+    assert cache.stats.misses == 1 and cache.stats.mem_hits == 1
+
+    assert cache.encode(b"other") == "base64://b3RoZXI="
+    assert cache.encode(_DATA) == _CODE
+    assert cache.stats.disk_hits == 1 and cache.stats.evictions >= 1
+
+    cache.set_ref(_DATA, "abc.image")
+    assert cache.encode(io.BytesIO(_DATA)) == "abc.image"
+    assert cache.stats.ref_hits == 1
+    assert cache.stats.hit_rate == 3 / 5
+
+    warm = media.MediaCache(disk_dir=tmp_path)
+    assert warm.encode(_DATA) == _CODE
+    assert warm.stats.disk_hits == 1
+
+
+async def test_media_cache_expose_path(tmp_path) -> None:
+    cache = media.MediaCache(disk_dir=tmp_path, expose_path=True)
+    uri = cache.encode(_DATA)
+    assert uri.startswith("file://")
+    assert (tmp_path / cache.digest(_DATA)).read_bytes() == _DATA
+    segs = segment.contents_to_segs([mc.ImageContent(name="a", raw=_DATA)], cache)
+    assert segs[0].data["file"] == uri
+
+
+async def test_media_cache_inline_hit(monkeypatch) -> None:
+    registry = MetricsRegistry()
+    cache = media.MediaCache(metrics=registry)
+    small = b"small" * 10
+    code = await cache.encode_async(small)
+    cache.set_ref(None, "abc.image", digest=cache.digest(_DATA))
+
+    async def no_thread(*_, **__):
+        raise AssertionError("命中时不应切换线程")
+
+    # 小数据的内存层命中与登记了引用的内容都不切换线程
+    monkeypatch.setattr(media.asyncio, "to_thread", no_thread)
+    assert await cache.encode_async(small) == code
+    monkeypatch.undo()
+    assert await cache.encode_async(_DATA) == "abc.image"
+
+    values = registry.collect()
+    assert values["onebot_media_cache_hits_total"][(("tier", "mem"),)] == 1
+    assert values["onebot_media_cache_hits_total"][(("tier", "ref"),)] == 1
+    assert values["onebot_media_cache_misses_total"][()] == 1
+    assert values["onebot_media_cache_hit_rate"][()] == 2 / 3
+
+
+async def test_media_cache_ref_path(tmp_path) -> None:
+    # 形如摘要的字符串仍视为文件路径
+    name = "a" * 64
+    (tmp_path / name).write_bytes(_DATA)
+    cache = media.MediaCache()
+    cache.set_ref(str(tmp_path / name), "abc.image")
+    assert cache.encode(_DATA) == "abc.image"
+    with pt.raises(ValueError):
+        cache.set_ref(None, "abc.image")
+
+
+async def test_media_cache_concurrent_write(tmp_path) -> None:
+    for expose_path in (False, True):
+        cache = media.MediaCache(
+            disk_dir=tmp_path / str(expose_path), expose_path=expose_path
+        )
+        # 同一内容同时发往多处，各线程的写入互不干扰
+        codes = await aio.gather(
+            *(aio.to_thread(cache._encode, cache.digest(_DATA), _DATA) for _ in range(8))
+        )
+        assert len(set(codes)) == 1
+        assert [p.name for p in (tmp_path / str(expose_path)).iterdir()] == [
+            cache.digest(_DATA)
+        ]
+
+
+async def test_media_cache_evict_exposed(tmp_path) -> None:
+    cache = media.MediaCache(
+        disk_dir=tmp_path, expose_path=True, max_disk_bytes=len(_DATA)
+    )
+    uri = cache.encode(_DATA)
+    cache.encode(b"other")
+    # 磁盘层淘汰的文件不能再从内存层命中
+    assert not (tmp_path / cache.digest(_DATA)).exists()
+    assert cache.encode(_DATA) == uri
+    assert cache.stats.mem_hits == 0 and cache.stats.misses == 3
+
+
+async def test_media_cache_unseekable() -> None:
+    class Pipe(io.BytesIO):
+        def seekable(self) -> bool:
+            return False
+
+    pipe = Pipe(_DATA)
+    with pt.raises(ValueError):
+        media.MediaCache().encode(pipe)
+    # 数据未被消耗，调用方仍可直接编码
+    assert media.encode_base64(pipe) == _CODE
@@ -0,0 +1,60 @@
+from melobot_protocol_onebot.v11.adapter import echo, roster
+from tests.base import *
+
+
+def _member(uid: int, role: str, join_time: int, level: str, card: str) -> dict:
+    return {
+        "group_id": 1,
+        "user_id": uid,
+        "nickname": "melody",
+        "card": card,
+        "sex": "unknown",
+        "age": 0,
+        "area": "",
+        "join_time": join_time,
+        "last_sent_time": join_time + 100,
+        "level": level,
+        "role": role,
+        "unfriendly": False,
+        "title": "",
+        "title_expire_time": 0,
+        "card_changeable": True,
+    }
+
+
+_MEMBERS = [
+    _member(10, "owner", 1000, "LV50", "boss"),
+    _member(20, "admin", 2000, "30", ""),
+    _member(30, "member", 3000, "10", ""),
+    _member(40, "member", 4000, "", "boss"),
+]
+_BACKENDS = [False] + ([True] if roster._HAS_NUMPY else [])
+
+
+@pt.mark.parametrize("use_numpy", _BACKENDS)
+async def test_roster(use_numpy: bool) -> None:
+    r = roster.GroupRoster(_MEMBERS, use_numpy)
+    assert len(r) == 4 and r.group_id == 1
+    assert 30 in r and 50 not in r
+    assert r.role_of(20) == "admin" and r.card_of(40) == "boss"
+    assert r.is_admin(10) and not r.is_admin(30) and not r.is_admin(50)
+    assert r.member(30)["level"] == "10"
+    assert r.cards == ["boss", ""]
+    with pt.raises(KeyError):
+        r.row_of(50)
+
+    assert r.admins() == [10, 20]
+    assert r.filter(joined_after=2000, joined_before=4000) == [20, 30]
+    assert r.filter(sent_after=3100) == [30, 40]
+    assert r.filter(min_level=20) == [10, 20]
+    assert r.filter(roles=["member"], card="boss") == [40]
+    assert r.filter(card="nobody") == []
+    assert r.filter() == [10, 20, 30, 40]
+
+
+async def test_echo_roster() -> None:
+    e = echo.GetGroupMemberListEcho(status="ok", retcode=0, data=_MEMBERS)
+    r = e.roster(use_numpy=False)
+    assert r.backend == "array" and e.roster() is r
+    assert r.admins() == [10, 20]
+    assert echo.GetGroupMemberListEcho(status="ok", retcode=0, data=None).roster() is None
@@ -0,0 +1,101 @@
+from melobot.ctx import LoggerCtx
+from melobot.log.base import Logger
+
+from melobot_protocol_onebot.v11 import handle
+from melobot_protocol_onebot.v11.adapter.event import Event
+from melobot_protocol_onebot.v11.metrics import MetricsRegistry
+from tests.base import *
+
+_EVENT = {"time": 1, "self_id": 2, "post_type": "meta_event", "meta_event_type": "x"}
+
+
+def _processor(flow):
+    return next(iter(flow.graph)).processor
+
+
+async def _call_many(monkeypatch, n: int, **kwargs) -> tuple[list, list[str], dict]:
+    registry = MetricsRegistry()
+    replies: list[str] = []
+
+    async def send_text(text: str) -> tuple:
+        replies.append(text)
+        return ()
+
+    monkeypatch.setattr(handle, "get_event", lambda: Event.resolve(dict(_EVENT)))
+    monkeypatch.setattr(handle, "_send_text", send_text)
+    handle.set_handle_metrics(registry)
+
+    running = 0
+    peak = 0
+
+    @handle.on_event(lambda _: True, **kwargs)
+    async def slow() -> bool:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await aio.sleep(0.05)
+        running -= 1
+        return True
+
+    try:
+        proc = _processor(slow)
+        with LoggerCtx().in_ctx(Logger("handle_limits", to_console=False)):
+            results = await aio.gather(*(proc() for _ in range(n)))
+    finally:
+        handle.set_handle_metrics(None)
+    counts = {
+        name: sum(values.values())
+        for name, values in registry.collect().items()
+        if name.startswith("onebot_handle_") and not name.endswith("seconds")
+    }
+    counts["peak"] = peak
+    counts["labels"] = registry.collect()["onebot_handle_calls_total"]
+    return results, replies, counts
+
+
+async def test_limit_queue(monkeypatch) -> None:
+    results, replies, counts = await _call_many(monkeypatch, 5, concurrency=2)
+    assert results == [True] * 5 and not replies
+    assert counts["peak"] == 2 and counts["onebot_handle_queued_total"] == 3
+    # 指标以模块与限定名区分处理流
+    (labels,) = counts["labels"]
+    assert f"{__name__}._call_many.<locals>.slow" in str(labels)
+
+
+async def test_limit_drop_busy(monkeypatch) -> None:
+    results, _, counts = await _call_many(monkeypatch, 4, concurrency=1, overflow="drop")
+    assert results == [True, None, None, None]
+    assert counts["onebot_handle_rejected_total"] == 3
+
+    results, replies, _ = await _call_many(monkeypatch, 3, concurrency=2, overflow="busy")
+    assert results == [True, True, None] and replies == [handle._BUSY_REPLY]
+
+    # 同一会话在冷却时间内只回复一次繁忙
+    results, replies, _ = await _call_many(monkeypatch, 5, concurrency=1, overflow="busy")
+    assert results == [True, None, None, None, None]
+    assert replies == [handle._BUSY_REPLY]
+
+
+async def test_limit_timeout(monkeypatch) -> None:
+    results, _, counts = await _call_many(monkeypatch, 2, timeout=0.01)
+    assert results == [None, None] and counts["onebot_handle_timeouts_total"] == 2
+
+    with pt.raises(ValueError):
+        handle.on_message(concurrency=0)
+
+
+async def test_send_text_import(monkeypatch) -> None:
+    try:
+        from melobot.handle import generic
+    except ImportError:
+        from melobot.adapter import generic
+
+    sent: list[str] = []
+
+    async def send_text(text: str) -> tuple:
+        sent.append(text)
+        return ()
+
+    monkeypatch.setattr(generic, "send_text", send_text)
+    await handle._send_text("busy")
+    assert sent == ["busy"]
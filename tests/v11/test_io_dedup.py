@@ -0,0 +1,40 @@
+from melobot_protocol_onebot.v11.io.dedup import EventDeduplicator
+from melobot_protocol_onebot.v11.metrics import MetricsRegistry
+from tests.base import *
+
+
+def _msg(msg_id: int, self_id: int = 1) -> dict:
+    return {"time": 0, "self_id": self_id, "post_type": "message", "message_id": msg_id}
+
+
+async def test_dedup_keys() -> None:
+    registry = MetricsRegistry()
+    dedup = EventDeduplicator(metrics=registry)
+    assert not dedup.seen(_msg(1))
+    assert dedup.seen(_msg(1))
+    assert not dedup.seen(_msg(1, self_id=2))
+    # 没有 message_id 的事件按内容去重
+    notice = {"time": 0, "self_id": 1, "post_type": "notice", "notice_type": "x"}
+    assert not dedup.seen(notice)
+    assert dedup.seen(dict(reversed(notice.items())))
+    assert not dedup.seen({**notice, "time": 1})
+
+    assert dedup.suppressed == 2
+    assert registry.collect()["onebot_io_duplicate_events_total"][()] == 2
+
+
+async def test_dedup_bounds() -> None:
+    dedup = EventDeduplicator(max_size=10)
+    for i in range(25):
+        assert not dedup.seen(_msg(i))
+    assert len(dedup) <= 20
+    assert dedup.seen(_msg(24)) and not dedup.seen(_msg(0))
+
+    dedup = EventDeduplicator(ttl=0.05)
+    dedup.seen(_msg(1))
+    await aio.sleep(0.06)
+    dedup.seen(_msg(2))
+    assert dedup.seen(_msg(1))
+    await aio.sleep(0.06)
+    dedup.seen(_msg(3))
+    assert not dedup.seen(_msg(1))
@@ -109,3 +109,36 @@ async def test_forward_ws(monkeypatch) -> None:
             assert pak.data["data"]["hello"] == _TEST_ECHO_DICT["data"]["hello"]
             assert pak.ok == (_TEST_ECHO_DICT["status"] == "ok")
             assert pak.status == _TEST_ECHO_DICT["retcode"]
+
+
+class NoEchoSession:
+    # 与真实实现端一致，HTTP API 的响应中不含 echo 字段
+    async def post(self, url, *args, **kwargs):
+        resp = aiohttp.web.Response(status=200)
+        resp.json = to_async(lambda: _TEST_ECHO_DICT)
+        return resp
+
+    async def close(self):
+        return
+
+
+async def test_http_echo_without_echo_field() -> None:
+    with LoggerCtx().in_ctx(Logger()):
+        io = HttpIO("localhost", 8080, "localhost", 9090)
+        io.client_session = NoEchoSession()
+        act = action.GetLoginInfoAction()
+        act.set_echo(True)
+        fut = aio.get_running_loop().create_future()
+        io._echo_table[act.id] = (act.type, fut)
+
+        await io._handle_output(
+            OutPacket(
+                data=act.flatten(),
+                action_type=act.type,
+                action_params=act.params,
+                echo_id=act.id,
+            )
+        )
+        echo = await aio.wait_for(fut, 1)
+        assert echo.action_type == act.type and echo.data == _TEST_ECHO_DICT
+        assert not io._echo_table
@@ -0,0 +1,246 @@
+import json
+import logging
+
+import websockets
+from melobot.ctx import LoggerCtx
+from melobot.exceptions import IOError
+from melobot.log.base import Logger
+from websockets.exceptions import ConnectionClosed
+
+from melobot_protocol_onebot.v11.io.base import BaseIO
+from melobot_protocol_onebot.v11.io.failover import FailoverIO
+from melobot_protocol_onebot.v11.io.forward import ForwardWebSocketIO
+from melobot_protocol_onebot.v11.io.packet import EchoPacket, InPacket, OutPacket
+from tests.base import *
+
+
+class FakeIO(BaseIO):
+    def __init__(self, name: str, delay: float = 0, fail_open: bool = False) -> None:
+        super().__init__(0)
+        self.name = name
+        self.delay = delay
+        self.fail_open = fail_open
+        self.broken = False
+        self.outputs = 0
+        self.events: aio.Queue[InPacket] = aio.Queue()
+        self._opened = False
+
+    def __repr__(self) -> str:
+        return self.name
+
+    async def open(self) -> None:
+        if self.fail_open:
+            raise RuntimeError("open failed")
+        self._opened = True
+
+    def opened(self) -> bool:
+        return self._opened
+
+    async def close(self) -> None:
+        self._opened = False
+
+    async def input(self) -> InPacket:
+        return await self.events.get()
+
+    async def output(self, packet: OutPacket) -> EchoPacket:
+        self.outputs += 1
+        if self.broken:
+            # 连接已断开，回应永远不会到达
+            await aio.Future()
+        await aio.sleep(self.delay)
+        return EchoPacket(data={"by": self.name}, ok=True, action_type=packet.action_type)
+
+
+def _packet() -> OutPacket:
+    return OutPacket(data="{}", action_type="get_status", action_params={}, echo_id="1")
+
+
+def _event(n: int) -> InPacket:
+    raw = {"time": 0, "self_id": 1, "post_type": "message", "message_id": n}
+    return InPacket(time=0, data=raw)
+
+
+async def test_failover_merge_input() -> None:
+    a, b = FakeIO("a"), FakeIO("b")
+    with LoggerCtx().in_ctx(Logger()):
+        io = FailoverIO([a, b])
+        await io.open()
+        for n in (1, 2):
+            a.events.put_nowait(_event(n))
+            b.events.put_nowait(_event(n))
+        b.events.put_nowait(_event(3))
+        got = [(await io.input()).data["message_id"] for _ in range(3)]
+        assert sorted(got) == [1, 2, 3] and io.dedup.suppressed == 2
+        await io.close()
+
+
+async def test_failover_output() -> None:
+    primary, secondary = FakeIO("primary", 0.01), FakeIO("secondary")
+    with LoggerCtx().in_ctx(Logger()):
+        io = FailoverIO([primary, secondary], echo_timeout=0.05, cooldown=0.2)
+        await io.open()
+        assert (await io.output(_packet())).data["by"] == "primary"
+        assert (await io.output(_packet())).data["by"] == "primary"
+        assert secondary.outputs == 0
+
+        # 主 IO 源断开，等待中的行为转移到备用 IO 源
+        primary.broken = True
+        assert (await io.output(_packet())).data["by"] == "secondary"
+        assert (await io.output(_packet())).data["by"] == "secondary"
+        assert primary.outputs == 3
+        health = io.health()
+        assert health[0]["cooling"] and health[0]["failures"] == 1
+
+        # 冷却结束后按延迟与出错率比较，备用 IO 源更快
+        primary.broken = False
+        await aio.sleep(0.2)
+        assert (await io.output(_packet())).data["by"] == "secondary"
+
+        secondary._opened = False
+        primary._opened = False
+        with pt.raises(IOError):
+            await io.output(_packet())
+        await io.close()
+
+
+async def test_failover_open() -> None:
+    with LoggerCtx().in_ctx(Logger()):
+        io = FailoverIO([FakeIO("a", fail_open=True), FakeIO("b")])
+        await io.open()
+        assert io.opened()
+        await io.close()
+
+        io = FailoverIO([FakeIO("a", fail_open=True)])
+        with pt.raises(IOError):
+            await io.open()
+
+
+class SlowWebsocket:
+    close_timeout = 0
+
+    def __init__(self) -> None:
+        self.sent: list[str] = []
+        self.recv_buf: aio.Queue[str] = aio.Queue()
+
+    async def send(self, data: str) -> None:
+        self.sent.append(data)
+        echo = {
+            "status": "ok",
+            "retcode": 0,
+            "data": None,
+            "echo": json.loads(data)["echo"],
+        }
+
+        async def answer() -> None:
+            await aio.sleep(0.1)
+            await self.recv_buf.put(json.dumps(echo))
+
+        aio.create_task(answer())
+
+    async def recv(self) -> str:
+        return await self.recv_buf.get()
+
+    async def close(self) -> None:
+        return
+
+    async def wait_closed(self) -> None:
+        return
+
+
+async def test_failover_late_echo(monkeypatch) -> None:
+    ws = SlowWebsocket()
+
+    async def connect(*_, **__) -> SlowWebsocket:
+        return ws
+
+    monkeypatch.setattr(websockets, "connect", connect)
+    logger = Logger("failover_late_echo", to_console=False)
+    records: list[logging.LogRecord] = []
+    handler = logging.Handler(logging.WARNING)
+    handler.emit = records.append  # type: ignore[method-assign]
+    logger.addHandler(handler)
+
+    with LoggerCtx().in_ctx(logger):
+        primary, secondary = ForwardWebSocketIO("ws://example.com", cd_time=0), FakeIO(
+            "b"
+        )
+        io = FailoverIO([primary, secondary], echo_timeout=0.05)
+        await io.open()
+        data = json.dumps({"action": "send_msg", "params": {}, "echo": "42"})
+        packet = OutPacket(
+            data=data, action_type="send_msg", action_params={}, echo_id="42"
+        )
+        with pt.raises(IOError):
+            await io.output(packet)
+        assert not primary._echo_table
+
+        # 迟到的回应被忽略，行为没有被转移到备用 IO 源重新发送
+        await aio.sleep(0.15)
+        assert len(ws.sent) == 1 and secondary.outputs == 0
+        assert not records
+        await io.close()
+
+
+class DroppingWebsocket:
+    close_timeout = 0
+
+    def __init__(self) -> None:
+        self.down = aio.Event()
+        self.sending = aio.Event()
+
+    async def send(self, data: str) -> None:
+        # 发送阻塞到连接断开，断开后发送失败
+        self.sending.set()
+        await self.down.wait()
+        raise ConnectionClosed(None, None)
+
+    async def recv(self) -> str:
+        await self.down.wait()
+        raise ConnectionClosed(None, None)
+
+    async def close(self) -> None:
+        return
+
+    async def wait_closed(self) -> None:
+        return
+
+
+def _send_msg(echo_id: str | None) -> OutPacket:
+    data = json.dumps({"action": "send_msg", "params": {}, "echo": echo_id})
+    return OutPacket(data=data, action_type="send_msg", action_params={}, echo_id=echo_id)
+
+
+async def test_failover_disconnect(monkeypatch) -> None:
+    ws = DroppingWebsocket()
+
+    async def connect(*_, **__) -> DroppingWebsocket:
+        return ws
+
+    monkeypatch.setattr(websockets, "connect", connect)
+    with LoggerCtx().in_ctx(Logger("failover_disconnect", to_console=False)):
+        primary = ForwardWebSocketIO("ws://example.com", cd_time=0)
+        secondary = FakeIO("b")
+        io = FailoverIO([primary, secondary], echo_timeout=5)
+        await io.open()
+        assert primary.live()
+
+        sending = aio.create_task(io.output(_send_msg("1")))
+        await ws.sending.wait()
+        # 排在断开的连接上、尚未发出的行为
+        assert (await io.output(_send_msg(None))).noecho
+        queued = aio.create_task(io.output(_send_msg("3")))
+        await aio.sleep(0)
+        assert secondary.outputs == 0
+
+        ws.down.set()
+        echoes = await aio.wait_for(aio.gather(sending, queued), 1)
+        assert all(e.data["by"] == "b" for e in echoes)
+        await aio.sleep(0.01)
+        assert not primary.live() and primary.opened()
+        assert secondary.outputs == 3 and not primary._echo_table
+
+        # 断开的 IO 源不再被选中，不等待回应的行为也不会丢失
+        assert (await io.output(_send_msg(None))).data["by"] == "b"
+        assert secondary.outputs == 4
+        assert io.health()[0]["live"] is False
+        await io.close()
@@ -0,0 +1,115 @@
+import aiohttp
+from melobot.ctx import LoggerCtx
+from melobot.log.base import Logger
+
+from melobot_protocol_onebot.v11.adapter import action
+from melobot_protocol_onebot.v11.io.duplex_http import HttpIO, _quick_operation
+from melobot_protocol_onebot.v11.io.packet import OutPacket
+from tests.base import *
+
+_GROUP_MSG = {
+    "time": 0,
+    "self_id": 1,
+    "post_type": "message",
+    "message_type": "group",
+    "message_id": 7,
+    "group_id": 100,
+    "user_id": 200,
+}
+
+
+def _packet(act: action.Action, trigger: dict | None = None) -> OutPacket:
+    return OutPacket(
+        data=act.flatten(),
+        action_type=act.type,
+        action_params=act.params,
+        echo_id=act.id if act.need_echo else None,
+        trigger=trigger,
+    )
+
+
+async def test_quick_operation_convert() -> None:
+    reply = action.SendMsgAction("hi", group_id=100)
+    op = _quick_operation(_GROUP_MSG, reply.type, reply.params)
+    assert op == {
+        "reply": reply.params["message"],
+        "auto_escape": False,
+        "at_sender": False,
+    }
+    other = action.SendMsgAction("hi", group_id=101)
+    assert _quick_operation(_GROUP_MSG, other.type, other.params) is None
+
+    ban = action.SetGroupBanAction(100, 200, 60)
+    assert _quick_operation(_GROUP_MSG, ban.type, ban.params) == {
+        "ban": True,
+        "ban_duration": 60,
+    }
+    unban = action.SetGroupBanAction(100, 200, 0)
+    assert _quick_operation(_GROUP_MSG, unban.type, unban.params) is None
+    delete = action.DeleteMsgAction(7)
+    assert _quick_operation(_GROUP_MSG, delete.type, delete.params) == {"delete": True}
+
+    request = {"post_type": "request", "request_type": "friend", "flag": "f"}
+    approve = action.SetFriendAddRequestAction("f", True, "r")
+    assert _quick_operation(request, approve.type, approve.params) == {
+        "approve": True,
+        "remark": "r",
+    }
+    assert (
+        _quick_operation({**request, "flag": "g"}, approve.type, approve.params) is None
+    )
+
+
+async def test_quick_operation_http() -> None:
+    with LoggerCtx().in_ctx(Logger()):
+        io = HttpIO("127.0.0.1", 18671, "127.0.0.1", 18672, cd_time=0, quick_reply=2)
+        open_task = aio.create_task(io.open())
+        await aio.sleep(0.2)
+        sent: list[OutPacket] = []
+        io._out_buf.put_nowait = sent.append  # type: ignore[method-assign]
+
+        async def handle(packet) -> None:
+            event = packet.data
+            if event["message_id"] == 7:
+                # 等另一个同群事件也在等待快速操作，回复只能折叠进触发它的事件
+                await aio.sleep(0.1)
+                await io.output(_packet(action.SendMsgAction("hi", group_id=100), event))
+                await io.output(_packet(action.SetGroupBanAction(100, 200, 60), event))
+                # 与已折叠的回复冲突，照常发送
+                await io.output(
+                    _packet(action.SendMsgAction("again", group_id=100), event)
+                )
+            packet.ack()
+
+        async def bot() -> None:
+            while True:
+                aio.create_task(handle(await io.input()))
+
+        bot_task = aio.create_task(bot())
+        async with aiohttp.ClientSession() as session:
+            # 处理流没有发出行为，分发完毕即返回空响应，不必等到期限
+            idle = {**_GROUP_MSG, "message_id": 8}
+            start = aio.get_running_loop().time()
+            reply, empty = await aio.gather(
+                session.post("http://127.0.0.1:18672", json=_GROUP_MSG),
+                session.post("http://127.0.0.1:18672", json=idle),
+            )
+            assert aio.get_running_loop().time() - start < 1
+            assert empty.status == 204
+            assert reply.status == 200
+            body = await reply.json()
+            assert body["reply"][0]["data"]["text"] == "hi"
+            assert body["at_sender"] is False
+            assert body["ban"] is True and body["ban_duration"] == 60
+            assert [p.action_type for p in sent] == ["send_msg"]
+            reply.release()
+            empty.release()
+
+            # 不由事件触发的行为不会被折叠
+            await io.output(_packet(action.SendMsgAction("x", group_id=100)))
+            assert len(sent) == 2
+
+        await open_task
+        bot_task.cancel()
+        assert not io._quick_slots
+        await io.close()
@@ -0,0 +1,238 @@
+import json
+
+from melobot.ctx import LoggerCtx
+from melobot.exceptions import IOError
+from melobot.log.base import Logger
+
+from melobot_protocol_onebot.v11.io.base import BaseIO
+from melobot_protocol_onebot.v11.io.hub import HashRing, Hub, HubWorkerIO, _encode
+from melobot_protocol_onebot.v11.io.packet import EchoPacket, InPacket, OutPacket
+from tests.base import *
+
+
+class UpstreamIO(BaseIO):
+    def __init__(self, delays: list[float] | None = None) -> None:
+        super().__init__(0)
+        self.events: aio.Queue[InPacket] = aio.Queue()
+        self.outputs: list[OutPacket] = []
+        self.delays = delays
+        self.inflight = 0
+        self.max_inflight = 0
+        self._opened = False
+
+    async def open(self) -> None:
+        self._opened = True
+
+    def opened(self) -> bool:
+        return self._opened
+
+    async def close(self) -> None:
+        self._opened = False
+
+    async def input(self) -> InPacket:
+        return await self.events.get()
+
+    async def output(self, packet: OutPacket) -> EchoPacket:
+        # 提交即记录，随后模拟实现端执行行为的耗时
+        self.outputs.append(packet)
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            if self.delays is not None:
+                await aio.sleep(self.delays.pop(0))
+        finally:
+            self.inflight -= 1
+        if packet.echo_id is None:
+            return EchoPacket(noecho=True)
+        data = {"status": "ok", "retcode": 0, "data": {"echo": packet.echo_id}}
+        return EchoPacket(data=data, ok=True, action_type=packet.action_type)
+
+
+def _event(n: int, group_id: int | None = None, pad: int = 0) -> InPacket:
+    raw = {"time": 0, "post_type": "message", "n": n, "pad": "x" * pad}
+    if group_id is not None:
+        raw["group_id"] = group_id
+    return InPacket(time=0, data=raw)
+
+
+async def test_hash_ring() -> None:
+    ring = HashRing(4)
+    routes = {key: ring.route(key) for key in range(1000)}
+    assert set(routes.values()) == {0, 1, 2, 3}
+    # 某个工作进程离线时，只有它负责的键被移到其他工作进程
+    moved = {k: ring.route(k, {0, 1, 3}) for k in routes}
+    assert all(moved[k] == w for k, w in routes.items() if w != 2)
+    assert 2 not in moved.values()
+    assert ring.route(1, set()) is None
+
+
+async def test_hub_roundtrip(tmp_path) -> None:
+    path = str(tmp_path / "hub.sock")
+    upstream = UpstreamIO()
+    with LoggerCtx().in_ctx(Logger()):
+        hub = Hub(upstream, path, workers=2)
+        await hub.start()
+        workers = [HubWorkerIO(path, i) for i in range(2)]
+        for w in workers:
+            await w.open()
+        await aio.sleep(0.05)
+
+        for n in range(20):
+            upstream.events.put_nowait(_event(n, group_id=n % 4))
+        upstream.events.put_nowait(_event(-1))
+        await aio.sleep(0.1)
+
+        got: list[list[dict]] = [[], []]
+        for i, w in enumerate(workers):
+            while not w._in_buf.empty():
+                got[i].append((await w.input()).data)
+        assert len(got[0]) + len(got[1]) == 22
+        for i in range(2):
+            # 心跳一类事件发给所有工作进程，群事件按群号路由且保持顺序
+            assert got[i][-1]["n"] == -1
+            ns = [e["n"] for e in got[i][:-1]]
+            assert ns == sorted(ns)
+            assert all(hub.ring.route(e["group_id"]) == i for e in got[i][:-1])
+
+        packets = [
+            OutPacket(
+                data=json.dumps({"action": "get_status", "params": {}, "echo": "1"}),
+                action_type="get_status",
+                action_params={},
+                echo_id="1",
+            )
+            for _ in workers
+        ]
+        echoes = await aio.gather(*(w.output(p) for w, p in zip(workers, packets)))
+        # 两个工作进程的 echo 相同，经中枢转发时被替换为不同的 echo
+        hub_ids = {e.data["data"]["echo"] for e in echoes}
+        assert len(hub_ids) == 2 and all(e.ok for e in echoes)
+        assert {json.loads(p.data)["echo"] for p in upstream.outputs} == hub_ids
+
+        for w in workers:
+            await w.close()
+        await hub.close()
+
+
+def _action(echo: str | None) -> OutPacket:
+    data = json.dumps({"action": "send_msg", "params": {}, "echo": echo})
+    return OutPacket(data=data, action_type="send_msg", action_params={}, echo_id=echo)
+
+
+async def test_hub_action_order(tmp_path) -> None:
+    path = str(tmp_path / "hub.sock")
+    # 越早发出的行为在实现端执行得越慢
+    upstream = UpstreamIO(delays=[0.2, 0.15, 0.1, 0.05, 0])
+    with LoggerCtx().in_ctx(Logger()):
+        hub = Hub(upstream, path, workers=1)
+        await hub.start()
+        worker = HubWorkerIO(path, 0)
+        await worker.open()
+        start = aio.get_running_loop().time()
+        echoes = await aio.gather(*(worker.output(_action(str(i))) for i in range(5)))
+        elapsed = aio.get_running_loop().time() - start
+        assert all(e.ok for e in echoes)
+        assert [e.data["data"]["echo"] for e in echoes] == [f"hub{i}" for i in range(5)]
+        hub_ids = [json.loads(p.data)["echo"] for p in upstream.outputs]
+        assert hub_ids == sorted(hub_ids, key=lambda i: int(i[3:]))
+        # 按序提交，但回应并发等待，不必逐个等待往返
+        assert upstream.max_inflight == 5
+        assert elapsed < 0.4
+        await worker.close()
+        await hub.close()
+
+
+async def test_hub_inflight_limit(tmp_path) -> None:
+    path = str(tmp_path / "hub.sock")
+    upstream = UpstreamIO(delays=[0.02] * 10)
+    with LoggerCtx().in_ctx(Logger()):
+        hub = Hub(upstream, path, workers=1, max_inflight=2)
+        await hub.start()
+        worker = HubWorkerIO(path, 0)
+        await worker.open()
+        echoes = await aio.gather(*(worker.output(_action(str(i))) for i in range(10)))
+        assert all(e.ok for e in echoes)
+        assert upstream.max_inflight == 2
+        hub_ids = [json.loads(p.data)["echo"] for p in upstream.outputs]
+        assert hub_ids == [f"hub{i}" for i in range(10)]
+        (conn,) = hub._conns.values()
+        assert not conn.forwarding
+        await worker.close()
+        await hub.close()
+
+
+async def test_worker_bad_frame(tmp_path) -> None:
+    path = str(tmp_path / "hub.sock")
+
+    async def fake_hub(reader: aio.StreamReader, writer: aio.StreamWriter) -> None:
+        await reader.readexactly(4)
+        # 既不是事件也没有 echo 的帧
+        writer.write(_encode({"unknown": 1}))
+        writer.write(_encode(_event(1).data))
+        await writer.drain()
+
+    server = await aio.start_unix_server(fake_hub, path)
+    with LoggerCtx().in_ctx(Logger()):
+        worker = HubWorkerIO(path, 0)
+        await worker.open()
+        assert (await aio.wait_for(worker.input(), 1)).data["n"] == 1
+        assert worker._quarantine.total == 1
+        await worker.close()
+    server.close()
+
+
+async def test_hub_backpressure(tmp_path) -> None:
+    path = str(tmp_path / "hub.sock")
+    upstream = UpstreamIO()
+    with LoggerCtx().in_ctx(Logger()):
+        hub = Hub(upstream, path, workers=1, max_buffer=4)
+        await hub.start()
+        # 接入后从不读取的工作进程
+        _, writer = await aio.open_unix_connection(path)
+        writer.write(_encode({"worker": 0}))
+        await writer.drain()
+        await aio.sleep(0.05)
+
+        for n in range(500):
+            upstream.events.put_nowait(_event(n, pad=16 * 1024))
+        await aio.sleep(0.2)
+        (conn,) = hub._conns.values()
+        assert conn.frames.qsize() <= 4
+        assert upstream.events.qsize() > 0
+
+        writer.close()
+        await aio.sleep(0.05)
+        assert not hub._conns
+        await hub.close()
+
+
+async def test_worker_reconnect(tmp_path) -> None:
+    path = str(tmp_path / "hub.sock")
+    upstream = UpstreamIO(delays=[10])
+    with LoggerCtx().in_ctx(Logger()):
+        hub = Hub(upstream, path, workers=1)
+        await hub.start()
+        worker = HubWorkerIO(path, 0, retry_delay=0.05)
+        await worker.open()
+
+        pending = aio.create_task(worker.output(_action("1")))
+        await aio.sleep(0.05)
+        await hub.close()
+        # 连接断开时，等待中的行为立即失败
+        with pt.raises(IOError):
+            await aio.wait_for(pending, 1)
+        assert not worker._echo_table
+        with pt.raises(IOError):
+            await worker.output(_action("2"))
+
+        upstream = UpstreamIO()
+        hub = Hub(upstream, path, workers=1)
+        await hub.start()
+        await aio.sleep(0.2)
+        assert worker.opened()
+        assert (await worker.output(_action("3"))).ok
+        upstream.events.put_nowait(_event(1, group_id=1))
+        assert (await aio.wait_for(worker.input(), 1)).data["n"] == 1
+
+        await worker.close()
+        await hub.close()
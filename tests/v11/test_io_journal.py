@@ -0,0 +1,130 @@
+import json
+
+import websockets
+from melobot.ctx import LoggerCtx
+from melobot.log.base import Logger
+
+from melobot_protocol_onebot.v11.adapter.base import EventFactory, _AckDispatcher
+from melobot_protocol_onebot.v11.io.forward import ForwardWebSocketIO
+from melobot_protocol_onebot.v11.io.journal import EventJournal
+from tests.base import *
+
+
+def _event(n: int) -> dict:
+    return {"time": n, "post_type": "request", "request_type": "friend", "n": n}
+
+
+async def test_journal_recover(tmp_path) -> None:
+    journal = EventJournal(tmp_path, fsync="never")
+    # 未打开时追加会丢掉上次未完成的事件，直接报错
+    with pt.raises(RuntimeError):
+        journal.append(_event(-1))
+    assert journal.recover() == []
+    seqs = [journal.append(_event(i)) for i in range(4)]
+    # 0、1 已分发完毕
+    journal.ack(seqs[1])
+    journal.ack(seqs[0])
+    journal.ack(seqs[0])
+    await aio.sleep(0)
+    assert journal.pending == 2
+    # 模拟进程崩溃：不调用 close，缓冲区在上一轮事件循环中已写入
+    journal.flush()
+
+    restarted = EventJournal(tmp_path, fsync="never")
+    recovered = restarted.recover()
+    assert [e["n"] for _, e in recovered] == [2, 3]
+    for seq, _ in recovered:
+        restarted.ack(seq)
+    restarted.close()
+
+    assert EventJournal(tmp_path).recover() == []
+
+
+async def test_journal_segments(tmp_path) -> None:
+    journal = EventJournal(tmp_path, segment_size=200, fsync="always")
+    journal.recover()
+    seqs = []
+    for i in range(10):
+        seqs.append(journal.append(_event(i)))
+        journal.flush()
+    assert len(list(tmp_path.glob("*.wal"))) > 3
+
+    for seq in seqs:
+        journal.ack(seq)
+    journal.close()
+    assert journal.pending == 0
+    assert len(list(tmp_path.glob("*.wal"))) == 1
+
+
+async def test_journal_truncated(tmp_path) -> None:
+    journal = EventJournal(tmp_path)
+    journal.recover()
+    journal.append(_event(0))
+    journal.append(_event(1))
+    journal.flush()
+
+    (seg,) = tmp_path.glob("*.wal")
+    seg.write_bytes(seg.read_bytes()[:-5])
+    restarted = EventJournal(tmp_path)
+    assert [e["n"] for _, e in restarted.recover()] == [0]
+    restarted.append(_event(2))
+    restarted.flush()
+    assert [e["n"] for _, e in EventJournal(tmp_path).recover()] == [0, 2]
+
+
+class MockWebsocket:
+    close_timeout = 0
+
+    def __init__(self) -> None:
+        self.recv_buf: aio.Queue[str] = aio.Queue()
+
+    async def send(self, data: str) -> None:
+        return
+
+    async def recv(self) -> str:
+        return await self.recv_buf.get()
+
+    async def close(self) -> None:
+        return
+
+    async def wait_closed(self) -> None:
+        return
+
+
+class MockDispatcher:
+    def __init__(self) -> None:
+        self.dispatched: list[int] = []
+
+    async def broadcast(self, event) -> None:
+        await aio.sleep(0)
+        self.dispatched.append(event.raw["n"])
+
+
+async def test_journal_taken_not_dispatched(tmp_path, monkeypatch) -> None:
+    ws = MockWebsocket()
+
+    async def connect(*_, **__) -> MockWebsocket:
+        return ws
+
+    monkeypatch.setattr(websockets, "connect", connect)
+    with LoggerCtx().in_ctx(Logger("journal_crash", to_console=False)):
+        io = ForwardWebSocketIO("ws://example.com", journal=EventJournal(tmp_path))
+        await io.open()
+        for i in range(5):
+            ws.recv_buf.put_nowait(
+                json.dumps({"time": i, "self_id": 1, "post_type": "test", "n": i})
+            )
+        # 输入循环一次取出多个事件，分发任务都还没有开始执行
+        factory = EventFactory()
+        events = [await factory.create(await io.input()) for _ in range(5)]
+        dispatcher = _AckDispatcher(MockDispatcher(), factory.acks)
+        await dispatcher.broadcast(events[0])
+        await dispatcher.broadcast(events[2])
+        assert dispatcher.dispatched == [0, 2] and len(factory.acks) == 3
+        # 模拟进程崩溃：不关闭 IO 源，已写入的记录落盘
+        io._journal.flush()
+        for t in io._tasks:
+            t.cancel()
+
+    restarted = EventJournal(tmp_path)
+    assert [e["n"] for _, e in restarted.recover()] == [1, 3, 4]
@@ -0,0 +1,72 @@
+import json
+from asyncio import create_task
+
+import websockets
+from melobot.ctx import LoggerCtx
+from melobot.log.base import Logger
+
+from melobot_protocol_onebot.v11.io.forward import ForwardWebSocketIO
+from melobot_protocol_onebot.v11.io.quarantine import ErrorQuarantine, preview_payload
+from tests.base import *
+
+_EVENT = {"time": 1, "self_id": 2, "post_type": "meta_event", "meta_event_type": "x"}
+
+
+def _fail(payload: str) -> Exception:
+    try:
+        json.loads(payload)
+    except Exception as e:
+        return e
+    raise AssertionError
+
+
+async def test_quarantine(tmp_path) -> None:
+    path = tmp_path / "dead" / "letters.jsonl"
+    q = ErrorQuarantine(interval=60, dead_letter=path, max_bytes=400)
+    with LoggerCtx().in_ctx(Logger("quarantine", to_console=False)):
+        assert q.admit(_fail("{"), "{", "a")
+        assert not q.admit(_fail("{"), "{", "a")
+        assert q.admit(KeyError("x"), b"\xff{}", "b")
+        for _ in range(10):
+            q.admit(_fail("["), "[" * 20, "a")
+        q.close()
+
+    assert q.total == 13 and q.suppressed == 10
+    assert ErrorQuarantine.signature(_fail("{"))[0] == "JSONDecodeError"
+    assert path.stat().st_size <= 400
+    old = (tmp_path / "dead" / "letters.jsonl.1").read_text(encoding="utf-8")
+    assert old.splitlines()[0].startswith("{") and len(old) <= 400
+    last = json.loads(path.read_text(encoding="utf-8").splitlines()[-1])
+    assert last["source"] == "a" and last["payload"] == "[" * 20
+
+
+async def test_io_quarantine(monkeypatch) -> None:
+    async def serve(ws: websockets.WebSocketServerProtocol) -> None:
+        for _ in range(300):
+            await ws.send("not json")
+        await ws.send(json.dumps(_EVENT))
+        await ws.wait_closed()
+
+    server = await websockets.serve(serve, "127.0.0.1", 18710)
+    logger = Logger("quarantine_io", to_console=False)
+    logged: list[str] = []
+    dumped: list[tuple[str, object]] = []
+    monkeypatch.setattr(logger, "exception", logged.append)
+    monkeypatch.setattr(logger, "generic_obj", lambda t, o, **_: dumped.append((t, o)))
+    with LoggerCtx().in_ctx(logger):
+        io = ForwardWebSocketIO("ws://127.0.0.1:18710", cd_time=0)
+        await io.open()
+        packet = await io.input()
+        assert packet.data == _EVENT
+        assert io._quarantine.total == 300 and len(logged) == 1
+        # 只记录原始数据包，不转储局部变量
+        assert dumped == [("异常点的上报数据", "not json")]
+        await io.close()
+    server.close()
+    await server.wait_closed()
+
+
+async def test_preview_payload() -> None:
+    assert preview_payload(b"[1, 2") == "[1, 2"
+    text = preview_payload("x" * 5000, limit=100)
+    assert text.startswith("x" * 100) and "5000" in text and len(text) < 200
@@ -0,0 +1,133 @@
+from melobot.ctx import LoggerCtx
+from melobot.log.base import Logger
+
+from melobot_protocol_onebot.v11.adapter import action
+from melobot_protocol_onebot.v11.io.base import BaseIO
+from melobot_protocol_onebot.v11.io.packet import EchoPacket, InPacket, OutPacket
+from melobot_protocol_onebot.v11.io.record import (
+    RECORD_ECHO,
+    RECORD_IN,
+    RECORD_OUT,
+    RecordIO,
+    RecordReader,
+    ReplayIO,
+)
+from tests.base import *
+
+
+class FakeIO(BaseIO):
+    def __init__(self, events: list[dict]) -> None:
+        super().__init__(0)
+        self.events = events
+        self._opened = False
+
+    async def open(self) -> None:
+        self._opened = True
+
+    def opened(self) -> bool:
+        return self._opened
+
+    async def close(self) -> None:
+        self._opened = False
+
+    async def input(self) -> InPacket:
+        data = self.events.pop(0)
+        return InPacket(time=data["time"], data=data)
+
+    async def output(self, packet: OutPacket) -> EchoPacket:
+        if packet.echo_id is None:
+            return EchoPacket(noecho=True)
+        data = {
+            "status": "ok",
+            "retcode": 0,
+            "data": {"message_id": len(packet.action_params["message"])},
+            "echo": packet.echo_id,
+        }
+        return EchoPacket(data=data, ok=True, action_type=packet.action_type)
+
+
+def _packet(text: str, need_echo: bool = True) -> OutPacket:
+    act = action.SendMsgAction(text, group_id=1)
+    act.set_echo(need_echo)
+    return OutPacket(
+        data=act.flatten(),
+        action_type=act.type,
+        action_params=act.params,
+        echo_id=act.id if need_echo else None,
+    )
+
+
+async def test_record_replay(tmp_path) -> None:
+    path = tmp_path / "cap.rec"
+    events = [{"time": i, "post_type": "meta_event", "n": i} for i in range(5)]
+    with LoggerCtx().in_ctx(Logger()):
+        rec = RecordIO(FakeIO(list(events)), path)
+        await rec.open()
+        assert [(await rec.input()).data for _ in range(5)] == events
+        await rec.output(_packet("a"))
+        await rec.output(_packet("bb"))
+        await rec.output(_packet("x", need_echo=False))
+        await rec.close()
+
+        kinds = [kind for kind, _, _ in RecordReader(path)]
+        assert kinds == [RECORD_IN] * 5 + [RECORD_OUT, RECORD_ECHO] * 2 + [RECORD_OUT]
+
+        replay = ReplayIO(path, speed=None)
+        await replay.open()
+        assert [(await replay.input()).data for _ in range(5)] == events
+        assert replay.replayed == 5
+        # 打开时只索引回应的位置，匹配时才解压
+        assert all(isinstance(o, tuple) for q in replay._echoes.values() for o in q)
+
+        packet = _packet("bb")
+        echo = await replay.output(packet)
+        assert echo.ok and echo.data["data"] == {"message_id": 1}
+        assert echo.data["echo"] == packet.echo_id
+        assert not (await replay.output(_packet("zzz"))).ok
+        assert replay.unmatched == 1
+
+        with pt.raises(aio.TimeoutError):
+            await aio.wait_for(replay.input(), 0.05)
+        assert replay.finished.is_set()
+        await replay.close()
+
+
+async def test_replay_long_echo_id(tmp_path) -> None:
+    path = tmp_path / "cap.rec"
+    act = action.SendMsgAction("hi", group_id=1)
+    # echo 标识超出只解压开头的部分时，退回到解压整条记录
+    packet = OutPacket(
+        data=act.flatten(),
+        action_type=act.type,
+        action_params=act.params,
+        echo_id="e" * 1000,
+    )
+    with LoggerCtx().in_ctx(Logger()):
+        rec = RecordIO(FakeIO([]), path)
+        await rec.open()
+        await rec.output(packet)
+        await rec.close()
+
+        replay = ReplayIO(path, speed=None)
+        await replay.open()
+        echo = await replay.output(packet)
+        assert echo.ok and echo.data["data"] == {"message_id": 1}
+        await replay.close()
+
+
+async def test_record_truncated(tmp_path) -> None:
+    path = tmp_path / "cap.rec"
+    with LoggerCtx().in_ctx(Logger()):
+        rec = RecordIO(FakeIO([{"time": 0}, {"time": 1}]), path)
+        await rec.open()
+        await rec.input()
+        await rec.input()
+        await rec.close()
+
+    raw = path.read_bytes()
+    path.write_bytes(raw[:-3])
+    assert len(list(RecordReader(path))) == 1
+
+    (tmp_path / "bad.rec").write_bytes(b"not a log")
+    with pt.raises(ValueError):
+        RecordReader(tmp_path / "bad.rec")
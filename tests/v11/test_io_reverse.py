@@ -68,7 +68,7 @@ class MockWebsocket:
     async def recv(self) -> str:
         return await _IN_BUF.get()
 
-    async def close(self):
+    def close(self):
         return
 
     async def wait_closed(self) -> None:
@@ -0,0 +1,74 @@
+import json
+from asyncio import create_task
+
+from melobot.ctx import LoggerCtx
+from melobot.log.base import Logger, LogLevel
+
+from melobot_protocol_onebot.v11.io.forward import ForwardWebSocketIO
+from melobot_protocol_onebot.v11.io.packet import OutPacket
+from melobot_protocol_onebot.v11.io.trace import PacketTrace, debug_enabled
+from melobot_protocol_onebot.v11.sim import SimConfig, Simulator
+from tests.base import *
+
+
+async def test_trace_sample(monkeypatch, tmp_path) -> None:
+    logged: list[object] = []
+    logger = Logger("trace_debug", LogLevel.DEBUG)
+    monkeypatch.setattr(logger, "generic_obj", lambda msg, obj, **_: logged.append(obj))
+
+    with LoggerCtx().in_ctx(logger):
+        assert debug_enabled(logger)
+        trace = PacketTrace(buffer_size=3, sample=4, groups=[42], dump_dir=tmp_path)
+        for i in range(8):
+            trace.record("in", f'{{"group_id": {42 if i == 1 else 7}, "i": {i}}}')
+        trace.record("out", b'{"action": "x"}')
+
+        assert trace.count == 9 and len(trace) == 3
+        assert logged == ['{"group_id": 42, "i": 1}', '{"group_id": 7, "i": 3}'] + [
+            '{"group_id": 7, "i": 7}'
+        ]
+        dumped = trace.dump()
+        assert [d["direction"] for d in dumped] == ["in", "in", "out"]
+        assert dumped[-1]["data"] == '{"action": "x"}'
+
+        path = trace.on_error()
+        assert path is not None and trace.on_error() is None
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line) for line in lines] == dumped
+
+    with LoggerCtx().in_ctx(Logger("trace_info", to_console=False)):
+        assert not debug_enabled(Logger("trace_info"))
+        trace.refresh()
+        trace.record("in", '{"group_id": 42}')
+        assert len(logged) == 3
+
+
+async def test_io_trace() -> None:
+    sim = Simulator(SimConfig(rate=500, total=20, linger=0.2, seed=1))
+    sim_task = create_task(sim.serve_ws("127.0.0.1", 18700))
+    await aio.sleep(0.1)
+    with LoggerCtx().in_ctx(Logger("trace_io", to_console=False)):
+        idle = ForwardWebSocketIO("ws://127.0.0.1:18700", cd_time=0)
+        idle._init_trace()
+        assert idle._trace is None
+
+        trace = PacketTrace(buffer_size=100, sample=0)
+        io = ForwardWebSocketIO("ws://127.0.0.1:18700", cd_time=0, trace=trace)
+        assert io.trace is trace
+        with pt.raises(AttributeError):
+            io.trace = None
+        await io.open()
+        for _ in range(20):
+            await io.input()
+        data = json.dumps({"action": "get_login_info", "params": {}, "echo": "1"})
+        echo = await io.output(
+            OutPacket(
+                data=data, action_type="get_login_info", action_params={}, echo_id="1"
+            )
+        )
+        assert echo.ok
+        await sim_task
+        await io.close()
+
+    directions = [d["direction"] for d in trace.dump()]
+    assert directions.count("in") == 21 and directions.count("out") == 1
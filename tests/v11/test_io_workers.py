@@ -0,0 +1,51 @@
+import time
+
+import aiohttp
+from melobot.ctx import LoggerCtx
+from melobot.log.base import Logger
+
+from melobot_protocol_onebot.v11.io.duplex_http import HttpIO
+from melobot_protocol_onebot.v11.io.workers import SharedRateLimit, run_workers
+from tests.base import *
+
+
+def _reserve_worker(worker: int, limit: SharedRateLimit, path: str) -> None:
+    with open(f"{path}.{worker}", "w", encoding="utf-8") as fp:
+        for _ in range(3):
+            fp.write(f"{time.time() + limit.reserve()}\n")
+
+
+async def test_shared_rate_limit(tmp_path) -> None:
+    limit = SharedRateLimit(0.05)
+    run_workers(_reserve_worker, 2, (limit, str(tmp_path / "t")))
+    times = sorted(
+        float(line)
+        for i in range(2)
+        for line in (tmp_path / f"t.{i}").read_text().split()
+    )
+    assert len(times) == 6
+    assert all(b - a >= 0.049 for a, b in zip(times, times[1:]))
+
+
+async def test_http_reuse_port() -> None:
+    event = {"time": 0, "self_id": 1, "post_type": "meta_event", "meta_event_type": "x"}
+    with LoggerCtx().in_ctx(Logger()):
+        ios = [
+            HttpIO("127.0.0.1", 18681, "127.0.0.1", 18682, reuse_port=True)
+            for _ in range(2)
+        ]
+        tasks = [aio.create_task(io.open()) for io in ios]
+        await aio.sleep(0.2)
+
+        # 每个连接由其中一个 IO 源接收，两个 IO 源最终都会收到上报
+        for _ in range(20):
+            conn = aiohttp.TCPConnector(force_close=True)
+            async with aiohttp.ClientSession(connector=conn) as session:
+                async with session.post("http://127.0.0.1:18682", json=event) as resp:
+                    assert resp.status == 204
+            if all(io.opened() for io in ios):
+                break
+        assert all(io.opened() for io in ios)
+        await aio.gather(*tasks)
+        for io in ios:
+            await io.close()
@@ -0,0 +1,51 @@
+import json
+
+import websockets
+from melobot.ctx import LoggerCtx
+from melobot.log.base import Logger
+from websockets.extensions.permessage_deflate import PerMessageDeflate
+
+from melobot_protocol_onebot.v11.io.forward import ForwardWebSocketIO
+from melobot_protocol_onebot.v11.io.ws_options import WSTransportOptions
+from tests.base import *
+
+
+async def test_ws_options_kwargs() -> None:
+    kwargs = WSTransportOptions(compression=False, max_size=None).client_kwargs()
+    assert kwargs["compression"] is None and kwargs["max_size"] is None
+    assert "extensions" not in kwargs
+
+    opts = WSTransportOptions(client_max_window_bits=10, compress_level=1)
+    kwargs = opts.server_kwargs()
+    assert kwargs["compression"] is None and len(kwargs["extensions"]) == 1
+
+
+async def test_ws_options_forward() -> None:
+    big_event = {"time": 0, "post_type": "meta_event", "pad": "x" * (2 * 1024 * 1024)}
+    conns = []
+
+    async def handler(ws) -> None:
+        conns.append(ws)
+        await ws.send(json.dumps(big_event))
+        await ws.wait_closed()
+
+    server = await websockets.serve(handler, "127.0.0.1", 18660)
+    opts = WSTransportOptions(
+        client_max_window_bits=10,
+        compress_level=1,
+        write_limit_high=2**17,
+        write_limit_low=2**15,
+    )
+    with LoggerCtx().in_ctx(Logger()):
+        io = ForwardWebSocketIO("ws://127.0.0.1:18660", cd_time=0, ws_options=opts)
+        await io.open()
+        # 超过 websockets 默认 1 MiB 上限的上报也能收到
+        packet = await aio.wait_for(io.input(), 5)
+        assert len(packet.data["pad"]) == len(big_event["pad"])
+
+        (ext,) = io.conn.extensions
+        assert isinstance(ext, PerMessageDeflate) and ext.local_max_window_bits == 10
+        assert io.conn.transport.get_write_buffer_limits() == (2**15, 2**17)
+        await io.close()
+    server.close()
+    await server.wait_closed()
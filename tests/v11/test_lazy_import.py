@@ -0,0 +1,40 @@
+import subprocess
+import sys
+
+from melobot_protocol_onebot.v11 import io as v11_io
+from melobot_protocol_onebot.v11.adapter.echo import GetGroupMemberListEcho
+from melobot_protocol_onebot.v11.adapter.event import Event
+from melobot_protocol_onebot.v11.adapter.segment import build_models
+from tests.base import *
+
+_PROBE = """
+import sys
+import melobot_protocol_onebot.v11 as v11
+print(",".join(m for m in ("aiohttp", "websockets", "numpy") if m in sys.modules))
+v11.ForwardWebSocketIO
+print(",".join(m for m in ("aiohttp", "websockets", "numpy") if m in sys.modules))
+"""
+
+
+async def test_lazy_transports() -> None:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={"PYTHONPATH": ":".join(sys.path)},
+    ).stdout.splitlines()
+    assert out == ["", "websockets"]
+
+    assert v11_io.HttpIO.__module__.endswith("duplex_http")
+    assert "ReverseWebSocketIO" in dir(v11_io)
+    with pt.raises(AttributeError):
+        v11_io.NoSuchIO
+
+
+async def test_deferred_models() -> None:
+    build_models()
+    assert GetGroupMemberListEcho.Model.__pydantic_complete__
+    assert build_models() == 0
+    e = Event.resolve({"time": 1, "self_id": 2, "post_type": "x"})
+    assert e.self_id == 2
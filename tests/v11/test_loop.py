@@ -0,0 +1,44 @@
+import asyncio
+from asyncio import create_task
+
+from melobot.ctx import LoggerCtx
+from melobot.log.base import Logger
+
+from melobot_protocol_onebot.v11.io.forward import ForwardWebSocketIO
+from melobot_protocol_onebot.v11.loop import (
+    check_loop,
+    current_loop_backend,
+    install_loop,
+)
+from melobot_protocol_onebot.v11.sim import SimConfig, Simulator
+from tests.base import *
+
+
+async def test_check_loop() -> None:
+    await check_loop()
+    assert current_loop_backend() == "asyncio"
+
+
+async def _forward_under_loop() -> tuple[str, int]:
+    sim = Simulator(SimConfig(rate=500, total=50, linger=0.1, seed=1))
+    sim_task = create_task(sim.serve_ws("127.0.0.1", 18690))
+    await asyncio.sleep(0.1)
+    with LoggerCtx().in_ctx(Logger()):
+        io = ForwardWebSocketIO("ws://127.0.0.1:18690", cd_time=0)
+        await io.open()
+        got = [await io.input() for _ in range(50)]
+        stats = await sim_task
+        await io.close()
+    assert stats.events == len(got)
+    return current_loop_backend(), len(got)
+
+
+def test_uvloop_backend() -> None:
+    pt.importorskip("uvloop")
+    try:
+        assert install_loop("uvloop") == "uvloop"
+        assert current_loop_backend() == "uvloop"
+        asyncio.run(check_loop())
+        assert asyncio.run(_forward_under_loop()) == ("uvloop", 50)
+    finally:
+        assert install_loop("asyncio") == "asyncio"
@@ -0,0 +1,104 @@
+import json
+
+import aiohttp
+import websockets
+from melobot.ctx import LoggerCtx
+from melobot.log.base import Logger
+
+from melobot_protocol_onebot.v11.io.forward import ForwardWebSocketIO
+from melobot_protocol_onebot.v11.io.packet import OutPacket
+from melobot_protocol_onebot.v11.metrics import MetricsRegistry
+from tests.base import *
+
+
+class _MockWebsocket:
+    close_timeout = 0
+
+    def __init__(self) -> None:
+        self.in_buf: aio.Queue[str] = aio.Queue()
+        self.sent: list[str] = []
+
+    async def send(self, data: str) -> None:
+        self.sent.append(data)
+        await self.in_buf.put(
+            json.dumps({"status": "ok", "retcode": 0, "data": None, "echo": "1"})
+        )
+
+    async def recv(self) -> str:
+        return await self.in_buf.get()
+
+    async def close(self) -> None:
+        return
+
+    async def wait_closed(self) -> None:
+        return
+
+
+async def test_registry() -> None:
+    r = MetricsRegistry()
+    r.counter("reqs_total", "请求数", {"path": 'a"b'}).inc(2)
+    assert r.counter("reqs_total", labels={"path": 'a"b'}).value == 2
+    h = r.histogram("lat_seconds", buckets=(0.1, 1))
+    for v in (0.05, 0.1, 0.5, 3):
+        h.observe(v)
+    depth = [3]
+    r.gauge("depth", lambda: depth[0])
+    depth[0] = 5
+
+    text = r.render()
+    assert "# HELP reqs_total 请求数" in text
+    assert 'reqs_total{path="a\\"b"} 2' in text
+    assert 'lat_seconds_bucket{le="0.1"} 2' in text
+    assert 'lat_seconds_bucket{le="1"} 3' in text
+    assert 'lat_seconds_bucket{le="+Inf"} 4' in text
+    assert "lat_seconds_count 4" in text
+    assert "depth 5" in text
+    assert r.collect()["lat_seconds"][()]["counts"] == [2, 1, 1]
+    with pt.raises(ValueError):
+        r.histogram("depth")
+
+
+async def test_serve() -> None:
+    r = MetricsRegistry()
+    r.counter("up").inc()
+    await r.serve("127.0.0.1", 19281)
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get("http://127.0.0.1:19281/metrics") as resp:
+                assert resp.status == 200
+                assert "up 1" in await resp.text()
+    finally:
+        await r.stop()
+
+
+async def test_io_metrics(monkeypatch) -> None:
+    with LoggerCtx().in_ctx(Logger()):
+        ws = _MockWebsocket()
+
+        async def connect(*_, **__) -> _MockWebsocket:
+            return ws
+
+        monkeypatch.setattr(websockets, "connect", connect)
+        r = MetricsRegistry()
+        io = ForwardWebSocketIO("ws://example.com", cd_time=0, metrics=r)
+        async with io:
+            echo = await io.output(
+                OutPacket(
+                    data="{}", action_type="get_status", action_params={}, echo_id="1"
+                )
+            )
+            assert echo.ok
+            await ws.in_buf.put("not json")
+            await ws.in_buf.put(json.dumps({"post_type": "meta_event", "time": 1}))
+            await io.input()
+
+        values = r.collect()
+        key = (("source", "forward_ws:ws://example.com"),)
+        assert values["onebot_io_connects_total"][key] == 1
+        assert values["onebot_io_outputs_total"][key] == 1
+        assert values["onebot_io_echoes_total"][key] == 1
+        assert values["onebot_io_events_total"][key] == 1
+        assert values["onebot_io_input_errors_total"][key] == 1
+        assert values["onebot_io_echo_latency_seconds"][key]["count"] == 1
+        assert values["onebot_io_echo_table_size"][key] == 0
+        assert ForwardWebSocketIO("ws://example.com")._metrics is None
@@ -0,0 +1,72 @@
+import json
+import time
+
+from melobot_protocol_onebot.v11.adapter.base import EventFactory
+from melobot_protocol_onebot.v11.adapter.event import GroupMessageEvent
+from melobot_protocol_onebot.v11.io.packet import InPacket
+from melobot_protocol_onebot.v11.metrics import MetricsRegistry
+from melobot_protocol_onebot.v11.offload import Offloader
+from tests.base import *
+
+
+def _group_msg(seg_num: int) -> dict:
+    return {
+        "time": 1725292489,
+        "self_id": 123456,
+        "post_type": "message",
+        "message_type": "group",
+        "sub_type": "normal",
+        "sender": {"user_id": 1, "nickname": "n", "card": "", "role": "member"},
+        "message_id": 1,
+        "font": 0,
+        "message": [{"type": "text", "data": {"text": str(i)}} for i in range(seg_num)],
+        "user_id": 1,
+        "anonymous": None,
+        "group_id": 2,
+        "raw_message": "",
+    }
+
+
+async def test_offload_loads() -> None:
+    registry = MetricsRegistry()
+    offload = Offloader(size_threshold=1024, metrics=registry)
+    small, large = json.dumps(_group_msg(1)), json.dumps(_group_msg(100))
+    assert await offload.loads(small) == json.loads(small)
+    assert offload.offloaded == 0
+
+    res = await aio.gather(*(offload.loads(s) for s in (large, small, large.encode())))
+    assert res == [json.loads(large), json.loads(small), json.loads(large)]
+    assert offload.offloaded == 2 and offload.offloaded_seconds > 0
+    assert registry.collect()["onebot_offload_total"][()] == 2
+    assert "onebot_offload_stall_avoided_seconds_total" in registry.collect()
+    offload.shutdown()
+
+
+async def test_offload_stall_avoided() -> None:
+    offload = Offloader()
+    # 事件循环在等待期间空闲，池中的耗时全部是避免的阻塞
+    await offload._run(time.sleep, 0.1)
+    assert 0.05 < offload.stall_avoided_seconds <= offload.offloaded_seconds
+
+    async def block_loop() -> None:
+        await aio.sleep(0)
+        time.sleep(0.1)
+
+    # 事件循环在等待期间被其他任务阻塞，转移没有避免阻塞
+    offload.stall_avoided_seconds = 0
+    await aio.gather(offload._run(time.sleep, 0.1), block_loop())
+    assert offload.stall_avoided_seconds < 0.05
+    offload.shutdown()
+
+
+async def test_offload_resolve() -> None:
+    offload = Offloader(segment_threshold=50)
+    factory = EventFactory(offload)
+    events = [
+        await factory.create(InPacket(time=0, data=_group_msg(n))) for n in (10, 300)
+    ]
+    assert all(isinstance(e, GroupMessageEvent) for e in events)
+    assert [len(e.message) for e in events] == [10, 300]
+    assert offload.offloaded == 1
+    assert offload.heavy_event({"message": "x" * (offload.size_threshold + 1)})
+    offload.shutdown()
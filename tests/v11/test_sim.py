@@ -0,0 +1,94 @@
+from asyncio import create_task
+
+from melobot.ctx import LoggerCtx
+from melobot.log.base import Logger
+
+from melobot_protocol_onebot.v11.adapter import action
+from melobot_protocol_onebot.v11.io.base import BaseIO
+from melobot_protocol_onebot.v11.io.duplex_http import HttpIO
+from melobot_protocol_onebot.v11.io.forward import ForwardWebSocketIO
+from melobot_protocol_onebot.v11.io.packet import OutPacket
+from melobot_protocol_onebot.v11.sim import PayloadFactory, SimConfig, Simulator
+from tests.base import *
+
+
+def _reply_packet(event: dict) -> OutPacket:
+    if event["message_type"] == "group":
+        act = action.SendMsgAction("reply", group_id=event["group_id"])
+    else:
+        act = action.SendMsgAction("reply", user_id=event["user_id"])
+    act.set_echo(True)
+    return OutPacket(
+        data=act.flatten(),
+        action_type=act.type,
+        action_params=act.params,
+        echo_id=act.id,
+    )
+
+
+async def _echo_bot(io: BaseIO, echoes: list) -> None:
+    async def reply(event: dict) -> None:
+        echoes.append(await io.output(_reply_packet(event)))
+
+    while True:
+        packet = await io.input()
+        if packet.data["post_type"] == "message":
+            create_task(reply(packet.data))
+
+
+async def test_payload_factory() -> None:
+    factory = PayloadFactory(seed=1)
+    factory.check()
+    mix = PayloadFactory(mix={"poke": 1}, seed=1)
+    assert all(mix.event()["notice_type"] == "notify" for _ in range(10))
+
+
+async def test_sim_forward_ws() -> None:
+    cfg = SimConfig(
+        rate=200,
+        total=40,
+        mix={"group_message": 1, "private_message": 1},
+        echo_latency=0.005,
+        error_rate=0.5,
+        linger=0.5,
+        seed=1,
+    )
+    sim = Simulator(cfg)
+    sim_task = create_task(sim.serve_ws("127.0.0.1", 18650))
+    await aio.sleep(0.2)
+
+    echoes: list = []
+    with LoggerCtx().in_ctx(Logger()):
+        io = ForwardWebSocketIO("ws://127.0.0.1:18650", cd_time=0)
+        await io.open()
+        bot = create_task(_echo_bot(io, echoes))
+        stats = await sim_task
+        bot.cancel()
+        await io.close()
+
+    report = stats.report()
+    assert stats.events == 40 and stats.actions == 40
+    assert report["replies"] == 40 and 0 < report["reply_latency_ms"]["p50"] < 100
+    assert len(echoes) == 40
+    assert sum(not e.ok for e in echoes) == stats.failed_echoes > 0
+
+
+async def test_sim_http() -> None:
+    sim = Simulator(
+        SimConfig(rate=200, total=20, mix={"group_message": 1}, linger=0.5, secret="s")
+    )
+    echoes: list = []
+    with LoggerCtx().in_ctx(Logger()):
+        io = HttpIO("127.0.0.1", 18651, "127.0.0.1", 18652, secret="s", cd_time=0)
+        sim_task = create_task(
+            sim.serve_http("127.0.0.1", 18651, "http://127.0.0.1:18652")
+        )
+        # HTTP IO 源在收到第一个上报后才就绪
+        await io.open()
+        bot = create_task(_echo_bot(io, echoes))
+        stats = await sim_task
+        bot.cancel()
+        await io.close()
+
+    assert stats.events == 20 and stats.report()["replies"] == 20
+    assert len(echoes) == 20 and all(e.ok for e in echoes)
@@ -1,13 +1,16 @@
 from asyncio import Queue
+from types import SimpleNamespace
 
 from melobot_protocol_onebot.v11.adapter import event
 from melobot_protocol_onebot.v11.adapter.segment import AtSegment
 from melobot_protocol_onebot.v11.utils import (
     AtMsgChecker,
+    CooldownChecker,
     GroupRole,
     LevelRole,
     MsgCheckerFactory,
 )
+from melobot_protocol_onebot.v11.utils import check as check_mod
 from tests.base import *
 
 _CB_BUF = Queue()
@@ -145,3 +148,46 @@ async def test_at_checker():
     c3 = AtMsgChecker()
     assert await c3.check(at_e(1))
     assert await c3.check(at_e(2))
+
+
+async def test_cooldown(monkeypatch) -> None:
+    now = [1000.0]
+    hints: list[str] = []
+
+    async def send_text(text: str) -> tuple:
+        hints.append(text)
+        return ()
+
+    monkeypatch.setattr(check_mod.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(check_mod, "_send_text", send_text)
+
+    def e(uid: int, gid: int = 1) -> SimpleNamespace:
+        return SimpleNamespace(user_id=uid, group_id=gid)
+
+    c = CooldownChecker(10, ("group_id", "user_id"), hint="冷却中，剩余 {remain}s")
+    assert await c.check(e(1))
+    assert await c.check(e(1, 2))
+    now[0] += 4
+    assert not await c.check(e(1)) and not await c.check(e(1))
+    assert hints == ["冷却中，剩余 6s"] and c.remain(e(1)) == 6
+    now[0] += 6.5
+    assert await c.check(e(1)) and len(c) == 1
+    assert c.remain(e(1, 2)) == 0
+
+    now[0] += 100
+    assert await c.check(e(2)) and len(c) == 1
+
+    small = CooldownChecker(10, max_keys=2)
+    for uid in range(5):
+        assert await small.check(e(uid))
+    assert len(small) == 2 and await small.check(e(0))
+    # 提前移除的键同时离开时间轮，槽中的键数同样不超过上限
+    for uid in range(100, 1100):
+        assert await small.check(e(uid))
+    assert len(small) == 2 and sum(map(len, small._wheel)) == 2
+    now[0] += 20
+    assert await small.check(e(-1)) and sum(map(len, small._wheel)) == 1
+
+    always = check_mod.Checker.new(lambda _: False)
+    assert not await (always & small).check(e(9))
+    assert await small.check(e(9))